@@ -0,0 +1,114 @@
+"""Per-click API latency: a new APIClient per handler call vs one pooled client
+
+Each "click" makes the same requests a handler does (user lookup plus a list).
+By default the benchmark starts a local stub of the Django API. Pass --base-url
+to measure against a running backend instead (python manage.py runserver).
+
+    python benchmarks/api_client_pool.py --clicks 500
+    python benchmarks/api_client_pool.py --base-url http://127.0.0.1:8000/api
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+
+from aiohttp import web  # noqa: E402
+
+from bot.services.api_client import APIClient  # noqa: E402
+
+CATEGORIES = {
+    "count": 20,
+    "next": None,
+    "previous": None,
+    "results": [{"id": i, "title": f"Категория {i}"} for i in range(20)],
+}
+USER = {"id": 1, "telegram_id": 1, "detail": "Пользователь", "patient": True, "doctor": False}
+
+
+async def start_stub_api():
+    """Start a local stub of the API on a free port, return (runner, base_url)"""
+    async def categories(request):
+        return web.json_response(CATEGORIES)
+
+    async def user(request):
+        return web.json_response(USER)
+
+    app = web.Application()
+    app.router.add_get("/api/categories/", categories)
+    app.router.add_get("/api/users/telegram/{telegram_id}/", user)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api"
+
+
+async def click(api_client: APIClient):
+    """Requests made by a typical handler"""
+    await api_client.get_user_by_telegram_id(1)
+    await api_client.get_categories()
+
+
+async def measure(clicks: int, run_click):
+    timings = []
+    for _ in range(clicks):
+        started = time.perf_counter()
+        await run_click()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(name: str, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{name:<28} mean {statistics.mean(timings):7.2f} ms   "
+        f"p50 {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clicks", type=int, default=300, help="Number of clicks per scenario")
+    parser.add_argument("--base-url", help="API base URL (default: local stub API)")
+    args = parser.parse_args()
+
+    runner = None
+    base_url = args.base_url
+    if base_url is None:
+        runner, base_url = await start_stub_api()
+
+    async def new_client_per_click():
+        api_client = APIClient(base_url)
+        try:
+            await click(api_client)
+        finally:
+            await api_client.close()
+
+    pooled = APIClient(base_url)
+
+    async def pooled_click():
+        await click(pooled)
+
+    try:
+        # Warm up both paths (imports, DNS, first connection)
+        await new_client_per_click()
+        await pooled_click()
+
+        print(f"{args.clicks} clicks against {base_url}")
+        report("before: client per click", await measure(args.clicks, new_client_per_click))
+        report("after: pooled client", await measure(args.clicks, pooled_click))
+    finally:
+        await pooled.close()
+        if runner is not None:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+"""Response formats: stock JSON vs orjson vs MessagePack, with and without compression
+
+Fills an in-memory test database, takes one page of the doctors, rating and
+reviews endpoints and measures, for each format, server-side render time,
+client-side decode time and bytes on the wire, raw and compressed with each
+encoding available to CompressionMiddleware.
+
+    python benchmarks/api_formats.py --doctors 500 --reviews 5000 --page-size 100
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "med"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "med.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api.bulk import bulk_create_reviews, bulk_create_users  # noqa: E402
+from api.compression import COMPRESSORS  # noqa: E402
+from api.leaderboards import rebuild_leaderboards  # noqa: E402
+from api.models import Category, Clinic, GeoPosition  # noqa: E402
+from api.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson  # noqa: E402
+
+
+def fill_database(doctors: int, reviews: int):
+    categories = Category.objects.bulk_create([Category(title=f"Категория {i}") for i in range(20)])
+    cities = GeoPosition.objects.bulk_create([GeoPosition(title=f"Город {i}") for i in range(10)])
+    clinics = Clinic.objects.bulk_create([
+        Clinic(
+            title=f"Клиника {i}",
+            address=f"ул. Абая, {i}",
+            phone="+7 700 000 00 00",
+            email=f"clinic{i}@example.com",
+            work_time="Пн-Пт 9:00-18:00",
+        )
+        for i in range(50)
+    ])
+    patients = doctors * 2
+    bulk_create_users([
+        {
+            "telegram_id": 1000 + i,
+            "detail": f"Врач {i} Иванов Иван Иванович",
+            "category_id": categories[i % len(categories)].pk,
+            "geo_position_id": cities[i % len(cities)].pk,
+            "clinic_id": clinics[i % len(clinics)].pk,
+            "doctor": True,
+        }
+        for i in range(doctors)
+    ] + [
+        {"telegram_id": 100000 + i, "detail": f"Пациент {i}", "patient": True}
+        for i in range(patients)
+    ])
+
+    rng = random.Random(1)
+    doctor_ids = list(range(1, doctors + 1))
+    patient_ids = list(range(doctors + 1, doctors + patients + 1))
+    pairs = {(rng.choice(patient_ids), rng.choice(doctor_ids)) for _ in range(reviews)}
+    bulk_create_reviews([
+        {"user_id": user, "doctor_id": doctor, "rating": rng.randint(1, 5), "detail": "Хороший врач, рекомендую. " * 3}
+        for user, doctor in pairs
+    ])
+    rebuild_leaderboards()
+
+
+def best_of(repeat: int, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--doctors", type=int, default=500, help="Number of doctors")
+    parser.add_argument("--reviews", type=int, default=5000, help="Number of reviews")
+    parser.add_argument("--page-size", type=int, default=100, help="Rows per page")
+    parser.add_argument("--repeat", type=int, default=50, help="Repetitions (best time is reported)")
+    args = parser.parse_args()
+
+    if orjson is None or msgpack is None:
+        sys.exit("orjson and msgpack are required: pip install orjson msgpack")
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    fill_database(args.doctors, args.reviews)
+
+    formats = [
+        ("json (stdlib)", JSONRenderer(), json.loads),
+        ("json (orjson)", ORJSONRenderer(), orjson.loads),
+        ("msgpack", MessagePackRenderer(), msgpack.unpackb),
+    ]
+    endpoints = [
+        ("doctors", "/api/users/doctors/"),
+        ("rating", "/api/users/doctors/rating/"),
+        ("reviews", "/api/reviews/"),
+    ]
+
+    client = APIClient()
+    print(f"{args.doctors} doctors, {args.reviews} reviews, page of {args.page_size}")
+    encodings = sorted(COMPRESSORS)
+    print(
+        f"{'endpoint':<10}{'format':<16}{'bytes':>9}{'render ms':>12}{'decode ms':>12}"
+        + "".join(f"{encoding:>9}{'ms':>8}" for encoding in encodings)
+    )
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        for name, url in endpoints:
+            data = client.get(url, {"page_size": args.page_size}).data
+            for format_name, renderer, decode in formats:
+                body = renderer.render(data)
+                render_ms = best_of(args.repeat, lambda: renderer.render(data))
+                decode_ms = best_of(args.repeat, lambda: decode(body))
+                compressed = ""
+                for encoding in encodings:
+                    compress = COMPRESSORS[encoding]
+                    compress_ms = best_of(args.repeat, lambda: compress(body))
+                    compressed += f"{len(compress(body)):>9}{compress_ms:>8.3f}"
+                print(f"{name:<10}{format_name:<16}{len(body):>9}{render_ms:>12.3f}{decode_ms:>12.3f}{compressed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Concurrent clients: WSGI worker threads vs ASGI with sync DRF views vs ASGI async views
+
+Fills a temporary SQLite database and lets N concurrent clients hit the hot
+read endpoints (doctor detail and card, telegram lookup, rankings, doctors by
+category, reviews by doctor) through the Django handlers in-process, without
+an HTTP server:
+
+- wsgi:       WSGIHandler on a pool of --wsgi-threads threads (one worker);
+- asgi-sync:  ASGIHandler, the regular synchronous ViewSets (med.urls);
+- asgi-async: ASGIHandler, async views from api/async_views.py (med.asgi_urls).
+
+Reports throughput and latency percentiles per concurrency level. SQLite
+answers in microseconds; --db-latency-ms adds a sleep to every query to
+model the network round trip to a database server.
+
+    python benchmarks/asgi_concurrency.py --clients 100 500 1000 --requests 2000
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "med"))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "med.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.handlers.asgi import ASGIHandler  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+
+from api.models import Category  # noqa: E402
+from benchmarks.api_formats import fill_database  # noqa: E402
+
+MODES = {
+    "wsgi": "med.urls",
+    "asgi-sync": "med.urls",
+    "asgi-async": "med.asgi_urls",
+}
+
+
+def build_requests(count: int, doctors: int, categories: list, seed: int = 1):
+    """Mix of hot read requests: (path, query string)"""
+    rng = random.Random(seed)
+    makers = [
+        lambda: (f"/api/users/{rng.randint(1, doctors)}/", {}),
+        lambda: (f"/api/users/{rng.randint(1, doctors)}/card/", {"telegram_id": 100000 + rng.randint(0, doctors)}),
+        lambda: (f"/api/users/telegram/{100000 + rng.randint(0, doctors * 2)}/", {}),
+        lambda: ("/api/users/doctors/rating/", {"ranking": rng.choice(["average", "bayesian", "wilson"])}),
+        lambda: (f"/api/users/doctors/category/{rng.choice(categories)}/", {}),
+        lambda: ("/api/clinics/rating/", {}),
+        lambda: (f"/api/reviews/doctor/{rng.randint(1, doctors)}/", {}),
+    ]
+    return [(path, urlencode(params)) for path, params in (rng.choice(makers)() for _ in range(count))]
+
+
+def add_db_latency(seconds: float):
+    """Sleep before every query of every new connection"""
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # The same per-thread connection object reconnects on every request
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(install, weak=False)
+
+
+def wsgi_caller(threads: int):
+    handler = WSGIHandler()
+    pool = ThreadPoolExecutor(max_workers=threads)
+
+    def call(path, query):
+        statuses = []
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "HTTP_HOST": "localhost",
+            "HTTP_ACCEPT": "application/json",
+            "wsgi.input": io.BytesIO(),
+            "wsgi.url_scheme": "http",
+        }
+        response = handler(environ, lambda status, headers: statuses.append(status))
+        b"".join(response)
+        response.close()
+        return int(statuses[0].split()[0])
+
+    async def request(path, query):
+        return await asyncio.get_running_loop().run_in_executor(pool, call, path, query)
+
+    return request, pool.shutdown
+
+
+def asgi_caller():
+    handler = ASGIHandler()
+
+    async def request(path, query):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"localhost"), (b"accept", b"application/json")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("localhost", 80),
+        }
+        body_sent = False
+        disconnected = asyncio.Event()
+        status = []
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        await handler(scope, receive, send)
+        disconnected.set()
+        return status[0]
+
+    return request, lambda: None
+
+
+async def run_level(request, requests, clients: int):
+    queue = list(reversed(requests))
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        while queue:
+            path, query = queue.pop()
+            started = time.perf_counter()
+            status = await request(path, query)
+            latencies.append(time.perf_counter() - started)
+            if status >= 500:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+async def run_mode(mode: str, requests, levels, wsgi_threads: int):
+    request, shutdown = wsgi_caller(wsgi_threads) if mode == "wsgi" else asgi_caller()
+    try:
+        # Warm-up: DB connections, response cache and the global mean rating
+        await run_level(request, requests[:200], 10)
+        for clients in levels:
+            stats = await run_level(request, requests, clients)
+            print(
+                f"{mode:<12}{clients:>8}{stats['rps']:>10.0f}{stats['p50']:>10.1f}"
+                f"{stats['p99']:>10.1f}{stats['errors']:>8}"
+            )
+    finally:
+        shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 500, 1000], help="Concurrency levels")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per concurrency level")
+    parser.add_argument("--doctors", type=int, default=500, help="Number of doctors")
+    parser.add_argument("--reviews", type=int, default=5000, help="Number of reviews")
+    parser.add_argument("--wsgi-threads", type=int, default=8, help="Threads of the WSGI worker")
+    parser.add_argument("--db-latency-ms", type=float, default=0, help="Simulated latency of every query")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES), help="Modes to run")
+    args = parser.parse_args()
+
+    # File database: connections of all WSGI/ASGI threads see the same data
+    directory = tempfile.TemporaryDirectory()
+    connection.settings_dict["TEST"]["NAME"] = os.path.join(directory.name, "benchmark.sqlite3")
+    setup_test_environment(debug=False)
+    connection.creation.create_test_db(verbosity=0)
+    fill_database(args.doctors, args.reviews)
+    categories = list(Category.objects.values_list("pk", flat=True))
+    connection.close()
+    if args.db_latency_ms:
+        add_db_latency(args.db_latency_ms / 1000)
+
+    requests = build_requests(args.requests, args.doctors, categories)
+    print(
+        f"{args.doctors} doctors, {args.reviews} reviews, {args.requests} requests per level, "
+        f"{args.db_latency_ms:g} ms per query"
+    )
+    print(f"{'mode':<12}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode in args.modes:
+        with override_settings(ROOT_URLCONF=MODES[mode], ALLOWED_HOSTS=["localhost"]):
+            asyncio.run(run_mode(mode, requests, args.clients, args.wsgi_threads))
+    directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
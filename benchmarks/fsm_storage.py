@@ -0,0 +1,129 @@
+"""FSM storage: aiogram MemoryStorage vs SQLiteStorage (write-back cache, WAL)
+
+Simulates many concurrent conversations going through a registration-like
+flow (set state, update data a few times, read it back). Half of them finish
+the flow and clear their state, the other half abandon it. Reports the time
+per storage operation, the memory held by the storage and, for SQLite, the
+database size and how many states are recovered after a restart.
+
+    python benchmarks/fsm_storage.py --conversations 20000 --concurrency 1000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+
+from bot.services.fsm_storage import SQLiteStorage  # noqa: E402
+
+BOT_ID = 1
+CITIES = [{"id": i, "title": f"Город {i}"} for i in range(10)]
+
+
+async def conversation(storage, user_id: int, timings):
+    """One user going through the registration flow"""
+    key = StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id)
+    steps = [
+        lambda: storage.set_state(key, "RegistrationForm:full_name"),
+        lambda: storage.update_data(key, {"full_name": f"Пользователь {user_id}"}),
+        lambda: storage.set_state(key, "RegistrationForm:city"),
+        lambda: storage.update_data(key, {"cities": CITIES}),
+        lambda: storage.get_state(key),
+        lambda: storage.update_data(key, {"city_id": user_id % 10, "city_name": "Город"}),
+        lambda: storage.set_state(key, "RegistrationForm:phone"),
+        lambda: storage.get_data(key),
+    ]
+    if user_id % 2 == 0:
+        # Finished flow: state.clear()
+        steps += [lambda: storage.set_state(key, None), lambda: storage.set_data(key, {})]
+    for step in steps:
+        started = time.perf_counter()
+        await step()
+        timings.append((time.perf_counter() - started) * 1_000_000)
+
+
+async def run(storage, conversations: int, concurrency: int):
+    timings = []
+    started = time.perf_counter()
+    for first in range(0, conversations, concurrency):
+        users = range(first, min(first + concurrency, conversations))
+        await asyncio.gather(*(conversation(storage, user_id, timings) for user_id in users))
+    return timings, time.perf_counter() - started
+
+
+def report(name: str, timings, elapsed: float, memory: int):
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(
+        f"{name:<10} {len(timings) / elapsed:9.0f} ops/s   "
+        f"mean {statistics.mean(timings):6.1f} us   p50 {statistics.median(timings):6.1f} us   "
+        f"p99 {p99:7.1f} us   memory {memory / 1024 / 1024:6.1f} MiB"
+    )
+
+
+async def measure(make_storage, conversations: int, concurrency: int):
+    """Time one run, then measure the memory held by the storage in a second run"""
+    storage = make_storage()
+    timings, elapsed = await run(storage, conversations, concurrency)
+    await storage.close()
+
+    tracemalloc.start()
+    storage = make_storage()
+    await run(storage, conversations, concurrency)
+    if isinstance(storage, SQLiteStorage):
+        await storage.flush()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return storage, timings, elapsed, memory
+
+
+async def count_recovered(path: str, conversations: int) -> int:
+    """Open the database as a restarted bot would and count surviving states"""
+    storage = SQLiteStorage(path)
+    states = await asyncio.gather(*(
+        storage.get_state(StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id))
+        for user_id in range(conversations)
+    ))
+    await storage.close()
+    return sum(state is not None for state in states)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=20000, help="Number of conversations")
+    parser.add_argument("--concurrency", type=int, default=1000, help="Conversations running at once")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "fsm.sqlite3")
+        print(f"{args.conversations} conversations, {args.concurrency} at a time")
+
+        storage, timings, elapsed, memory = await measure(MemoryStorage, args.conversations, args.concurrency)
+        report("memory", timings, elapsed, memory)
+        print(f"{'':<10} {len(storage.storage)} records kept after the flows ended")
+
+        storage, timings, elapsed, memory = await measure(
+            lambda: SQLiteStorage(path), args.conversations, args.concurrency
+        )
+        report("sqlite", timings, elapsed, memory)
+        await storage.close()
+        size = sum(os.path.getsize(f"{path}{suffix}") for suffix in ("", "-wal") if os.path.exists(f"{path}{suffix}"))
+        print(
+            f"{'':<10} {storage.stats['flushes']} commits, {storage.stats['written']} rows written, "
+            f"{storage.stats['deleted']} cleared, database {size / 1024 / 1024:.1f} MiB"
+        )
+        recovered = await count_recovered(path, args.conversations)
+        print(f"{'':<10} {recovered} unfinished conversations recovered after restart (memory: 0)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""Throttling memory: per-user dicts that are never cleaned vs RateLimiter
+
+Feeds a stream of messages from distinct users (each writes a few times,
+then never again) with a simulated clock and reports how many users each
+approach keeps and how much memory it holds.
+
+    python benchmarks/throttling.py --users 1000000 --rate 2000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+
+from bot.config import THROTTLE_LIMITS  # noqa: E402
+from bot.services.rate_limiter import RateLimiter  # noqa: E402
+
+MESSAGES_PER_USER = 3
+
+
+class LastMessageThrottle:
+    """Previous approach: last message time per user in an unbounded defaultdict"""
+
+    def __init__(self):
+        self.user_last_message = defaultdict(lambda: datetime.min)
+
+    def allow(self, user_id: int) -> bool:
+        now = datetime.now()
+        if (now - self.user_last_message[user_id]).total_seconds() < 1:
+            return False
+        self.user_last_message[user_id] = now
+        return True
+
+
+def run(make_limiter, users: int, rate: float):
+    """Send MESSAGES_PER_USER messages per user, `rate` messages per simulated second"""
+    clock = [0.0]
+    tracemalloc.start()
+    limiter = make_limiter(lambda: clock[0])
+    started = time.perf_counter()
+    for user_id in range(users):
+        for _ in range(MESSAGES_PER_USER):
+            clock[0] += 1 / rate
+            limiter.allow(user_id)
+    elapsed = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return limiter, elapsed, memory
+
+
+def report(name: str, kept: int, elapsed: float, memory: int, users: int):
+    print(
+        f"{name:<22} {users * MESSAGES_PER_USER / elapsed:9.0f} checks/s   "
+        f"{kept:9d} users kept   memory {memory / 1024 / 1024:7.1f} MiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000000, help="Number of distinct users")
+    parser.add_argument("--rate", type=float, default=2000, help="Messages per second across all users")
+    args = parser.parse_args()
+
+    rate, burst = THROTTLE_LIMITS['message']
+    print(f"{args.users} users, {MESSAGES_PER_USER} messages each, {args.rate:.0f} messages/s")
+
+    for users in (args.users // 10, args.users):
+        limiter, elapsed, memory = run(lambda clock: LastMessageThrottle(), users, args.rate)
+        report(f"before: {users} users", len(limiter.user_last_message), elapsed, memory, users)
+        limiter, elapsed, memory = run(lambda clock: RateLimiter(rate, burst, clock=clock), users, args.rate)
+        report(f"after: {users} users", len(limiter), elapsed, memory, users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Webhook mode: update processing with a fake Telegram sender
+
+Starts the webhook app (bot/webhook.py) locally with a dispatcher whose
+handler only waits `--handler-ms` (standing in for API calls), and a fake
+Telegram that POSTs messages from many users, each user's messages one
+after another. Reports acknowledgement latency, time until an update is
+handled, how many requests were pushed back with 429/503, and checks that
+every user's messages were handled in order.
+
+    python benchmarks/webhook_pool.py --users 500 --messages 5 --handler-ms 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+
+import aiohttp  # noqa: E402
+from aiogram import Bot, Dispatcher, Router  # noqa: E402
+from aiogram.types import Message  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from bot.config import WEBHOOK_PATH, WEBHOOK_MAX_CONNECTIONS  # noqa: E402
+from bot.services.update_pool import UpdatePool  # noqa: E402
+from bot.webhook import create_app  # noqa: E402
+
+FAKE_TOKEN = "123456:benchmark"
+
+
+def build_dispatcher(handler_seconds: float, handled):
+    router = Router()
+
+    @router.message()
+    async def handle(message: Message):
+        await asyncio.sleep(handler_seconds)
+        handled.append((message.from_user.id, int(message.text), time.perf_counter()))
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+def make_update(update_id: int, user_id: int, seq: int):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "text": str(seq),
+        },
+    }
+
+
+async def fake_telegram(url: str, users: int, messages: int, sent_at, acks, statuses):
+    """Deliver updates like Telegram: per user in order, redelivering after 429/503"""
+    connector = aiohttp.TCPConnector(limit=WEBHOOK_MAX_CONNECTIONS)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def deliver_user(user_id: int):
+            for seq in range(messages):
+                update_id = user_id * messages + seq
+                while True:
+                    started = time.perf_counter()
+                    sent_at.setdefault((user_id, seq), started)
+                    async with session.post(url, json=make_update(update_id, user_id, seq)) as response:
+                        statuses[response.status] = statuses.get(response.status, 0) + 1
+                        acks.append(time.perf_counter() - started)
+                        if response.status == 200:
+                            break
+                        # Telegram backs off; scaled down to keep the benchmark short
+                        await asyncio.sleep(float(response.headers.get("Retry-After", 1)) / 20)
+
+        await asyncio.gather(*(deliver_user(user_id) for user_id in range(1, users + 1)))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(0, int(len(values) * fraction) - 1)]
+
+
+async def run(args, workers: int, queue_size: int):
+    handled = []
+    bot = Bot(token=FAKE_TOKEN)
+    dp = build_dispatcher(args.handler_ms / 1000, handled)
+    pool = UpdatePool(workers=workers, max_pending=queue_size, max_pending_per_user=args.user_queue)
+    app = create_app(bot, dp, pool, secret=None, webhook_url=None)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    sent_at, acks, statuses = {}, [], {}
+    started = time.perf_counter()
+    await fake_telegram(f"http://127.0.0.1:{port}{WEBHOOK_PATH}", args.users, args.messages, sent_at, acks, statuses)
+    await pool.join()
+    elapsed = time.perf_counter() - started
+    await runner.cleanup()
+
+    by_user = {}
+    for user_id, seq, _ in handled:
+        by_user.setdefault(user_id, []).append(seq)
+    in_order = all(seqs == sorted(seqs) for seqs in by_user.values())
+    latencies = [(handled_at - sent_at[(user_id, seq)]) * 1000 for user_id, seq, handled_at in handled]
+    pushed_back = sum(count for status, count in statuses.items() if status != 200)
+    print(
+        f"workers {workers:3d} queue {queue_size:5d}   {len(handled) / elapsed:7.0f} updates/s   "
+        f"ack p50 {statistics.median(acks) * 1000:5.1f} ms p99 {percentile(acks, 0.99) * 1000:5.1f} ms   "
+        f"handled p50 {statistics.median(latencies):7.1f} ms p99 {percentile(latencies, 0.99):7.1f} ms   "
+        f"429/503 {pushed_back:5d}   in order: {in_order}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500, help="Number of users sending messages")
+    parser.add_argument("--messages", type=int, default=5, help="Messages per user")
+    parser.add_argument("--handler-ms", type=float, default=50, help="Time one update takes to handle")
+    parser.add_argument("--user-queue", type=int, default=20, help="Updates waiting per user")
+    args = parser.parse_args()
+    # One log line per handled update would dominate the timings
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+
+    print(f"{args.users} users x {args.messages} messages, handler {args.handler_ms:.0f} ms")
+    await run(args, workers=8, queue_size=1000)
+    await run(args, workers=32, queue_size=1000)
+    await run(args, workers=128, queue_size=1000)
+    # Small queue: backpressure instead of unbounded memory
+    await run(args, workers=32, queue_size=50)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -13,6 +13,64 @@ if not BOT_TOKEN:
 # API configuration
 API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000/api")
 
+# API connection pool settings (one pooled client is shared by all handlers)
+API_POOL_LIMIT = 100  # Max open connections in total
+API_POOL_LIMIT_PER_HOST = 20  # Max open connections to the API host
+API_KEEPALIVE_SECONDS = 30  # How long idle keep-alive connections are reused
+API_DNS_CACHE_SECONDS = 300  # How long resolved API host addresses are cached
+API_CONNECT_TIMEOUT_SECONDS = 5  # Timeout for establishing a connection
+API_TIMEOUT_SECONDS = 15  # Default deadline for one API call, retries included
+
+# API failure handling (retries and circuit breaker in APIClient)
+API_RETRY_ATTEMPTS = 3  # Attempts per call for idempotent methods (GET, PUT, DELETE, ...)
+API_RETRY_BACKOFF_SECONDS = 0.2  # Base of the exponential backoff between attempts
+API_RETRY_MAX_BACKOFF_SECONDS = 2  # Cap of the backoff (actual delay is random up to it)
+API_BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+API_BREAKER_RESET_SECONDS = 30  # How long an open circuit rejects calls before a trial call
+
+# API response cache settings (reference data in APIClient)
+API_CACHE_MAX_ENTRIES = 512  # LRU bound on cached responses
+API_CACHE_STALE_SECONDS = 300  # Past TTL: served immediately while refreshed in background
+API_CACHE_ERROR_SECONDS = 3600  # Past TTL: served if the API is unreachable
+API_CACHE_TTL = {  # Seconds a response is fresh, per endpoint
+    'categories': 600,
+    'geo_positions': 600,
+    'clinics_rating': 60,
+    'doctors_by_category': 60,
+}
+
+# User profile cache (lookups by telegram_id in APIClient, one per process)
+API_PROFILE_CACHE_SECONDS = 300  # How long a registered user's profile is reused
+API_PROFILE_MISSING_SECONDS = 30  # How long "not registered" is remembered
+API_PROFILE_CACHE_MAX_ENTRIES = 10000  # LRU bound on cached profiles
+
+# FSM storage settings (SQLite database shared by bot processes)
+FSM_STORAGE_PATH = os.getenv("FSM_STORAGE_PATH", "fsm_storage.sqlite3")
+FSM_STATE_TTL_SECONDS = 86400  # Conversations idle for longer are expired (>= review cooldown)
+FSM_FLUSH_INTERVAL_SECONDS = 1  # Changes are committed in batches at least this often
+FSM_FLUSH_BATCH_SIZE = 500  # ...or as soon as this many conversations changed
+FSM_CACHE_SECONDS = 0  # How long a read state is reused (only safe with a single bot process)
+FSM_CACHE_MAX_ENTRIES = 10000  # LRU bound on cached conversations
+
+# Webhook mode settings (bot/webhook.py)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Public HTTPS URL of WEBHOOK_PATH; set on startup if given
+WEBHOOK_PATH = "/webhook"
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Checked against X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_MAX_CONNECTIONS = 40  # Concurrent connections Telegram may open to the webhook
+WEBHOOK_WORKERS = 32  # Updates processed concurrently (different users)
+WEBHOOK_QUEUE_SIZE = 1000  # Updates waiting in total; more are rejected with 503
+WEBHOOK_USER_QUEUE_SIZE = 20  # Updates waiting per user; more are rejected with 429
+WEBHOOK_RETRY_AFTER_SECONDS = 1  # Retry-After sent with 429/503
+WEBHOOK_SHUTDOWN_TIMEOUT_SECONDS = 10  # How long queued updates are processed on shutdown
+# Several instances: internal base URLs of all of them, in the same order everywhere
+# (e.g. "http://bot-1:8080,http://bot-2:8080"), and the position of this one in the list.
+# Each user is owned by one instance; others forward the user's updates to it
+WEBHOOK_INSTANCES = [url.strip().rstrip('/') for url in os.getenv("WEBHOOK_INSTANCES", "").split(',') if url.strip()]
+WEBHOOK_INSTANCE_INDEX = int(os.getenv("WEBHOOK_INSTANCE_INDEX", "0"))
+WEBHOOK_FORWARD_TIMEOUT_SECONDS = 5  # Deadline for handing an update over to its owner instance
+
 # Admin configuration
 ADMIN_TELEGRAM_ID = os.getenv("ADMIN_TELEGRAM_ID")
 if ADMIN_TELEGRAM_ID:
@@ -23,7 +81,13 @@ if ADMIN_TELEGRAM_ID:
 
 # Pagination settings
 ITEMS_PER_PAGE = 10
+DOCTOR_CARD_REVIEWS = 3  # Latest reviews shown on the doctor card
 
 # Throttling settings
-REVIEW_COOLDOWN_HOURS = 24  # Hours between reviews for the same doctor
+THROTTLE_LIMITS = {  # Per update type: (requests per second per user, burst)
+    'message': (1, 3),
+    'callback_query': (2, 5),
+}
+THROTTLE_MAX_USERS = 100000  # Bound on users tracked at once per update type
+REVIEW_COOLDOWN_HOURS = 24  # Hours between reviews for the same doctor (kept in FSM storage)
 
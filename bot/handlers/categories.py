@@ -1,32 +1,41 @@
 """Categories and doctors handlers"""
+from html import escape
+from typing import Optional
+
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
 from bot.services.api_client import APIClient
+from bot.services.review_cooldown import ReviewCooldown
 from bot.keyboards.inline import (
+    CATEGORIES_PAGE,
+    doctors_category_prefix,
+    doctor_reviews_prefix,
     get_categories_keyboard,
     get_doctors_keyboard,
     get_doctor_card_keyboard,
-    get_back_to_menu_keyboard
+    get_doctor_reviews_keyboard,
+    get_back_to_menu_keyboard,
+    get_cancel_keyboard
 )
 from bot.keyboards.reply import get_main_menu
-from bot.utils.formatters import format_doctor_card
+from bot.utils.formatters import format_doctor_card, format_reviews_list
+from bot.utils.pagination import Page, parse_cursor_callback
 from bot.states.review import ReviewForm
-from bot.config import ITEMS_PER_PAGE
+from bot.states.search import DoctorSearchForm
+from bot.config import ITEMS_PER_PAGE, DOCTOR_CARD_REVIEWS, REVIEW_COOLDOWN_HOURS
 
 router = Router()
 
 
 @router.message(F.text == "Категории")
-async def show_categories(message: Message, state: FSMContext):
+async def show_categories(message: Message, state: FSMContext, api_client: APIClient):
     """Show categories list"""
-    api_client = APIClient()
-    
     try:
-        categories = await api_client.get_categories()
+        categories_page = await api_client.get_categories()
         
-        if not categories:
+        if not categories_page:
             await message.answer(
                 "Категории врачей\n\n"
                 "К сожалению, категории пока не добавлены.",
@@ -36,7 +45,7 @@ async def show_categories(message: Message, state: FSMContext):
         
         await message.answer(
             "<b>Выберите категорию врача:</b>",
-            reply_markup=get_categories_keyboard(categories, page=0, items_per_page=ITEMS_PER_PAGE),
+            reply_markup=get_categories_keyboard(categories_page),
             parse_mode="HTML"
         )
     except Exception as e:
@@ -44,38 +53,39 @@ async def show_categories(message: Message, state: FSMContext):
             f"Ошибка при загрузке категорий: {str(e)}",
             reply_markup=get_main_menu()
         )
-    finally:
-        await api_client.close()
 
 
-@router.callback_query(F.data.startswith("categories_page_"))
-async def process_categories_pagination(callback: CallbackQuery):
-    """Process categories pagination"""
-    page = int(callback.data.split("_")[2])
+@router.callback_query(F.data.startswith(CATEGORIES_PAGE))
+async def process_categories_pagination(callback: CallbackQuery, api_client: APIClient):
+    """Process categories pagination (loads only the requested page)"""
+    page = int(callback.data[len(CATEGORIES_PAGE):])
     
-    api_client = APIClient()
     try:
-        categories = await api_client.get_categories()
+        categories_page = await api_client.get_categories(page=page)
         await callback.message.edit_reply_markup(
-            reply_markup=get_categories_keyboard(categories, page=page, items_per_page=ITEMS_PER_PAGE)
+            reply_markup=get_categories_keyboard(categories_page)
         )
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
+
+
+def get_category_name(doctors_page) -> str:
+    """Category title taken from the first doctor of the page"""
+    first = doctors_page.items[0] if doctors_page.items else {}
+    category = first.get('category') or {}
+    return category.get('title', 'Категория')
 
 
 @router.callback_query(F.data.startswith("category_"))
-async def show_doctors_by_category(callback: CallbackQuery, state: FSMContext):
+async def show_doctors_by_category(callback: CallbackQuery, state: FSMContext, api_client: APIClient):
     """Show doctors by category"""
     category_id = int(callback.data.split("_")[1])
     
-    api_client = APIClient()
     try:
-        doctors = await api_client.get_doctors_by_category(category_id)
+        doctors_page = await api_client.get_doctors_by_category(category_id)
         
-        if not doctors:
+        if not doctors_page:
             await callback.message.edit_text(
                 "Врачи\n\n"
                 "В этой категории пока нет врачей.",
@@ -84,70 +94,107 @@ async def show_doctors_by_category(callback: CallbackQuery, state: FSMContext):
             await callback.answer()
             return
         
-        # Store category_id in state for pagination
-        await state.update_data(category_id=category_id)
-        
-        category_name = doctors[0].get('category', {}).get('title', 'Категория') if doctors and doctors[0].get('category') else 'Категория'
+        # Store category_id in state for "back" navigation
+        await state.update_data(category_id=category_id, search_query=None)
         
         await callback.message.edit_text(
-            f"<b>Врачи категории: {category_name}</b>\n\n"
+            f"<b>Врачи категории: {get_category_name(doctors_page)}</b>\n\n"
             "Выберите врача:",
-            reply_markup=get_doctors_keyboard(doctors, page=0, items_per_page=ITEMS_PER_PAGE, category_id=category_id),
+            reply_markup=get_doctors_keyboard(doctors_page, doctors_category_prefix(category_id)),
             parse_mode="HTML"
         )
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
 
 
-@router.callback_query(F.data.startswith("doctors_page_"))
-async def process_doctors_pagination(callback: CallbackQuery, state: FSMContext):
-    """Process doctors pagination"""
-    parts = callback.data.split("_")
-    page = int(parts[2])
-    category_id = None
-    
-    # Check if category_id is in callback data
-    if len(parts) > 3 and parts[3] == "cat":
-        category_id = int(parts[4])
+@router.callback_query(F.data.regexp(r"^dc_\d+_"))
+async def process_doctors_pagination(callback: CallbackQuery, api_client: APIClient):
+    """Process doctors by category pagination (cursor is carried in callback_data)"""
+    category_id = int(callback.data.split("_")[1])
+    prefix = doctors_category_prefix(category_id)
+    cursor = parse_cursor_callback(callback.data, prefix)
     
-    api_client = APIClient()
     try:
-        if category_id:
-            doctors = await api_client.get_doctors_by_category(category_id)
-        else:
-            doctors = await api_client.get_all_doctors()
-        
+        doctors_page = await api_client.get_doctors_by_category(category_id, cursor=cursor)
         await callback.message.edit_reply_markup(
-            reply_markup=get_doctors_keyboard(doctors, page=page, items_per_page=ITEMS_PER_PAGE, category_id=category_id)
+            reply_markup=get_doctors_keyboard(doctors_page, prefix)
         )
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
+
+
+@router.message(F.text == "Поиск врача")
+async def start_doctor_search(message: Message, state: FSMContext):
+    """Ask for doctor name to search"""
+    await message.answer(
+        "<b>Поиск врача</b>\n\n"
+        "Введите фамилию, имя, специальность или клинику (можно начало слова):",
+        reply_markup=get_cancel_keyboard(),
+        parse_mode="HTML"
+    )
+    await state.set_state(DoctorSearchForm.query)
+
+
+@router.message(DoctorSearchForm.query, F.text)
+async def process_doctor_search(message: Message, state: FSMContext, api_client: APIClient):
+    """Search doctors and show results"""
+    query = message.text.strip()
+    
+    if len(query) < 2:
+        await message.answer(
+            "Запрос слишком короткий (минимум 2 символа). Попробуйте еще раз:",
+            reply_markup=get_cancel_keyboard()
+        )
+        return
+    
+    try:
+        doctors = await api_client.search_doctors(query, limit=ITEMS_PER_PAGE)
+        
+        if not doctors:
+            await message.answer(
+                "По вашему запросу врачи не найдены. Попробуйте другой запрос:",
+                reply_markup=get_cancel_keyboard()
+            )
+            return
+        
+        await state.set_state(None)
+        await state.update_data(search_query=query, category_id=None)
+        
+        await message.answer(
+            f"<b>Результаты поиска: {escape(query)}</b>\n\n"
+            "Выберите врача:",
+            reply_markup=get_doctors_keyboard(Page(items=doctors)),
+            parse_mode="HTML"
+        )
+    except Exception as e:
+        await message.answer(
+            f"Ошибка при поиске врачей: {str(e)}",
+            reply_markup=get_main_menu()
+        )
 
 
 @router.callback_query(F.data.startswith("doctor_"))
-async def show_doctor_card(callback: CallbackQuery, state: FSMContext):
+async def show_doctor_card(callback: CallbackQuery, state: FSMContext, api_client: APIClient):
     """Show doctor card"""
     doctor_id = int(callback.data.split("_")[1])
     
-    api_client = APIClient()
     try:
-        doctor = await api_client.get_doctor(doctor_id)
+        # Doctor, rating distribution and latest reviews in one request
+        card = await api_client.get_doctor_card(
+            doctor_id,
+            telegram_id=callback.from_user.id,
+            page_size=DOCTOR_CARD_REVIEWS
+        )
         
-        if not doctor or not doctor.get('doctor'):
+        if not card:
             await callback.answer("Врач не найден", show_alert=True)
             return
         
-        # Add rating and reviews count
-        doctor['rating'] = doctor.get('rating')
-        doctor['reviews_count'] = doctor.get('reviews_count', 0)
-        
-        card_text = format_doctor_card(doctor)
+        card_text = format_doctor_card(card['doctor'], card['rating_histogram'], card['reviews']['results'])
+        if card['viewer']['has_reviewed']:
+            card_text += "\n<i>Вы уже оставили отзыв этому врачу.</i>"
         
         await state.update_data(current_doctor_id=doctor_id)
         
@@ -159,33 +206,46 @@ async def show_doctor_card(callback: CallbackQuery, state: FSMContext):
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
 
 
 @router.callback_query(F.data.startswith("review_doctor_"))
-async def start_review(callback: CallbackQuery, state: FSMContext):
+async def start_review(
+    callback: CallbackQuery,
+    state: FSMContext,
+    api_client: APIClient,
+    review_cooldown: ReviewCooldown
+):
     """Start review creation process"""
     doctor_id = int(callback.data.split("_")[2])
     
-    api_client = APIClient()
     try:
-        # Check if user exists
-        user = await api_client.get_user_by_telegram_id(callback.from_user.id)
-        if not user:
+        # Cooldown is checked locally, before any API request
+        if not await review_cooldown.can_review(state, doctor_id):
+            await callback.answer(
+                f"Вы недавно оставляли отзыв этому врачу. Повторить можно через {REVIEW_COOLDOWN_HOURS} ч.",
+                show_alert=True
+            )
+            return
+        
+        # Registration and an existing review are checked in one request
+        card = await api_client.get_doctor_card(doctor_id, telegram_id=callback.from_user.id, page_size=1)
+        if not card:
+            await callback.answer("Врач не найден", show_alert=True)
+            return
+        
+        viewer = card['viewer']
+        if viewer['user_id'] is None:
             await callback.answer("Сначала зарегистрируйтесь через /start", show_alert=True)
             return
         
-        # Check if review already exists
-        review_exists = await api_client.check_review_exists(user['id'], doctor_id)
-        if review_exists:
+        if viewer['has_reviewed']:
             await callback.answer(
                 "Вы уже оставляли отзыв этому врачу. Можно оставить только один отзыв.",
                 show_alert=True
             )
             return
         
-        await state.update_data(doctor_id=doctor_id, user_id=user['id'])
+        await state.update_data(doctor_id=doctor_id, user_id=viewer['user_id'])
         
         from bot.keyboards.inline import get_rating_keyboard
         
@@ -199,87 +259,103 @@ async def start_review(callback: CallbackQuery, state: FSMContext):
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
 
 
-@router.callback_query(F.data.startswith("view_reviews_"))
-async def view_doctor_reviews(callback: CallbackQuery):
-    """View reviews for a doctor"""
-    doctor_id = int(callback.data.split("_")[2])
+async def show_doctor_reviews_page(
+    callback: CallbackQuery,
+    api_client: APIClient,
+    doctor_id: int,
+    cursor: Optional[str] = None
+):
+    """Render one page of doctor reviews (a single API request)"""
+    reviews_page = await api_client.get_doctor_reviews(doctor_id, cursor=cursor)
     
-    api_client = APIClient()
-    try:
-        reviews = await api_client.get_reviews_by_doctor(doctor_id)
-        
-        if not reviews:
-            await callback.message.edit_text(
-                "<b>Отзывы о враче</b>\n\n"
-                "Пока нет отзывов.",
-                reply_markup=get_back_to_menu_keyboard(),
-                parse_mode="HTML"
-            )
-            await callback.answer()
-            return
-        
-        from bot.utils.formatters import format_reviews_list
-        
-        text = format_reviews_list(reviews, "Отзывы о враче")
-        
+    if not reviews_page:
         await callback.message.edit_text(
-            text,
-            reply_markup=get_back_to_menu_keyboard(),
+            "<b>Отзывы о враче</b>\n\n"
+            "Пока нет отзывов.",
+            reply_markup=get_doctor_reviews_keyboard(doctor_id, reviews_page),
             parse_mode="HTML"
         )
+        return
+    
+    await callback.message.edit_text(
+        format_reviews_list(reviews_page.items, "Отзывы о враче"),
+        reply_markup=get_doctor_reviews_keyboard(doctor_id, reviews_page),
+        parse_mode="HTML"
+    )
+
+
+@router.callback_query(F.data.startswith("view_reviews_"))
+async def view_doctor_reviews(callback: CallbackQuery, api_client: APIClient):
+    """View reviews for a doctor (newest first)"""
+    doctor_id = int(callback.data.split("_")[2])
+    
+    try:
+        await show_doctor_reviews_page(callback, api_client, doctor_id)
+        await callback.answer()
+    except Exception as e:
+        await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
+
+
+@router.callback_query(F.data.regexp(r"^rd_\d+_"))
+async def process_doctor_reviews_pagination(callback: CallbackQuery, api_client: APIClient):
+    """Process doctor reviews pagination (cursor is carried in callback_data)"""
+    doctor_id = int(callback.data.split("_")[1])
+    cursor = parse_cursor_callback(callback.data, doctor_reviews_prefix(doctor_id))
+    
+    try:
+        await show_doctor_reviews_page(callback, api_client, doctor_id, cursor)
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
 
 
 @router.callback_query(F.data == "back_to_categories")
-async def back_to_categories(callback: CallbackQuery, state: FSMContext):
+async def back_to_categories(callback: CallbackQuery, state: FSMContext, api_client: APIClient):
     """Go back to categories"""
     await state.clear()
     
-    api_client = APIClient()
     try:
-        categories = await api_client.get_categories()
+        categories_page = await api_client.get_categories()
         await callback.message.edit_text(
             "<b>Выберите категорию врача:</b>",
-            reply_markup=get_categories_keyboard(categories, page=0, items_per_page=ITEMS_PER_PAGE),
+            reply_markup=get_categories_keyboard(categories_page),
             parse_mode="HTML"
         )
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
 
 
 @router.callback_query(F.data == "back_to_doctors")
-async def back_to_doctors(callback: CallbackQuery, state: FSMContext):
+async def back_to_doctors(callback: CallbackQuery, state: FSMContext, api_client: APIClient):
     """Go back to doctors list"""
     data = await state.get_data()
     category_id = data.get('category_id')
+    search_query = data.get('search_query')
     
-    api_client = APIClient()
     try:
-        if category_id:
-            doctors = await api_client.get_doctors_by_category(category_id)
-            category_name = doctors[0].get('category', {}).get('title', 'Категория') if doctors and doctors[0].get('category') else 'Категория'
+        if search_query:
+            doctors = await api_client.search_doctors(search_query, limit=ITEMS_PER_PAGE)
             await callback.message.edit_text(
-                f"<b>Врачи категории: {category_name}</b>\n\n"
+                f"<b>Результаты поиска: {escape(search_query)}</b>\n\n"
                 "Выберите врача:",
-                reply_markup=get_doctors_keyboard(doctors, page=0, items_per_page=ITEMS_PER_PAGE, category_id=category_id),
+                reply_markup=get_doctors_keyboard(Page(items=doctors)),
+                parse_mode="HTML"
+            )
+        elif category_id:
+            doctors_page = await api_client.get_doctors_by_category(category_id)
+            await callback.message.edit_text(
+                f"<b>Врачи категории: {get_category_name(doctors_page)}</b>\n\n"
+                "Выберите врача:",
+                reply_markup=get_doctors_keyboard(doctors_page, doctors_category_prefix(category_id)),
                 parse_mode="HTML"
             )
         else:
             await callback.answer("Не удалось вернуться к списку врачей", show_alert=True)
+            return
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
 
@@ -20,7 +20,7 @@ async def handle_unknown_message(message: Message, state: FSMContext):
     
     # Check if it's a known menu command (should be handled by other routers)
     known_commands = [
-        "Категории", "Рейтинг врачей", "Рейтинг клиник",
+        "Категории", "Поиск врача", "Рейтинг врачей", "Рейтинг клиник",
         "Мои отзывы", "Тех поддержка", "В меню", "Главное меню", "Меню"
     ]
     
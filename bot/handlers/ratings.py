@@ -1,32 +1,72 @@
 """Ratings handlers for doctors and clinics"""
+from typing import Optional
+
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
 from bot.services.api_client import APIClient
 from bot.keyboards.inline import (
+    CLINICS_PAGE,
+    CLINIC_REVIEWS_ORDERINGS,
+    DOCTORS_RATING_PAGE,
+    clinic_reviews_prefix,
     get_doctors_keyboard,
     get_clinics_keyboard,
     get_doctor_card_keyboard,
     get_clinic_card_keyboard,
+    get_clinic_reviews_keyboard,
     get_back_to_menu_keyboard
 )
 from bot.keyboards.reply import get_main_menu
-from bot.utils.formatters import format_doctor_card, format_clinic_card
-from bot.config import ITEMS_PER_PAGE
+from bot.utils.formatters import format_doctor_card, format_clinic_card, format_reviews_list
+from bot.utils.pagination import Page, parse_cursor_callback
 
 router = Router()
 
 
+def format_doctors_rating(doctors_page: Page) -> str:
+    """Format one page of the doctors rating"""
+    text = "<b>Топ врачей по рейтингу</b>\n\n"
+    for i, doctor in enumerate(doctors_page.items, 1):
+        name = doctor.get('detail', 'Врач')
+        category = doctor.get('category', {}).get('title', '') if doctor.get('category') else ''
+        clinic = doctor.get('clinic', {}).get('title', '') if doctor.get('clinic') else ''
+        rating = doctor.get('rating', 0)
+        reviews_count = doctor.get('reviews_count', 0)
+        
+        text += f"{i}. {name}"
+        if category:
+            text += f" ({category})"
+        if clinic:
+            text += f" - {clinic}"
+        text += f" Рейтинг: {rating:.1f} ({reviews_count} отзывов)\n"
+    return text
+
+
+def format_clinics_rating(clinics_page: Page) -> str:
+    """Format one page of the clinics rating"""
+    text = "<b>Топ клиник по рейтингу</b>\n\n"
+    for i, clinic in enumerate(clinics_page.items, 1):
+        name = clinic.get('title', 'Клиника')
+        address = clinic.get('address', '')
+        rating = clinic.get('rating', 0)
+        reviews_count = clinic.get('reviews_count', 0)
+        
+        text += f"{i}. {name}"
+        if address:
+            text += f" ({address[:30]}...)" if len(address) > 30 else f" ({address})"
+        text += f" Рейтинг: {rating:.1f} ({reviews_count} отзывов)\n"
+    return text
+
+
 @router.message(F.text == "Рейтинг врачей")
-async def show_doctors_rating(message: Message, state: FSMContext):
+async def show_doctors_rating(message: Message, state: FSMContext, api_client: APIClient):
     """Show top doctors by rating"""
-    api_client = APIClient()
-    
     try:
-        doctors = await api_client.get_doctors_rating()
+        doctors_page = await api_client.get_doctors_rating()
         
-        if not doctors:
+        if not doctors_page:
             await message.answer(
                 "<b>Рейтинг врачей</b>\n\n"
                 "Пока нет врачей с отзывами.",
@@ -35,25 +75,9 @@ async def show_doctors_rating(message: Message, state: FSMContext):
             )
             return
         
-        # Format top doctors list
-        text = "<b>Топ врачей по рейтингу</b>\n\n"
-        for i, doctor in enumerate(doctors[:10], 1):  # Show top 10 in message
-            name = doctor.get('detail', 'Врач')
-            category = doctor.get('category', {}).get('title', '') if doctor.get('category') else ''
-            clinic = doctor.get('clinic', {}).get('title', '') if doctor.get('clinic') else ''
-            rating = doctor.get('rating', 0)
-            reviews_count = doctor.get('reviews_count', 0)
-            
-            text += f"{i}. {name}"
-            if category:
-                text += f" ({category})"
-            if clinic:
-                text += f" - {clinic}"
-            text += f" Рейтинг: {rating:.1f} ({reviews_count} отзывов)\n"
-        
         await message.answer(
-            text,
-            reply_markup=get_doctors_keyboard(doctors, page=0, items_per_page=ITEMS_PER_PAGE),
+            format_doctors_rating(doctors_page),
+            reply_markup=get_doctors_keyboard(doctors_page, DOCTORS_RATING_PAGE),
             parse_mode="HTML"
         )
     except Exception as e:
@@ -61,19 +85,32 @@ async def show_doctors_rating(message: Message, state: FSMContext):
             f"Ошибка при загрузке рейтинга врачей: {str(e)}",
             reply_markup=get_main_menu()
         )
-    finally:
-        await api_client.close()
+
+
+@router.callback_query(F.data.startswith(DOCTORS_RATING_PAGE))
+async def process_doctors_rating_pagination(callback: CallbackQuery, api_client: APIClient):
+    """Process doctors rating pagination (cursor is carried in callback_data)"""
+    cursor = parse_cursor_callback(callback.data, DOCTORS_RATING_PAGE)
+    
+    try:
+        doctors_page = await api_client.get_doctors_rating(cursor=cursor)
+        await callback.message.edit_text(
+            format_doctors_rating(doctors_page),
+            reply_markup=get_doctors_keyboard(doctors_page, DOCTORS_RATING_PAGE),
+            parse_mode="HTML"
+        )
+        await callback.answer()
+    except Exception as e:
+        await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
 
 
 @router.message(F.text == "Рейтинг клиник")
-async def show_clinics_rating(message: Message, state: FSMContext):
+async def show_clinics_rating(message: Message, state: FSMContext, api_client: APIClient):
     """Show top clinics by rating"""
-    api_client = APIClient()
-    
     try:
-        clinics = await api_client.get_clinics_rating()
+        clinics_page = await api_client.get_clinics_rating()
         
-        if not clinics:
+        if not clinics_page:
             await message.answer(
                 "<b>Рейтинг клиник</b>\n\n"
                 "Пока нет клиник с отзывами.",
@@ -82,22 +119,9 @@ async def show_clinics_rating(message: Message, state: FSMContext):
             )
             return
         
-        # Format top clinics list
-        text = "<b>Топ клиник по рейтингу</b>\n\n"
-        for i, clinic in enumerate(clinics[:10], 1):  # Show top 10 in message
-            name = clinic.get('title', 'Клиника')
-            address = clinic.get('address', '')
-            rating = clinic.get('rating', 0)
-            reviews_count = clinic.get('reviews_count', 0)
-            
-            text += f"{i}. {name}"
-            if address:
-                text += f" ({address[:30]}...)" if len(address) > 30 else f" ({address})"
-            text += f" Рейтинг: {rating:.1f} ({reviews_count} отзывов)\n"
-        
         await message.answer(
-            text,
-            reply_markup=get_clinics_keyboard(clinics, page=0, items_per_page=ITEMS_PER_PAGE),
+            format_clinics_rating(clinics_page),
+            reply_markup=get_clinics_keyboard(clinics_page),
             parse_mode="HTML"
         )
     except Exception as e:
@@ -105,34 +129,30 @@ async def show_clinics_rating(message: Message, state: FSMContext):
             f"Ошибка при загрузке рейтинга клиник: {str(e)}",
             reply_markup=get_main_menu()
         )
-    finally:
-        await api_client.close()
 
 
-@router.callback_query(F.data.startswith("clinics_page_"))
-async def process_clinics_pagination(callback: CallbackQuery):
-    """Process clinics pagination"""
-    page = int(callback.data.split("_")[2])
+@router.callback_query(F.data.startswith(CLINICS_PAGE))
+async def process_clinics_pagination(callback: CallbackQuery, api_client: APIClient):
+    """Process clinics pagination (cursor is carried in callback_data)"""
+    cursor = parse_cursor_callback(callback.data, CLINICS_PAGE)
     
-    api_client = APIClient()
     try:
-        clinics = await api_client.get_clinics_rating()
-        await callback.message.edit_reply_markup(
-            reply_markup=get_clinics_keyboard(clinics, page=page, items_per_page=ITEMS_PER_PAGE)
+        clinics_page = await api_client.get_clinics_rating(cursor=cursor)
+        await callback.message.edit_text(
+            format_clinics_rating(clinics_page),
+            reply_markup=get_clinics_keyboard(clinics_page),
+            parse_mode="HTML"
         )
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
 
 
 @router.callback_query(F.data.startswith("clinic_"))
-async def show_clinic_card(callback: CallbackQuery, state: FSMContext):
+async def show_clinic_card(callback: CallbackQuery, state: FSMContext, api_client: APIClient):
     """Show clinic card"""
     clinic_id = int(callback.data.split("_")[1])
     
-    api_client = APIClient()
     try:
         clinic = await api_client.get_clinic(clinic_id)
         
@@ -156,89 +176,75 @@ async def show_clinic_card(callback: CallbackQuery, state: FSMContext):
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
 
 
-@router.callback_query(F.data.startswith("view_clinic_reviews_"))
-async def view_clinic_reviews(callback: CallbackQuery):
-    """View reviews for a clinic (through its doctors)"""
-    clinic_id = int(callback.data.split("_")[3])
+async def show_clinic_reviews_page(
+    callback: CallbackQuery,
+    api_client: APIClient,
+    clinic_id: int,
+    sort: str = 'd',
+    cursor: Optional[str] = None
+):
+    """Render one page of clinic reviews (a single API request)"""
+    reviews_page = await api_client.get_clinic_reviews(
+        clinic_id, ordering=CLINIC_REVIEWS_ORDERINGS[sort], cursor=cursor
+    )
     
-    api_client = APIClient()
-    try:
-        # Get all doctors of the clinic
-        doctors = await api_client.get_all_doctors(clinic_id=clinic_id)
-        
-        if not doctors:
-            await callback.message.edit_text(
-                "<b>Отзывы о клинике</b>\n\n"
-                "В этой клинике пока нет врачей.",
-                reply_markup=get_back_to_menu_keyboard(),
-                parse_mode="HTML"
-            )
-            await callback.answer()
-            return
-        
-        # Get all reviews for doctors of this clinic
-        all_reviews = []
-        for doctor in doctors:
-            reviews = await api_client.get_reviews_by_doctor(doctor['id'])
-            all_reviews.extend(reviews)
-        
-        if not all_reviews:
-            await callback.message.edit_text(
-                "<b>Отзывы о клинике</b>\n\n"
-                "Пока нет отзывов.",
-                reply_markup=get_back_to_menu_keyboard(),
-                parse_mode="HTML"
-            )
-            await callback.answer()
-            return
-        
-        from bot.utils.formatters import format_reviews_list
-        
-        text = format_reviews_list(all_reviews, "Отзывы о клинике")
-        
+    if not reviews_page:
         await callback.message.edit_text(
-            text,
+            "<b>Отзывы о клинике</b>\n\n"
+            "Пока нет отзывов.",
             reply_markup=get_back_to_menu_keyboard(),
             parse_mode="HTML"
         )
+        return
+    
+    await callback.message.edit_text(
+        format_reviews_list(reviews_page.items, "Отзывы о клинике"),
+        reply_markup=get_clinic_reviews_keyboard(clinic_id, reviews_page, sort),
+        parse_mode="HTML"
+    )
+
+
+@router.callback_query(F.data.startswith("view_clinic_reviews_"))
+async def view_clinic_reviews(callback: CallbackQuery, api_client: APIClient):
+    """View reviews for a clinic (newest first)"""
+    clinic_id = int(callback.data.split("_")[3])
+    
+    try:
+        await show_clinic_reviews_page(callback, api_client, clinic_id)
+        await callback.answer()
+    except Exception as e:
+        await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
+
+
+@router.callback_query(F.data.regexp(r"^cr[dr]_\d+_"))
+async def process_clinic_reviews_pagination(callback: CallbackQuery, api_client: APIClient):
+    """Process clinic reviews pagination and sort switching (cursor is carried in callback_data)"""
+    sort_code, clinic_id, _ = callback.data.split("_", 2)
+    sort = sort_code[2:]
+    clinic_id = int(clinic_id)
+    cursor = parse_cursor_callback(callback.data, clinic_reviews_prefix(clinic_id, sort))
+    
+    try:
+        await show_clinic_reviews_page(callback, api_client, clinic_id, sort, cursor)
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
 
 
 @router.callback_query(F.data == "back_to_clinics")
-async def back_to_clinics(callback: CallbackQuery):
+async def back_to_clinics(callback: CallbackQuery, api_client: APIClient):
     """Go back to clinics list"""
-    api_client = APIClient()
     try:
-        clinics = await api_client.get_clinics_rating()
-        
-        text = "<b>Топ клиник по рейтингу</b>\n\n"
-        for i, clinic in enumerate(clinics[:10], 1):
-            name = clinic.get('title', 'Клиника')
-            address = clinic.get('address', '')
-            rating = clinic.get('rating', 0)
-            reviews_count = clinic.get('reviews_count', 0)
-            
-            text += f"{i}. {name}"
-            if address:
-                text += f" ({address[:30]}...)" if len(address) > 30 else f" ({address})"
-            text += f" Рейтинг: {rating:.1f} ({reviews_count} отзывов)\n"
+        clinics_page = await api_client.get_clinics_rating()
         
         await callback.message.edit_text(
-            text,
-            reply_markup=get_clinics_keyboard(clinics, page=0, items_per_page=ITEMS_PER_PAGE),
+            format_clinics_rating(clinics_page),
+            reply_markup=get_clinics_keyboard(clinics_page),
             parse_mode="HTML"
         )
         await callback.answer()
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
 
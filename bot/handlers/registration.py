@@ -9,10 +9,9 @@ from bot.keyboards.reply import (
     get_phone_keyboard,
     get_confirm_keyboard
 )
-from bot.keyboards.inline import get_cities_keyboard, get_back_to_menu_keyboard
+from bot.keyboards.inline import CITIES_PAGE, get_cities_keyboard, get_back_to_menu_keyboard
 from bot.states.registration import RegistrationForm
 from bot.utils.formatters import format_registration_summary
-from bot.config import ITEMS_PER_PAGE
 
 router = Router()
 
@@ -40,7 +39,7 @@ async def process_refusal(message: Message, state: FSMContext):
 
 
 @router.message(RegistrationForm.full_name)
-async def process_full_name(message: Message, state: FSMContext):
+async def process_full_name(message: Message, state: FSMContext, api_client: APIClient):
     """Process full name input"""
     full_name = message.text.strip()
     
@@ -60,15 +59,14 @@ async def process_full_name(message: Message, state: FSMContext):
     await state.update_data(full_name=full_name)
     
     # Get cities list
-    api_client = APIClient()
     try:
-        cities = await api_client.get_geo_positions()
-        if cities:
+        cities_page = await api_client.get_geo_positions()
+        if cities_page.items:
             await message.answer(
                 "Выберите ваш город:",
-                reply_markup=get_cities_keyboard(cities, page=0, items_per_page=ITEMS_PER_PAGE)
+                reply_markup=get_cities_keyboard(cities_page)
             )
-            await state.update_data(cities=cities)
+            await state.update_data(cities=cities_page.items)
             await state.set_state(RegistrationForm.city)
         else:
             await message.answer(
@@ -82,16 +80,13 @@ async def process_full_name(message: Message, state: FSMContext):
             reply_markup=None
         )
         await state.set_state(RegistrationForm.city)
-    finally:
-        await api_client.close()
 
 
 @router.callback_query(RegistrationForm.city, F.data.startswith("city_"))
-async def process_city_selection(callback: CallbackQuery, state: FSMContext):
+async def process_city_selection(callback: CallbackQuery, state: FSMContext, api_client: APIClient):
     """Process city selection from inline keyboard"""
     city_id = int(callback.data.split("_")[1])
     
-    api_client = APIClient()
     try:
         cities = (await state.get_data()).get('cities', [])
         city = next((c for c in cities if c.get('id') == city_id), None)
@@ -113,21 +108,23 @@ async def process_city_selection(callback: CallbackQuery, state: FSMContext):
             await callback.answer("Город не найден", show_alert=True)
     except Exception as e:
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
-    finally:
-        await api_client.close()
 
 
-@router.callback_query(RegistrationForm.city, F.data.startswith("cities_page_"))
-async def process_cities_pagination(callback: CallbackQuery, state: FSMContext):
-    """Process cities pagination"""
-    page = int(callback.data.split("_")[2])
-    data = await state.get_data()
-    cities = data.get('cities', [])
+@router.callback_query(RegistrationForm.city, F.data.startswith(CITIES_PAGE))
+async def process_cities_pagination(callback: CallbackQuery, state: FSMContext, api_client: APIClient):
+    """Process cities pagination (loads only the requested page)"""
+    page = int(callback.data[len(CITIES_PAGE):])
     
-    await callback.message.edit_reply_markup(
-        reply_markup=get_cities_keyboard(cities, page=page, items_per_page=ITEMS_PER_PAGE)
-    )
-    await callback.answer()
+    try:
+        cities_page = await api_client.get_geo_positions(page=page)
+        # Cities of the shown page are needed to resolve the selected city
+        await state.update_data(cities=cities_page.items)
+        await callback.message.edit_reply_markup(
+            reply_markup=get_cities_keyboard(cities_page)
+        )
+        await callback.answer()
+    except Exception as e:
+        await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
 
 
 @router.message(RegistrationForm.city)
@@ -194,11 +191,10 @@ async def show_registration_summary(message: Message, state: FSMContext):
 
 
 @router.message(RegistrationForm.confirm, F.text == "Подтвердить")
-async def process_confirmation(message: Message, state: FSMContext):
+async def process_confirmation(message: Message, state: FSMContext, api_client: APIClient):
     """Process registration confirmation"""
     data = await state.get_data()
     
-    api_client = APIClient()
     try:
         # Create user via API
         user = await api_client.create_user(
@@ -220,8 +216,6 @@ async def process_confirmation(message: Message, state: FSMContext):
             "Попробуйте позже или обратитесь в поддержку.",
             reply_markup=None
         )
-    finally:
-        await api_client.close()
 
 
 @router.message(RegistrationForm.confirm, F.text == "Изменить")
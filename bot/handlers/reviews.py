@@ -4,6 +4,7 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
 from bot.services.api_client import APIClient
+from bot.services.review_cooldown import ReviewCooldown
 from bot.keyboards.inline import (
     get_rating_keyboard,
     get_cancel_keyboard,
@@ -45,7 +46,12 @@ async def cancel_review(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(ReviewForm.text, F.text)
-async def process_review_text(message: Message, state: FSMContext):
+async def process_review_text(
+    message: Message,
+    state: FSMContext,
+    api_client: APIClient,
+    review_cooldown: ReviewCooldown
+):
     """Process review text"""
     text = message.text.strip()
     
@@ -68,7 +74,6 @@ async def process_review_text(message: Message, state: FSMContext):
     user_id = data.get('user_id')
     rating = data.get('rating')
     
-    api_client = APIClient()
     try:
         # Create review
         review = await api_client.create_review(
@@ -77,6 +82,7 @@ async def process_review_text(message: Message, state: FSMContext):
             rating=rating,
             detail=text
         )
+        await review_cooldown.record(state, doctor_id)
         
         await message.answer(
             "<b>Отзыв успешно добавлен!</b>\n\n"
@@ -87,7 +93,7 @@ async def process_review_text(message: Message, state: FSMContext):
         await state.clear()
     except Exception as e:
         error_msg = str(e)
-        if "already exists" in error_msg.lower() or "уже" in error_msg.lower():
+        if "API Error 409" in error_msg or "уже" in error_msg.lower():
             await message.answer(
                 "Вы уже оставляли отзыв этому врачу. Можно оставить только один отзыв.",
                 reply_markup=get_main_menu()
@@ -97,8 +103,6 @@ async def process_review_text(message: Message, state: FSMContext):
                 f"Ошибка при создании отзыва: {error_msg}",
                 reply_markup=get_main_menu()
             )
-    finally:
-        await api_client.close()
 
 
 @router.callback_query(F.data == "cancel")
@@ -113,10 +117,8 @@ async def cancel_action(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(F.text == "Мои отзывы")
-async def show_my_reviews(message: Message, state: FSMContext):
+async def show_my_reviews(message: Message, state: FSMContext, api_client: APIClient):
     """Show user's reviews"""
-    api_client = APIClient()
-    
     try:
         # Get user
         user = await api_client.get_user_by_telegram_id(message.from_user.id)
@@ -169,6 +171,4 @@ async def show_my_reviews(message: Message, state: FSMContext):
             f"Ошибка при загрузке отзывов: {str(e)}",
             reply_markup=get_main_menu()
         )
-    finally:
-        await api_client.close()
 
@@ -11,10 +11,8 @@ router = Router()
 
 
 @router.message(F.text == "/start")
-async def cmd_start(message: Message, state: FSMContext):
+async def cmd_start(message: Message, state: FSMContext, api_client: APIClient):
     """Handle /start command"""
-    api_client = APIClient()
-    
     try:
         # Check if user already exists
         user = await api_client.get_user_by_telegram_id(message.from_user.id)
@@ -45,6 +43,4 @@ async def cmd_start(message: Message, state: FSMContext):
             f"Произошла ошибка при проверке регистрации. Попробуйте позже.\n\n"
             f"Ошибка: {str(e)}"
         )
-    finally:
-        await api_client.close()
 
@@ -58,7 +58,7 @@ async def process_support_subject(message: Message, state: FSMContext):
 
 
 @router.message(SupportForm.message, F.text)
-async def process_support_message(message: Message, state: FSMContext):
+async def process_support_message(message: Message, state: FSMContext, api_client: APIClient):
     """Process support message and create ticket"""
     support_text = message.text.strip()
     
@@ -82,7 +82,6 @@ async def process_support_message(message: Message, state: FSMContext):
     # Combine subject and message
     full_message = f"Тема: {subject}\n\n{support_text}"
     
-    api_client = APIClient()
     try:
         # Get user
         user = await api_client.get_user_by_telegram_id(message.from_user.id)
@@ -135,6 +134,4 @@ async def process_support_message(message: Message, state: FSMContext):
             "Попробуйте позже или обратитесь напрямую к администратору.",
             reply_markup=get_main_menu()
         )
-    finally:
-        await api_client.close()
 
@@ -1,6 +1,36 @@
 """Inline keyboards for Telegram bot"""
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from typing import List, Dict, Optional
+from typing import List, Optional
+
+from bot.utils.pagination import Page, cursor_callback
+
+# callback_data prefixes of paginated lists: a page number or a cursor follows
+CATEGORIES_PAGE = "categories_page_"
+CITIES_PAGE = "cities_page_"
+CLINICS_PAGE = "clinics_page_"
+DOCTORS_RATING_PAGE = "dr_"
+
+
+# Sort orders of clinic reviews: callback_data code -> API ordering
+CLINIC_REVIEWS_ORDERINGS = {
+    'd': '-created_at',
+    'r': '-rating',
+}
+
+
+def doctors_category_prefix(category_id: int) -> str:
+    """callback_data prefix for pages of doctors in a category"""
+    return f"dc_{category_id}_"
+
+
+def clinic_reviews_prefix(clinic_id: int, sort: str) -> str:
+    """callback_data prefix for pages of clinic reviews in the given sort order"""
+    return f"cr{sort}_{clinic_id}_"
+
+
+def doctor_reviews_prefix(doctor_id: int) -> str:
+    """callback_data prefix for pages of reviews about a doctor"""
+    return f"rd_{doctor_id}_"
 
 
 def get_rating_keyboard() -> InlineKeyboardMarkup:
@@ -22,18 +52,10 @@ def get_rating_keyboard() -> InlineKeyboardMarkup:
     return keyboard
 
 
-def get_categories_keyboard(
-    categories: List[Dict],
-    page: int = 0,
-    items_per_page: int = 10
-) -> InlineKeyboardMarkup:
-    """Get categories list keyboard with pagination"""
-    start_idx = page * items_per_page
-    end_idx = start_idx + items_per_page
-    page_categories = categories[start_idx:end_idx]
-    
+def get_categories_keyboard(categories_page: Page) -> InlineKeyboardMarkup:
+    """Get categories list keyboard for one page"""
     keyboard_buttons = []
-    for category in page_categories:
+    for category in categories_page.items:
         keyboard_buttons.append([
             InlineKeyboardButton(
                 text=category.get('title', 'Категория'),
@@ -43,13 +65,13 @@ def get_categories_keyboard(
     
     # Pagination buttons
     nav_buttons = []
-    if page > 0:
+    if categories_page.has_previous:
         nav_buttons.append(
-            InlineKeyboardButton(text="Назад", callback_data=f"categories_page_{page - 1}")
+            InlineKeyboardButton(text="Назад", callback_data=f"{CATEGORIES_PAGE}{categories_page.page - 1}")
         )
-    if end_idx < len(categories):
+    if categories_page.has_next:
         nav_buttons.append(
-            InlineKeyboardButton(text="Далее", callback_data=f"categories_page_{page + 1}")
+            InlineKeyboardButton(text="Далее", callback_data=f"{CATEGORIES_PAGE}{categories_page.page + 1}")
         )
     
     if nav_buttons:
@@ -62,19 +84,31 @@ def get_categories_keyboard(
     return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
 
 
+def get_cursor_nav_buttons(list_page: Page, prefix: str) -> List[InlineKeyboardButton]:
+    """Previous/next buttons for a cursor-paginated page"""
+    nav_buttons = []
+    if list_page.has_previous:
+        nav_buttons.append(
+            InlineKeyboardButton(text="Назад", callback_data=cursor_callback(prefix, list_page.previous_cursor))
+        )
+    if list_page.has_next:
+        nav_buttons.append(
+            InlineKeyboardButton(text="Далее", callback_data=cursor_callback(prefix, list_page.next_cursor))
+        )
+    return nav_buttons
+
+
 def get_doctors_keyboard(
-    doctors: List[Dict],
-    page: int = 0,
-    items_per_page: int = 10,
-    category_id: Optional[int] = None
+    doctors_page: Page,
+    page_prefix: Optional[str] = None
 ) -> InlineKeyboardMarkup:
-    """Get doctors list keyboard with pagination"""
-    start_idx = page * items_per_page
-    end_idx = start_idx + items_per_page
-    page_doctors = doctors[start_idx:end_idx]
+    """Get doctors list keyboard for one page
     
+    `page_prefix` is the callback_data prefix of the list (see doctors_category_prefix
+    and DOCTORS_RATING_PAGE); without it no navigation buttons are shown.
+    """
     keyboard_buttons = []
-    for doctor in page_doctors:
+    for doctor in doctors_page.items:
         doctor_name = doctor.get('detail', 'Врач')
         clinic_name = doctor.get('clinic', {}).get('title', '') if doctor.get('clinic') else ''
         rating = doctor.get('rating')
@@ -93,24 +127,10 @@ def get_doctors_keyboard(
         ])
     
     # Pagination buttons
-    nav_buttons = []
-    if page > 0:
-        callback_data = f"doctors_page_{page - 1}"
-        if category_id:
-            callback_data += f"_cat_{category_id}"
-        nav_buttons.append(
-            InlineKeyboardButton(text="Назад", callback_data=callback_data)
-        )
-    if end_idx < len(doctors):
-        callback_data = f"doctors_page_{page + 1}"
-        if category_id:
-            callback_data += f"_cat_{category_id}"
-        nav_buttons.append(
-            InlineKeyboardButton(text="Далее", callback_data=callback_data)
-        )
-    
-    if nav_buttons:
-        keyboard_buttons.append(nav_buttons)
+    if page_prefix:
+        nav_buttons = get_cursor_nav_buttons(doctors_page, page_prefix)
+        if nav_buttons:
+            keyboard_buttons.append(nav_buttons)
     
     keyboard_buttons.append([
         InlineKeyboardButton(text="Назад к категориям", callback_data="back_to_categories"),
@@ -120,18 +140,10 @@ def get_doctors_keyboard(
     return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
 
 
-def get_clinics_keyboard(
-    clinics: List[Dict],
-    page: int = 0,
-    items_per_page: int = 10
-) -> InlineKeyboardMarkup:
-    """Get clinics list keyboard with pagination"""
-    start_idx = page * items_per_page
-    end_idx = start_idx + items_per_page
-    page_clinics = clinics[start_idx:end_idx]
-    
+def get_clinics_keyboard(clinics_page: Page) -> InlineKeyboardMarkup:
+    """Get clinics rating keyboard for one page"""
     keyboard_buttons = []
-    for clinic in page_clinics:
+    for clinic in clinics_page.items:
         clinic_name = clinic.get('title', 'Клиника')
         rating = clinic.get('rating')
         
@@ -147,16 +159,7 @@ def get_clinics_keyboard(
         ])
     
     # Pagination buttons
-    nav_buttons = []
-    if page > 0:
-        nav_buttons.append(
-            InlineKeyboardButton(text="Назад", callback_data=f"clinics_page_{page - 1}")
-        )
-    if end_idx < len(clinics):
-        nav_buttons.append(
-            InlineKeyboardButton(text="Далее", callback_data=f"clinics_page_{page + 1}")
-        )
-    
+    nav_buttons = get_cursor_nav_buttons(clinics_page, CLINICS_PAGE)
     if nav_buttons:
         keyboard_buttons.append(nav_buttons)
     
@@ -194,18 +197,54 @@ def get_clinic_card_keyboard(clinic_id: int) -> InlineKeyboardMarkup:
     return keyboard
 
 
-def get_cities_keyboard(
-    cities: List[Dict],
-    page: int = 0,
-    items_per_page: int = 10
-) -> InlineKeyboardMarkup:
-    """Get cities list keyboard for registration"""
-    start_idx = page * items_per_page
-    end_idx = start_idx + items_per_page
-    page_cities = cities[start_idx:end_idx]
+def get_clinic_reviews_keyboard(clinic_id: int, reviews_page: Page, sort: str) -> InlineKeyboardMarkup:
+    """Get clinic reviews keyboard: pages and switching between sort orders"""
+    keyboard_buttons = []
+    
+    # Pagination buttons
+    nav_buttons = get_cursor_nav_buttons(reviews_page, clinic_reviews_prefix(clinic_id, sort))
+    if nav_buttons:
+        keyboard_buttons.append(nav_buttons)
+    
+    if sort == 'd':
+        sort_button = InlineKeyboardButton(
+            text="Сначала с высокой оценкой", callback_data=clinic_reviews_prefix(clinic_id, 'r')
+        )
+    else:
+        sort_button = InlineKeyboardButton(
+            text="Сначала новые", callback_data=clinic_reviews_prefix(clinic_id, 'd')
+        )
+    keyboard_buttons.append([sort_button])
+    
+    keyboard_buttons.append([
+        InlineKeyboardButton(text="Назад к клиникам", callback_data="back_to_clinics"),
+        InlineKeyboardButton(text="В меню", callback_data="main_menu")
+    ])
     
+    return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+
+def get_doctor_reviews_keyboard(doctor_id: int, reviews_page: Page) -> InlineKeyboardMarkup:
+    """Get doctor reviews keyboard for one page"""
+    keyboard_buttons = []
+    
+    # Pagination buttons
+    nav_buttons = get_cursor_nav_buttons(reviews_page, doctor_reviews_prefix(doctor_id))
+    if nav_buttons:
+        keyboard_buttons.append(nav_buttons)
+    
+    keyboard_buttons.append([
+        InlineKeyboardButton(text="Назад к врачу", callback_data=f"doctor_{doctor_id}"),
+        InlineKeyboardButton(text="В меню", callback_data="main_menu")
+    ])
+    
+    return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+
+def get_cities_keyboard(cities_page: Page) -> InlineKeyboardMarkup:
+    """Get cities list keyboard for registration (one page)"""
     keyboard_buttons = []
-    for city in page_cities:
+    for city in cities_page.items:
         keyboard_buttons.append([
             InlineKeyboardButton(
                 text=city.get('title', 'Город'),
@@ -215,13 +254,13 @@ def get_cities_keyboard(
     
     # Pagination buttons
     nav_buttons = []
-    if page > 0:
+    if cities_page.has_previous:
         nav_buttons.append(
-            InlineKeyboardButton(text="Назад", callback_data=f"cities_page_{page - 1}")
+            InlineKeyboardButton(text="Назад", callback_data=f"{CITIES_PAGE}{cities_page.page - 1}")
         )
-    if end_idx < len(cities):
+    if cities_page.has_next:
         nav_buttons.append(
-            InlineKeyboardButton(text="Далее", callback_data=f"cities_page_{page + 1}")
+            InlineKeyboardButton(text="Далее", callback_data=f"{CITIES_PAGE}{cities_page.page + 1}")
         )
     
     if nav_buttons:
@@ -7,6 +7,7 @@ def get_main_menu() -> ReplyKeyboardMarkup:
     keyboard = ReplyKeyboardMarkup(
         keyboard=[
             [KeyboardButton(text="Категории")],
+            [KeyboardButton(text="Поиск врача")],
             [KeyboardButton(text="Рейтинг врачей")],
             [KeyboardButton(text="Рейтинг клиник")],
             [KeyboardButton(text="Мои отзывы")],
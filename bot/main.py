@@ -2,11 +2,21 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
-from bot.config import BOT_TOKEN
+from bot.config import (
+    BOT_TOKEN,
+    FSM_STORAGE_PATH,
+    FSM_STATE_TTL_SECONDS,
+    FSM_FLUSH_INTERVAL_SECONDS,
+    FSM_FLUSH_BATCH_SIZE,
+    FSM_CACHE_SECONDS,
+    FSM_CACHE_MAX_ENTRIES
+)
 from bot.middlewares.logging import LoggingMiddleware
 from bot.middlewares.throttling import ThrottlingMiddleware
+from bot.services.api_client import APIClient
+from bot.services.fsm_storage import SQLiteStorage
+from bot.services.review_cooldown import ReviewCooldown
 
 # Import handlers
 from bot.handlers import (
@@ -28,18 +38,26 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    """Main function to run the bot"""
-    # Initialize bot and dispatcher
-    bot = Bot(token=BOT_TOKEN)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+def create_dispatcher(api_client: APIClient) -> Dispatcher:
+    """Create dispatcher with storage, middlewares and handlers (polling and webhook modes)"""
+    # FSM states survive restarts and may be shared by several bot processes
+    storage = SQLiteStorage(
+        FSM_STORAGE_PATH,
+        state_ttl=FSM_STATE_TTL_SECONDS,
+        flush_interval=FSM_FLUSH_INTERVAL_SECONDS,
+        flush_batch_size=FSM_FLUSH_BATCH_SIZE,
+        cache_seconds=FSM_CACHE_SECONDS,
+        max_cached=FSM_CACHE_MAX_ENTRIES
+    )
+    # The API client is passed to handlers as the `api_client` argument
+    dp = Dispatcher(storage=storage, api_client=api_client, review_cooldown=ReviewCooldown())
     
     # Register middlewares
     dp.message.middleware(LoggingMiddleware())
     dp.callback_query.middleware(LoggingMiddleware())
-    dp.message.middleware(ThrottlingMiddleware())
-    dp.callback_query.middleware(ThrottlingMiddleware())
+    throttling = ThrottlingMiddleware()  # Separate limits per update type
+    dp.message.middleware(throttling)
+    dp.callback_query.middleware(throttling)
     
     # Register routers (handlers)
     # Order matters: more specific handlers should be registered first
@@ -53,10 +71,25 @@ async def main():
     dp.include_router(menu.router)
     dp.include_router(common.router)
     
-    # Set bot commands
+    return dp
+
+
+async def set_commands(bot: Bot):
+    """Set bot commands"""
     await bot.set_my_commands([
         {"command": "start", "description": "Начать работу с ботом"}
     ])
+
+
+async def main():
+    """Main function to run the bot (long polling)"""
+    # Initialize bot and dispatcher
+    bot = Bot(token=BOT_TOKEN)
+    # Single pooled API client shared by all handlers
+    api_client = APIClient()
+    dp = create_dispatcher(api_client)
+    
+    await set_commands(bot)
     
     logger.info("Bot started")
     
@@ -64,6 +97,8 @@ async def main():
     try:
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
+        # The dispatcher closes the FSM storage (flushing pending changes) on shutdown
+        await api_client.close()
         await bot.session.close()
 
 
@@ -1,22 +1,40 @@
 """Throttling middleware to prevent spam"""
-from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Any, Awaitable, Callable, Dict
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery
 
-from bot.config import REVIEW_COOLDOWN_HOURS
+from bot.config import THROTTLE_LIMITS, THROTTLE_MAX_USERS
+from bot.services.rate_limiter import RateLimiter
 
 
 class ThrottlingMiddleware(BaseMiddleware):
-    """Middleware to throttle user requests"""
-    
-    def __init__(self):
-        self.user_last_message = defaultdict(lambda: datetime.min)
-        self.user_review_timestamps = defaultdict(dict)  # {user_id: {doctor_id: timestamp}}
-        self.message_throttle_seconds = 1  # Minimum seconds between messages
-    
+    """Middleware to throttle user requests
+
+    Each update type has its own per-user limit (see THROTTLE_LIMITS), so
+    fast button clicks do not use up the allowance for messages.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[float, int]] = THROTTLE_LIMITS,
+        max_users: int = THROTTLE_MAX_USERS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.limiters = {
+            update_type: RateLimiter(rate, burst, max_keys=max_users, clock=clock)
+            for update_type, (rate, burst) in limits.items()
+        }
+
+    @staticmethod
+    def get_update_type(event: TelegramObject) -> Optional[str]:
+        if isinstance(event, Message):
+            return 'message'
+        if isinstance(event, CallbackQuery):
+            return 'callback_query'
+        return None
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
@@ -24,40 +42,15 @@ class ThrottlingMiddleware(BaseMiddleware):
         data: Dict[str, Any]
     ) -> Any:
         """Process middleware"""
-        if isinstance(event, (Message, CallbackQuery)):
-            user_id = event.from_user.id if hasattr(event, 'from_user') else None
-            
-            if user_id:
-                # Check message throttling
-                now = datetime.now()
-                last_message_time = self.user_last_message[user_id]
-                
-                if (now - last_message_time).total_seconds() < self.message_throttle_seconds:
-                    # Too frequent messages, skip
-                    if isinstance(event, Message):
-                        await event.answer("Пожалуйста, подождите немного перед следующим действием.")
-                    elif isinstance(event, CallbackQuery):
-                        await event.answer("Подождите немного", show_alert=False)
-                    return
-                
-                self.user_last_message[user_id] = now
-        
-        return await handler(event, data)
-    
-    def can_user_review_doctor(self, user_id: int, doctor_id: int) -> bool:
-        """Check if user can review a doctor (cooldown check)"""
-        user_reviews = self.user_review_timestamps[user_id]
-        
-        if doctor_id in user_reviews:
-            last_review_time = user_reviews[doctor_id]
-            hours_passed = (datetime.now() - last_review_time).total_seconds() / 3600
-            
-            if hours_passed < REVIEW_COOLDOWN_HOURS:
-                return False
-        
-        return True
-    
-    def record_review(self, user_id: int, doctor_id: int):
-        """Record that user left a review for a doctor"""
-        self.user_review_timestamps[user_id][doctor_id] = datetime.now()
+        limiter = self.limiters.get(self.get_update_type(event))
+        user = getattr(event, 'from_user', None)
 
+        if limiter is not None and user is not None and not limiter.allow(user.id):
+            # Too frequent requests, skip
+            if isinstance(event, Message):
+                await event.answer("Пожалуйста, подождите немного перед следующим действием.")
+            elif isinstance(event, CallbackQuery):
+                await event.answer("Подождите немного", show_alert=False)
+            return
+
+        return await handler(event, data)
@@ -1,24 +1,193 @@
 """API client for Django REST API"""
+import asyncio
+import json
+import random
+
 import aiohttp
-from typing import Optional, Dict, List, Any
-from bot.config import API_BASE_URL
+from aiohttp import compression_utils
+from typing import Optional, Dict, List, Any, Callable
+from bot.config import (
+    API_BASE_URL,
+    ITEMS_PER_PAGE,
+    API_POOL_LIMIT,
+    API_POOL_LIMIT_PER_HOST,
+    API_KEEPALIVE_SECONDS,
+    API_DNS_CACHE_SECONDS,
+    API_CONNECT_TIMEOUT_SECONDS,
+    API_TIMEOUT_SECONDS,
+    API_RETRY_ATTEMPTS,
+    API_RETRY_BACKOFF_SECONDS,
+    API_RETRY_MAX_BACKOFF_SECONDS,
+    API_BREAKER_FAILURE_THRESHOLD,
+    API_BREAKER_RESET_SECONDS,
+    API_CACHE_MAX_ENTRIES,
+    API_CACHE_STALE_SECONDS,
+    API_CACHE_ERROR_SECONDS,
+    API_CACHE_TTL,
+    API_PROFILE_CACHE_SECONDS,
+    API_PROFILE_MISSING_SECONDS,
+    API_PROFILE_CACHE_MAX_ENTRIES
+)
+from bot.services.cache import ResponseCache
+from bot.services.circuit_breaker import CircuitBreaker
+from bot.services.singleflight import SingleFlight
+from bot.utils.pagination import Page
+
+# Faster decoders are optional: without them responses are plain JSON
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class APIError(Exception):
+    """API request failed; `status` is the HTTP status or None for network errors"""
+    
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(APIError):
+    """Call rejected without a request because the API circuit breaker is open"""
+    
+    def __init__(self):
+        super().__init__("API temporarily unavailable, try again later")
+
+
+# Methods that may be safely sent again after a failed attempt
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+# Statuses meaning the request did not reach a healthy API process
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+# MessagePack is preferred when it can be decoded; an API without it answers JSON
+ACCEPT = f'{MSGPACK_MEDIA_TYPE}, application/json;q=0.9' if msgpack else 'application/json'
+# Encodings aiohttp decompresses transparently: br needs Brotli, zstd needs
+# backports.zstd (or Python 3.14) and aiohttp 3.12+
+ACCEPT_ENCODING = ', '.join(
+    ['gzip', 'deflate']
+    + (['br'] if getattr(compression_utils, 'HAS_BROTLI', False) else [])
+    + (['zstd'] if getattr(compression_utils, 'HAS_ZSTD', False) else [])
+)
+
+# Fields the bot shows from list endpoints (`fields=` parameter of the API);
+# nested objects not listed here come back as ids
+DOCTOR_LIST_FIELDS = 'id,detail,rating,reviews_count,category.title,clinic.title'
+CLINIC_LIST_FIELDS = 'id,title,address,rating,reviews_count'
+REVIEW_LIST_FIELDS = 'id,rating,detail,created_at,doctor.detail'
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a cached response may be served instead of this error"""
+    status = getattr(error, 'status', None)
+    return status is None or status >= 500
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Whether an idempotent request may be retried after this error"""
+    status = getattr(error, 'status', None)
+    return status is None or status in RETRY_STATUSES
+
+
+# What the JSON and MessagePack decoders raise on truncated or malformed bodies
+DECODE_ERRORS = (ValueError, TypeError) + ((msgpack.UnpackException,) if msgpack else ())
+
+
+def get_decoder(content_type: str) -> Optional[Callable[[bytes], Any]]:
+    """Decoder for a response body by its content type (None if not supported)"""
+    if content_type == MSGPACK_MEDIA_TYPE and msgpack:
+        return msgpack.unpackb
+    if content_type == 'application/json':
+        return orjson.loads if orjson else json.loads
+    return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter before retry number `attempt` (from 1)"""
+    return random.uniform(0, min(API_RETRY_MAX_BACKOFF_SECONDS, API_RETRY_BACKOFF_SECONDS * 2 ** attempt))
 
 
 class APIClient:
-    """Client for making requests to Django REST API"""
+    """Client for making requests to Django REST API
+    
+    One instance is created at startup (see bot/main.py) and shared by all
+    handlers, so keep-alive connections to the API are reused between clicks.
+    Identical GET requests in flight at the same time are sent once and their
+    response is shared (see `singleflight.stats` for how many were collapsed).
+    Responses are requested in MessagePack when msgpack is installed, and
+    JSON is decoded with orjson when available. Large responses come
+    compressed with the best encoding both sides support (see ACCEPT_ENCODING).
+    
+    Every call has a deadline (retries included). Idempotent requests are
+    retried with jittered backoff after network errors and 502/503/504.
+    Consecutive failures open the circuit breaker: calls then fail fast with
+    CircuitOpenError, and cached lists are served from the response cache.
+    `health()` reports the breaker state for monitoring.
+    
+    User profiles looked up by telegram_id are cached per process (including
+    "not registered") and dropped when the user is created or updated here.
+    """
     
     def __init__(self, base_url: str = API_BASE_URL):
         self.base_url = base_url.rstrip('/')
         self.session: Optional[aiohttp.ClientSession] = None
+        self.cache = ResponseCache(
+            max_entries=API_CACHE_MAX_ENTRIES,
+            stale_seconds=API_CACHE_STALE_SECONDS,
+            error_seconds=API_CACHE_ERROR_SECONDS,
+            serve_stale_on=is_transient_error
+        )
+        # No stale-while-revalidate: a profile is either fresh or fetched again
+        self.profiles = ResponseCache(
+            max_entries=API_PROFILE_CACHE_MAX_ENTRIES,
+            stale_seconds=0,
+            error_seconds=API_CACHE_ERROR_SECONDS,
+            serve_stale_on=is_transient_error
+        )
+        self.singleflight = SingleFlight()
+        self.breaker = CircuitBreaker(
+            failure_threshold=API_BREAKER_FAILURE_THRESHOLD,
+            reset_seconds=API_BREAKER_RESET_SECONDS
+        )
+        self.stats: Dict[str, int] = {
+            'retries': 0,
+            'timeouts': 0,
+        }
+    
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Create pooled aiohttp session with connection limits, DNS cache and timeouts"""
+        connector = aiohttp.TCPConnector(
+            limit=API_POOL_LIMIT,
+            limit_per_host=API_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=API_KEEPALIVE_SECONDS,
+            ttl_dns_cache=API_DNS_CACHE_SECONDS
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=API_TIMEOUT_SECONDS,
+            connect=API_CONNECT_TIMEOUT_SECONDS
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, headers={
+            'Accept': ACCEPT,
+            'Accept-Encoding': ACCEPT_ENCODING
+        })
     
     async def _get_session(self) -> aiohttp.ClientSession:
         """Get or create aiohttp session"""
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            self.session = self._create_session()
         return self.session
     
     async def close(self):
         """Close aiohttp session"""
+        await self.cache.close()
+        await self.profiles.close()
+        await self.singleflight.close()
         if self.session and not self.session.closed:
             await self.session.close()
     
@@ -27,41 +196,177 @@ class APIClient:
         method: str,
         endpoint: str,
         data: Optional[Dict] = None,
-        params: Optional[Dict] = None
+        params: Optional[Dict] = None,
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Make HTTP request to API within `deadline` seconds (API_TIMEOUT_SECONDS by default)
+        
+        Concurrent identical GETs are coalesced into one upstream request;
+        the returned data is then shared and must not be modified.
+        """
+        deadline = deadline or API_TIMEOUT_SECONDS
+        if method != 'GET':
+            return await self._send_with_retries(method, endpoint, data, params, deadline)
+        
+        key = (endpoint.lstrip('/'), tuple(sorted((params or {}).items())))
+        call = self.singleflight.do(key, lambda: self._send_with_retries(method, endpoint, None, params, deadline))
+        try:
+            # A caller joining an in-flight call still waits no longer than its own deadline
+            return await asyncio.wait_for(call, deadline)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            raise APIError("Network error: API request timed out")
+    
+    async def _send_with_retries(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict],
+        params: Optional[Dict],
+        deadline: float
     ) -> Dict[str, Any]:
-        """Make HTTP request to API"""
+        """Send request through the circuit breaker, retrying idempotent methods"""
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + deadline
+        attempts = API_RETRY_ATTEMPTS if method in IDEMPOTENT_METHODS else 1
+        
+        for attempt in range(1, attempts + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError()
+            try:
+                result = await self._send(method, endpoint, data, params, timeout=deadline_at - loop.time())
+            except APIError as e:
+                if not is_transient_error(e):
+                    # Client errors (4xx) come from a healthy API
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                delay = backoff_delay(attempt)
+                if attempt == attempts or not is_retryable_error(e) or loop.time() + delay >= deadline_at:
+                    raise
+                self.stats['retries'] += 1
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+    
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Send one HTTP request to API"""
+        if timeout is not None and timeout <= 0:
+            self.stats['timeouts'] += 1
+            raise APIError("Network error: API request timed out")
         session = await self._get_session()
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        request_timeout = aiohttp.ClientTimeout(total=timeout, connect=API_CONNECT_TIMEOUT_SECONDS)
         
         try:
             async with session.request(
                 method=method,
                 url=url,
                 json=data,
-                params=params
+                params=params,
+                timeout=request_timeout
             ) as response:
                 if response.status == 204:  # No content
                     return {}
                 
-                response_data = await response.json()
+                decode = get_decoder(response.content_type)
+                if decode is None:
+                    # Error pages of a proxy in front of the API are not JSON
+                    if response.status >= 400:
+                        raise APIError(f"API Error {response.status}: {response.reason}", response.status)
+                    raise APIError(f"Network error: unexpected content type {response.content_type}")
+                body = await response.read()
+                try:
+                    response_data = decode(body)
+                except DECODE_ERRORS as e:
+                    # Truncated or malformed body: an API error page keeps its status,
+                    # a broken success response counts as a network failure (retried)
+                    if response.status >= 400:
+                        raise APIError(f"API Error {response.status}: {response.reason}", response.status)
+                    raise APIError(f"Network error: malformed response body ({e})")
                 
                 if response.status >= 400:
-                    error_msg = response_data.get('detail', 'Unknown error')
-                    raise Exception(f"API Error {response.status}: {error_msg}")
+                    # DRF validation errors of list payloads are lists, not {'detail': ...}
+                    if isinstance(response_data, dict):
+                        error_msg = response_data.get('detail', 'Unknown error')
+                    else:
+                        error_msg = response_data
+                    raise APIError(f"API Error {response.status}: {error_msg}", response.status)
                 
                 return response_data
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            raise APIError("Network error: API request timed out")
         except aiohttp.ClientError as e:
-            raise Exception(f"Network error: {str(e)}")
+            raise APIError(f"Network error: {str(e)}")
+    
+    def health(self) -> Dict[str, Any]:
+        """Circuit breaker state and request counters (for monitoring and alerts)"""
+        return {
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'breaker': dict(self.breaker.stats),
+            'requests': dict(self.stats),
+            'singleflight': dict(self.singleflight.stats),
+            'cache': dict(self.cache.stats),
+            'profiles': dict(self.profiles.stats),
+        }
+    
+    async def _cached_get(
+        self,
+        cache_name: str,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        parse: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """GET through the response cache (TTL per endpoint from API_CACHE_TTL)
+        
+        `parse` converts the response before it is cached (e.g. into a Page).
+        """
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        key = (cache_name, endpoint, tuple(sorted(params.items())))
+        
+        async def fetch():
+            data = await self._request('GET', endpoint, params=params)
+            return parse(data) if parse else data
+        
+        return await self.cache.get_or_fetch(key, fetch, API_CACHE_TTL[cache_name])
+    
+    async def _get_all(self, endpoint: str, params: Optional[Dict] = None) -> List[Dict]:
+        """GET every page of a cursor-paginated list, following `next_cursor` to the end"""
+        params = dict(params or {})
+        items = []
+        while True:
+            data = await self._request('GET', endpoint, params=params)
+            items.extend(data.get('results', []))
+            if not data.get('next_cursor'):
+                return items
+            params['cursor'] = data['next_cursor']
     
     # User methods
     async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[Dict]:
-        """Get user by telegram_id"""
-        try:
-            return await self._request('GET', f'users/telegram/{telegram_id}/')
-        except Exception as e:
-            if '404' in str(e) or 'not found' in str(e).lower():
-                return None
-            raise
+        """Get user by telegram_id (None if not registered, cached)"""
+        async def fetch():
+            try:
+                return await self._request('GET', f'users/telegram/{telegram_id}/')
+            except APIError as e:
+                if e.status == 404:
+                    return None
+                raise
+        
+        return await self.profiles.get_or_fetch(
+            telegram_id,
+            fetch,
+            lambda user: API_PROFILE_CACHE_SECONDS if user is not None else API_PROFILE_MISSING_SECONDS
+        )
     
     async def create_user(
         self,
@@ -81,56 +386,93 @@ class APIClient:
         if phone_number:
             data['phone_number'] = phone_number
         
-        return await self._request('POST', 'users/', data=data)
+        try:
+            return await self._request('POST', 'users/', data=data)
+        finally:
+            # Cached "not registered" is wrong after success and possibly before it
+            self.profiles.discard(telegram_id)
     
     async def update_user(self, user_id: int, **kwargs) -> Dict:
         """Update user"""
-        return await self._request('PATCH', f'users/{user_id}/', data=kwargs)
+        try:
+            return await self._request('PATCH', f'users/{user_id}/', data=kwargs)
+        finally:
+            self.profiles.invalidate(lambda key: (self.profiles.peek(key) or {}).get('id') == user_id)
     
     # Category methods
-    async def get_categories(self) -> List[Dict]:
-        """Get all categories"""
-        return await self._request('GET', 'categories/')
+    async def get_categories(self, page: int = 0, page_size: int = ITEMS_PER_PAGE) -> Page:
+        """Get one page of categories (zero-based page number, cached)"""
+        params = {'page': page + 1, 'page_size': page_size}
+        return await self._cached_get(
+            'categories', 'categories/', params, parse=lambda data: Page.from_page_number(data, page)
+        )
     
     # GeoPosition methods
-    async def get_geo_positions(self) -> List[Dict]:
-        """Get all geo positions (cities)"""
-        return await self._request('GET', 'geopositions/')
+    async def get_geo_positions(self, page: int = 0, page_size: int = ITEMS_PER_PAGE) -> Page:
+        """Get one page of geo positions (cities) (zero-based page number, cached)"""
+        params = {'page': page + 1, 'page_size': page_size}
+        return await self._cached_get(
+            'geo_positions', 'geopositions/', params, parse=lambda data: Page.from_page_number(data, page)
+        )
     
     # Doctor methods
-    async def get_doctors_by_category(self, category_id: int) -> List[Dict]:
-        """Get doctors by category"""
-        return await self._request('GET', f'users/doctors/category/{category_id}/')
+    async def get_doctors_by_category(
+        self,
+        category_id: int,
+        cursor: Optional[str] = None,
+        page_size: int = ITEMS_PER_PAGE
+    ) -> Page:
+        """Get one page of doctors in a category, best rated first (cached)"""
+        params = {'cursor': cursor, 'page_size': page_size, 'fields': DOCTOR_LIST_FIELDS}
+        return await self._cached_get(
+            'doctors_by_category', f'users/doctors/category/{category_id}/', params, parse=Page.from_cursor
+        )
     
-    async def get_doctors_rating(self) -> List[Dict]:
-        """Get top doctors by rating"""
-        return await self._request('GET', 'users/doctors/rating/')
+    async def get_doctors_rating(
+        self,
+        ranking: str = 'bayesian',
+        cursor: Optional[str] = None,
+        page_size: int = ITEMS_PER_PAGE
+    ) -> Page:
+        """Get one page of top doctors by rating (confidence-weighted by default)"""
+        params = {'ranking': ranking, 'page_size': page_size, 'fields': DOCTOR_LIST_FIELDS}
+        if cursor:
+            params['cursor'] = cursor
+        data = await self._request('GET', 'users/doctors/rating/', params=params)
+        return Page.from_cursor(data)
     
-    async def get_doctor(self, doctor_id: int) -> Dict:
-        """Get doctor by ID"""
-        return await self._request('GET', f'users/{doctor_id}/')
+    async def search_doctors(self, query: str, limit: int = 10) -> List[Dict]:
+        """Search doctors by name, category or clinic (most relevant first)"""
+        params = {'q': query, 'limit': limit, 'fields': DOCTOR_LIST_FIELDS}
+        return await self._request('GET', 'users/doctors/search/', params=params)
     
-    async def get_all_doctors(
+    async def get_doctor_card(
         self,
-        category_id: Optional[int] = None,
-        geo_position_id: Optional[int] = None,
-        clinic_id: Optional[int] = None
-    ) -> List[Dict]:
-        """Get all doctors with optional filters"""
-        params = {}
-        if category_id:
-            params['category'] = category_id
-        if geo_position_id:
-            params['geo_position'] = geo_position_id
-        if clinic_id:
-            params['clinic'] = clinic_id
+        doctor_id: int,
+        telegram_id: Optional[int] = None,
+        page_size: int = ITEMS_PER_PAGE
+    ) -> Optional[Dict]:
+        """Get everything the doctor card screen needs in one request (None if not a doctor)
         
-        return await self._request('GET', 'users/doctors/', params=params)
+        Returns `doctor`, `rating_histogram` ({'1': n, ..., '5': n}), the first
+        page of `reviews` (`results`, `next_cursor`) and, when telegram_id is
+        given, `viewer` (`user_id`, None if not registered, and `has_reviewed`).
+        """
+        params = {'page_size': page_size}
+        if telegram_id is not None:
+            params['telegram_id'] = telegram_id
+        try:
+            return await self._request('GET', f'users/{doctor_id}/card/', params=params)
+        except APIError as e:
+            if e.status == 404:
+                return None
+            raise
     
     # Clinic methods
-    async def get_clinics_rating(self) -> List[Dict]:
-        """Get top clinics by rating"""
-        return await self._request('GET', 'clinics/rating/')
+    async def get_clinics_rating(self, cursor: Optional[str] = None, page_size: int = ITEMS_PER_PAGE) -> Page:
+        """Get one page of top clinics by rating (cached)"""
+        params = {'cursor': cursor, 'page_size': page_size, 'fields': CLINIC_LIST_FIELDS}
+        return await self._cached_get('clinics_rating', 'clinics/rating/', params, parse=Page.from_cursor)
     
     async def get_clinic(self, clinic_id: int) -> Dict:
         """Get clinic by ID"""
@@ -140,6 +482,20 @@ class APIClient:
         """Get all clinics"""
         return await self._request('GET', 'clinics/')
     
+    async def get_clinic_reviews(
+        self,
+        clinic_id: int,
+        ordering: str = '-created_at',
+        cursor: Optional[str] = None,
+        page_size: int = ITEMS_PER_PAGE
+    ) -> Page:
+        """Get one page of reviews about doctors of a clinic (newest or best rated first)"""
+        params = {'ordering': ordering, 'page_size': page_size, 'fields': REVIEW_LIST_FIELDS}
+        if cursor:
+            params['cursor'] = cursor
+        data = await self._request('GET', f'clinics/{clinic_id}/reviews/', params=params)
+        return Page.from_cursor(data)
+    
     # Review methods
     async def create_review(
         self,
@@ -148,27 +504,35 @@ class APIClient:
         rating: int,
         detail: str
     ) -> Dict:
-        """Create new review"""
+        """Create new review (API responds 409 if the user already reviewed this doctor)"""
         data = {
             'user_id': user_id,
             'doctor_id': doctor_id,
             'rating': rating,
             'detail': detail
         }
-        return await self._request('POST', 'reviews/', data=data)
-    
-    async def get_reviews_by_user(self, user_id: int) -> List[Dict]:
-        """Get reviews by user (author)"""
-        return await self._request('GET', f'reviews/user/{user_id}/')
+        review = await self._request('POST', 'reviews/', data=data)
+        # Ratings shown in cached lists have changed
+        self.cache.invalidate(lambda key: key[0] in ('clinics_rating', 'doctors_by_category'))
+        return review
     
-    async def get_reviews_by_doctor(self, doctor_id: int) -> List[Dict]:
-        """Get reviews by doctor"""
-        return await self._request('GET', f'reviews/doctor/{doctor_id}/')
+    async def get_reviews_by_user(self, user_id: int, page_size: int = 100) -> List[Dict]:
+        """Get all reviews by user (author), newest first (`page_size` per request)"""
+        params = {'page_size': page_size, 'fields': REVIEW_LIST_FIELDS}
+        return await self._get_all(f'reviews/user/{user_id}/', params)
     
-    async def check_review_exists(self, user_id: int, doctor_id: int) -> bool:
-        """Check if user already has a review for this doctor"""
-        reviews = await self.get_reviews_by_user(user_id)
-        return any(review.get('doctor', {}).get('id') == doctor_id for review in reviews)
+    async def get_doctor_reviews(
+        self,
+        doctor_id: int,
+        cursor: Optional[str] = None,
+        page_size: int = ITEMS_PER_PAGE
+    ) -> Page:
+        """Get one page of reviews about a doctor, newest first"""
+        params = {'page_size': page_size, 'fields': REVIEW_LIST_FIELDS}
+        if cursor:
+            params['cursor'] = cursor
+        data = await self._request('GET', f'reviews/doctor/{doctor_id}/', params=params)
+        return Page.from_cursor(data)
     
     # Support request methods
     async def create_support_request(self, user_id: int, detail: str) -> Dict:
@@ -0,0 +1,176 @@
+"""In-memory cache for API responses with TTL, LRU eviction and stale serving"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+# Seconds a value stays fresh, or a function of the value (e.g. shorter for "not found")
+TTL = Union[float, Callable[[Any], float]]
+
+
+@dataclass
+class CacheEntry:
+    """Cached value with the time it was fetched and its TTL"""
+    value: Any
+    fetched_at: float
+    ttl: float
+
+    def age(self, now: float) -> float:
+        return now - self.fetched_at
+
+
+class ResponseCache:
+    """Bounded LRU cache for API responses
+
+    - fresh entries (younger than their TTL) are returned as is;
+    - stale entries (up to `stale_seconds` past TTL) are returned immediately
+      while a single background refresh runs (stale-while-revalidate);
+    - if fetching fails, an entry up to `error_seconds` past TTL is returned
+      instead of the error (stale-if-error), when `serve_stale_on` allows it.
+
+    `discard()` and `invalidate()` also fence fetches already in flight for the
+    dropped keys: a response requested before the invalidation is not stored
+    afterwards, so it cannot bring back the value the write replaced.
+
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        stale_seconds: float = 60,
+        error_seconds: float = 3600,
+        serve_stale_on: Callable[[Exception], bool] = lambda error: True,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self.error_seconds = error_seconds
+        self.serve_stale_on = serve_stale_on
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        # Keys with fetches in flight: how many, and the generation they must match to be stored
+        self._in_flight: Dict[Hashable, int] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self.stats: Dict[str, int] = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'stale_on_error': 0,
+            'evictions': 0,
+            'fenced': 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: TTL) -> Any:
+        """Fetch a value and store it unless the key was invalidated meanwhile"""
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        generation = self._generations.setdefault(key, 0)
+        try:
+            value = await fetch()
+            if self._generations[key] == generation:
+                self._store(key, value, ttl)
+            else:
+                self.stats['fenced'] += 1
+            return value
+        finally:
+            self._in_flight[key] -= 1
+            if not self._in_flight[key]:
+                del self._in_flight[key]
+                del self._generations[key]
+
+    def _fence(self, key: Hashable):
+        if key in self._generations:
+            self._generations[key] += 1
+
+    def _store(self, key: Hashable, value: Any, ttl: TTL):
+        if callable(ttl):
+            ttl = ttl(value)
+        self._entries[key] = CacheEntry(value, self.clock(), ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    async def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: TTL):
+        try:
+            await self._fetch(key, fetch, ttl)
+            self.stats['refreshes'] += 1
+        except Exception as e:
+            # The stale value stays in place; the next request will retry
+            logger.warning(f"Background refresh of {key!r} failed: {str(e)}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def _schedule_refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: TTL):
+        if key not in self._refreshing:
+            self._refreshing[key] = asyncio.create_task(self._refresh(key, fetch, ttl))
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: TTL) -> Any:
+        """Return cached value for key, fetching it with `fetch()` when needed"""
+        entry = self._entries.get(key)
+        now = self.clock()
+
+        if entry is not None:
+            age = entry.age(now)
+            if age < entry.ttl:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry.value
+            if age < entry.ttl + self.stale_seconds:
+                self._entries.move_to_end(key)
+                self.stats['stale_hits'] += 1
+                self._schedule_refresh(key, fetch, ttl)
+                return entry.value
+
+        self.stats['misses'] += 1
+        try:
+            value = await self._fetch(key, fetch, ttl)
+        except Exception as e:
+            if (
+                entry is not None
+                and entry.age(self.clock()) < entry.ttl + self.error_seconds
+                and self.serve_stale_on(e)
+            ):
+                self.stats['stale_on_error'] += 1
+                logger.warning(f"Serving stale {key!r} after API error: {str(e)}")
+                return entry.value
+            raise
+        return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Cached value regardless of its age (None if missing)"""
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def discard(self, key: Hashable):
+        """Drop the entry for key, if any, and fence fetches of it in flight"""
+        self._entries.pop(key, None)
+        self._fence(key)
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None):
+        """Drop all entries, or only those whose key matches the predicate, and fence their fetches"""
+        for key in [key for key in self._generations if predicate is None or predicate(key)]:
+            self._fence(key)
+        if predicate is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    async def close(self):
+        """Cancel background refreshes"""
+        tasks: Set[asyncio.Task] = set(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._refreshing.clear()
@@ -0,0 +1,80 @@
+"""Circuit breaker isolating the bot from an unhealthy API"""
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker
+
+    - closed: calls pass; `failure_threshold` failures in a row open the circuit;
+    - open: calls are rejected without touching the API for `reset_seconds`;
+    - half_open: one trial call is let through; its success closes the circuit,
+      its failure opens it again for another `reset_seconds`.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self.failures = 0  # Consecutive failures
+        self.stats: Dict[str, int] = {
+            'failures': 0,
+            'opened': 0,
+            'rejected': 0,
+        }
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_seconds:
+            self._set_state(self.HALF_OPEN)
+        return self._state
+
+    def _set_state(self, state: str):
+        if state == self._state:
+            return
+        log = logger.info if state == self.CLOSED else logger.warning
+        log(f"API circuit breaker: {self._state} -> {state}")
+        self._state = state
+        self._probe_started = None
+
+    def allow(self) -> bool:
+        """Whether a call may be made now (rejections are counted)"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN:
+            now = self.clock()
+            # A trial call that never reported back (e.g. cancelled) does not block forever
+            if self._probe_started is None or now - self._probe_started >= self.reset_seconds:
+                self._probe_started = now
+                return True
+        self.stats['rejected'] += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self.stats['failures'] += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.stats['opened'] += 1
+            self._opened_at = self.clock()
+            self._set_state(self.OPEN)
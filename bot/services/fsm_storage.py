@@ -0,0 +1,342 @@
+"""Persistent FSM storage on SQLite with a write-back cache"""
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm_state (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fsm_state_updated_at ON fsm_state (updated_at);
+"""
+
+# Keys per SELECT when reading a batch of conversations
+READ_CHUNK_SIZE = 500
+
+UPSERT = """
+INSERT INTO fsm_state (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+"""
+
+
+@dataclass
+class StorageRecord:
+    """Cached FSM state and data of one conversation"""
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    updated_at: float = 0.0  # Wall-clock time of the last change (shared between processes)
+    loaded_at: float = 0.0  # Monotonic time the record was read from or written to the cache
+    dirty: bool = False
+
+    def is_empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+class SQLiteStorage(BaseStorage):
+    """aiogram FSM storage in a local SQLite database (WAL mode)
+
+    Writes go to an in-memory cache and are committed in batches: every
+    `flush_interval` seconds or as soon as `flush_batch_size` conversations
+    are dirty, in one transaction. Conversations without state and data are
+    deleted instead of stored, and states idle for longer than `state_ttl`
+    are expired, so abandoned flows do not accumulate.
+
+    Several bot processes may share one database file (WAL lets them read
+    while another one commits) only if each conversation is written by one of
+    them, as with webhook instances that own their users (bot/webhook.py).
+    Changes stay in the writing process for up to `flush_interval`: another
+    process does not see them until then, and if both change the same
+    conversation, the later flush silently overwrites the other change.
+    By default (`cache_seconds` = 0) clean entries are not reused, so every
+    read sees the latest committed state. A single bot process may set
+    `cache_seconds` to reuse clean entries for that long; the cache keeps at
+    most `max_cached` of them.
+
+    SQLite calls run in a dedicated thread so they never block the event loop.
+    Cache misses arriving together are read with one query.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        state_ttl: float = 86400,
+        flush_interval: float = 1.0,
+        flush_batch_size: int = 500,
+        cache_seconds: float = 0,
+        max_cached: int = 10000,
+        sweep_interval: float = 300,
+        key_builder: Optional[KeyBuilder] = None
+    ):
+        self.path = path
+        self.state_ttl = state_ttl
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.cache_seconds = cache_seconds
+        self.max_cached = max_cached
+        self.sweep_interval = sweep_interval
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._records: "OrderedDict[str, StorageRecord]" = OrderedDict()
+        self._dirty: set = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fsm-sqlite')
+        self._connection: Optional[sqlite3.Connection] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._pending_reads: Dict[str, asyncio.Future] = {}
+        self._flush_now: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._last_sweep = time.monotonic()
+        self._closed = False
+        self.stats: Dict[str, int] = {
+            'cache_hits': 0,
+            'reads': 0,  # Read queries (one per batch of cache misses)
+            'flushes': 0,
+            'written': 0,  # Rows upserted
+            'deleted': 0,  # Empty conversations deleted
+            'expired': 0,  # Idle conversations expired
+        }
+
+    # Database side (runs in the storage thread)
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def _select(self, keys: List[str], cutoff: float) -> Dict[str, Tuple[Optional[str], str, float]]:
+        connection = self._connect()
+        rows = {}
+        for start in range(0, len(keys), READ_CHUNK_SIZE):
+            chunk = keys[start:start + READ_CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            cursor = connection.execute(
+                f'SELECT key, state, data, updated_at FROM fsm_state '
+                f'WHERE key IN ({placeholders}) AND updated_at >= ?',
+                (*chunk, cutoff)
+            )
+            for key, state, data, updated_at in cursor:
+                rows[key] = (state, data, updated_at)
+        return rows
+
+    def _write(self, upserts: List[Tuple], deletes: List[Tuple]):
+        connection = self._connect()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            if upserts:
+                connection.executemany(UPSERT, upserts)
+            if deletes:
+                # A newer change committed by another process is kept
+                connection.executemany('DELETE FROM fsm_state WHERE key = ? AND updated_at <= ?', deletes)
+
+    def _expire(self, cutoff: float) -> int:
+        connection = self._connect()
+        with connection:
+            return connection.execute('DELETE FROM fsm_state WHERE updated_at < ?', (cutoff,)).rowcount
+
+    def _close_connection(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    # Cache side (runs in the event loop)
+    def _cutoff(self) -> float:
+        return time.time() - self.state_ttl
+
+    def _is_fresh(self, record: StorageRecord) -> bool:
+        if record.dirty:
+            return True
+        if time.monotonic() - record.loaded_at >= self.cache_seconds:
+            return False
+        return record.is_empty() or record.updated_at >= self._cutoff()
+
+    async def _load(self, key: str) -> StorageRecord:
+        record = self._records.get(key)
+        if record is not None and self._is_fresh(record):
+            self._records.move_to_end(key)
+            self.stats['cache_hits'] += 1
+            return record
+
+        row = await self._read(key)
+        # A write for this key may have happened while the row was being read
+        current = self._records.get(key)
+        if current is not None and current.dirty:
+            return current
+        if row is None:
+            record = StorageRecord(loaded_at=time.monotonic())
+        else:
+            state, data, updated_at = row
+            record = StorageRecord(state, json.loads(data), updated_at, time.monotonic())
+        self._records[key] = record
+        self._records.move_to_end(key)
+        # The caller may be about to change the record: it must not be the one evicted
+        self._evict(keep=key)
+        return record
+
+    async def _read(self, key: str) -> Optional[Tuple[Optional[str], str, float]]:
+        """Read one row, batched with the other cache misses waiting at the same time"""
+        future = self._pending_reads.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending_reads[key] = future
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read_pending())
+        return await asyncio.shield(future)
+
+    async def _read_pending(self):
+        while self._pending_reads:
+            pending, self._pending_reads = self._pending_reads, {}
+            try:
+                rows = await self._run(self._select, list(pending), self._cutoff())
+            except asyncio.CancelledError:
+                for future in pending.values():
+                    future.cancel()
+                raise
+            except Exception as e:
+                for future in pending.values():
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats['reads'] += 1
+            for key, future in pending.items():
+                if not future.done():
+                    future.set_result(rows.get(key))
+
+    def _evict(self, keep: Optional[str] = None):
+        """Drop least recently used clean entries beyond max_cached (never `keep`)"""
+        excess = len(self._records) - self.max_cached
+        # Dirty entries met on the way are moved back; they stay until flushed
+        for _ in range(len(self._records)):
+            if excess <= 0:
+                break
+            key, record = next(iter(self._records.items()))
+            if record.dirty or key == keep:
+                self._records.move_to_end(key)
+            else:
+                del self._records[key]
+                excess -= 1
+
+    def _mark_dirty(self, key: str, record: StorageRecord):
+        record.dirty = True
+        record.updated_at = time.time()
+        record.loaded_at = time.monotonic()
+        self._dirty.add(key)
+        self._ensure_flusher()
+        if len(self._dirty) >= self.flush_batch_size:
+            self._flush_now.set()
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._flush_now = asyncio.Event()
+            self._flush_lock = self._flush_lock or asyncio.Lock()
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            try:
+                await self.flush()
+                if time.monotonic() - self._last_sweep >= self.sweep_interval:
+                    await self.expire()
+            except Exception as e:
+                # Dirty entries stay in the cache and are written by the next flush
+                logger.error(f"FSM storage flush failed: {str(e)}")
+
+    async def flush(self):
+        """Commit all pending changes in one transaction"""
+        self._flush_lock = self._flush_lock or asyncio.Lock()
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            keys, self._dirty = self._dirty, set()
+            upserts, deletes = [], []
+            for key in keys:
+                record = self._records[key]
+                record.dirty = False
+                if record.is_empty():
+                    deletes.append((key, record.updated_at))
+                else:
+                    data = json.dumps(record.data, ensure_ascii=False, separators=(',', ':'))
+                    upserts.append((key, record.state, data, record.updated_at))
+            try:
+                await self._run(self._write, upserts, deletes)
+            except BaseException:
+                for key in keys:
+                    record = self._records.get(key)
+                    if record is not None:
+                        record.dirty = True
+                        self._dirty.add(key)
+                raise
+            self.stats['flushes'] += 1
+            self.stats['written'] += len(upserts)
+            self.stats['deleted'] += len(deletes)
+            self._evict()
+
+    async def expire(self):
+        """Delete conversations idle for longer than state_ttl"""
+        cutoff = self._cutoff()
+        self._last_sweep = time.monotonic()
+        self.stats['expired'] += await self._run(self._expire, cutoff)
+        for key in [key for key, record in self._records.items() if not record.dirty and record.updated_at < cutoff]:
+            del self._records[key]
+
+    # BaseStorage
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        record = await self._load(storage_key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(storage_key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._load(self.key_builder.build(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        storage_key = self.key_builder.build(key)
+        record = await self._load(storage_key)
+        record.data = data.copy()
+        self._mark_dirty(storage_key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._load(self.key_builder.build(key))).data.copy()
+
+    async def close(self) -> None:
+        """Stop the flusher, commit pending changes and close the database"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        await self._run(self._close_connection)
+        self._executor.shutdown(wait=True)
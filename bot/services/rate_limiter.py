@@ -0,0 +1,63 @@
+"""Per-user rate limiting with bounded memory"""
+import time
+from typing import Callable, Dict, Hashable
+
+
+class RateLimiter:
+    """Token bucket per key, stored as a single timestamp (GCRA)
+
+    A key may make `burst` requests at once and then `rate` requests per
+    second. Instead of a token count and a refill time, each key keeps only
+    the moment its bucket becomes full again; a key whose bucket is already
+    full is indistinguishable from a new one and is dropped. Keys are kept in
+    the order they were last allowed, so idle keys are evicted lazily from the
+    front on every call, and `max_keys` caps memory under a flood of new keys.
+
+    Uses monotonic time, so wall-clock adjustments do not affect limits.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        max_keys: int = 100000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.interval = 1 / rate
+        self.tolerance = self.interval * (burst - 1)
+        self.max_keys = max_keys
+        self.clock = clock
+        self._full_at: Dict[Hashable, float] = {}
+        self.stats: Dict[str, int] = {
+            'allowed': 0,
+            'limited': 0,
+            'evicted': 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+    def allow(self, key: Hashable) -> bool:
+        """Take one token for key; False if the key is over its limit"""
+        now = self.clock()
+        self._evict(now)
+
+        full_at = max(self._full_at.get(key, now), now)
+        if full_at - now > self.tolerance:
+            self.stats['limited'] += 1
+            return False
+
+        # Re-insert to keep keys ordered by their last allowed request
+        self._full_at.pop(key, None)
+        self._full_at[key] = full_at + self.interval
+        self.stats['allowed'] += 1
+        return True
+
+    def _evict(self, now: float):
+        """Drop idle keys from the front, and the oldest keys beyond max_keys"""
+        while self._full_at:
+            key, full_at = next(iter(self._full_at.items()))
+            if full_at > now and len(self._full_at) < self.max_keys:
+                break
+            del self._full_at[key]
+            self.stats['evicted'] += 1
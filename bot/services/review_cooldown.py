@@ -0,0 +1,46 @@
+"""Review cooldown kept in the FSM storage"""
+import time
+from dataclasses import replace
+from typing import Callable
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+
+from bot.config import REVIEW_COOLDOWN_HOURS
+
+
+class ReviewCooldown:
+    """Minimum time between reviews of the same doctor by one user
+
+    Review times are stored in the FSM storage under a separate destiny, so
+    with SQLiteStorage they survive restarts and are shared between bot
+    processes. Wall-clock time is used because monotonic time does not
+    survive a restart. Expired entries are dropped on every write.
+    """
+
+    DESTINY = 'review_cooldown'
+
+    def __init__(self, cooldown_seconds: float = REVIEW_COOLDOWN_HOURS * 3600, clock: Callable[[], float] = time.time):
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+
+    def _key(self, state: FSMContext) -> StorageKey:
+        # One record per user, whatever chat the review was started from
+        return replace(state.key, chat_id=state.key.user_id, thread_id=None, destiny=self.DESTINY)
+
+    async def can_review(self, state: FSMContext, doctor_id: int) -> bool:
+        """Check if user can review a doctor (cooldown check)"""
+        reviewed_at = await state.storage.get_value(self._key(state), str(doctor_id))
+        return reviewed_at is None or self.clock() - reviewed_at >= self.cooldown_seconds
+
+    async def record(self, state: FSMContext, doctor_id: int):
+        """Record that user left a review for a doctor"""
+        key = self._key(state)
+        now = self.clock()
+        reviews = {
+            doctor: reviewed_at
+            for doctor, reviewed_at in (await state.storage.get_data(key)).items()
+            if now - reviewed_at < self.cooldown_seconds
+        }
+        reviews[str(doctor_id)] = now
+        await state.storage.set_data(key, reviews)
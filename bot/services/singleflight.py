@@ -0,0 +1,55 @@
+"""Coalescing of identical concurrent calls (singleflight)"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its outcome
+
+    The first caller for a key (the leader) starts the call in a separate task;
+    callers arriving while it is in flight wait for the same task instead of
+    starting their own. The result (or exception) is returned to every waiter,
+    so results must be treated as read-only. A waiter that is cancelled does
+    not cancel the shared call for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.stats: Dict[str, int] = {
+            'calls': 0,  # Calls made by callers
+            'executed': 0,  # Calls actually executed
+            'coalesced': 0,  # Calls served by another caller's in-flight call
+        }
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieve the exception so it is not reported as never retrieved
+        # when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the outcome of `call()`, sharing it with concurrent callers of the same key"""
+        self.stats['calls'] += 1
+        task = self._calls.get(key)
+        if task is None:
+            self.stats['executed'] += 1
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    async def close(self):
+        """Cancel calls still in flight"""
+        tasks = list(self._calls.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._calls.clear()
@@ -0,0 +1,119 @@
+"""Bounded worker pool processing updates in order per user"""
+import asyncio
+import logging
+import zlib
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+def owner_index(key: Hashable, instances: int) -> int:
+    """Index of the instance that processes updates of key when there are `instances` of them
+
+    The same in every process and after restarts (unlike hash() of a str), so
+    all instances agree on the owner without coordination.
+    """
+    if instances <= 1:
+        return 0
+    return zlib.crc32(repr(key).encode()) % instances
+
+
+class PoolFull(Exception):
+    """The pool already holds `max_pending` updates"""
+
+
+class UserQueueFull(Exception):
+    """One user already has `max_pending_per_user` updates waiting"""
+
+
+class UpdatePool:
+    """Process jobs with a fixed number of workers, serially per key
+
+    Jobs of one key (a user) run one after another in submission order, jobs
+    of different keys run concurrently. A key with pending jobs sits in the
+    ready queue at most once, so no two workers process the same user; after
+    each job the key goes to the back of the queue, so a busy user does not
+    starve the others. `submit` never waits: when the pool or the user's queue
+    is full it raises, and the caller pushes back (see bot/webhook.py).
+    """
+
+    def __init__(self, workers: int = 32, max_pending: int = 1000, max_pending_per_user: int = 20):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self._jobs: Dict[Hashable, Deque[Job]] = {}
+        self._ready: "asyncio.Queue[Hashable]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._idle: Optional[asyncio.Event] = None
+        self.pending = 0
+        self.stats: Dict[str, int] = {
+            'submitted': 0,
+            'processed': 0,
+            'failed': 0,
+            'rejected_full': 0,
+            'rejected_user': 0,
+        }
+
+    def start(self):
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, key: Hashable, job: Job):
+        """Queue a job for key (raises PoolFull or UserQueueFull instead of waiting)"""
+        if self.pending >= self.max_pending:
+            self.stats['rejected_full'] += 1
+            raise PoolFull()
+        jobs = self._jobs.get(key)
+        if jobs is not None and len(jobs) >= self.max_pending_per_user:
+            self.stats['rejected_user'] += 1
+            raise UserQueueFull()
+
+        if jobs is None:
+            jobs = self._jobs[key] = deque()
+            self._ready.put_nowait(key)
+        jobs.append(job)
+        self.pending += 1
+        self.stats['submitted'] += 1
+        self._idle.clear()
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            jobs = self._jobs[key]
+            job = jobs[0]
+            try:
+                await job()
+                self.stats['processed'] += 1
+            except Exception:
+                self.stats['failed'] += 1
+                logger.exception(f"Update processing failed for {key!r}")
+            finally:
+                jobs.popleft()
+                self.pending -= 1
+                if jobs:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._jobs[key]
+                if not self.pending:
+                    self._idle.set()
+
+    async def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all queued jobs are processed; False on timeout"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Let queued jobs finish (up to timeout), then stop the workers"""
+        if not await self.join(timeout):
+            logger.warning(f"Stopping update pool with {self.pending} unprocessed updates")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
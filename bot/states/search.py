@@ -0,0 +1,7 @@
+"""FSM states for doctor search"""
+from aiogram.fsm.state import State, StatesGroup
+
+
+class DoctorSearchForm(StatesGroup):
+    """Doctor search states"""
+    query = State()  # Waiting for doctor name
@@ -0,0 +1,6 @@
+"""Unit tests of the bot services
+
+Run from the project root: `python -m unittest discover -s bot/tests -t .`
+Tests must not import bot.config (it requires BOT_TOKEN), so they cover the
+services that take their settings as constructor arguments.
+"""
@@ -0,0 +1,92 @@
+"""ResponseCache: TTL, stale serving and fencing of in-flight fetches"""
+import asyncio
+import unittest
+
+from bot.services.cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ResponseCacheTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(max_entries=2, stale_seconds=10, error_seconds=100, clock=self.clock)
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+
+    async def test_fresh_stale_and_refresh(self):
+        values = iter(['v1', 'v2'])
+
+        async def fetch():
+            return next(values)
+
+        self.assertEqual(await self.cache.get_or_fetch('key', fetch, 5), 'v1')
+        self.assertEqual(await self.cache.get_or_fetch('key', fetch, 5), 'v1')
+        self.clock.now = 6
+        # Stale: the old value is served while the refresh runs in the background
+        self.assertEqual(await self.cache.get_or_fetch('key', fetch, 5), 'v1')
+        await asyncio.sleep(0)
+        self.assertEqual(self.cache.peek('key'), 'v2')
+        self.assertEqual((self.cache.stats['hits'], self.cache.stats['stale_hits']), (1, 1))
+
+    async def test_stale_on_error(self):
+        async def fail():
+            raise RuntimeError('API down')
+
+        await self.cache.get_or_fetch('key', lambda: asyncio.sleep(0, 'v1'), 5)
+        self.clock.now = 50
+        self.assertEqual(await self.cache.get_or_fetch('key', fail, 5), 'v1')
+        self.clock.now = 200
+        with self.assertRaises(RuntimeError):
+            await self.cache.get_or_fetch('key', fail, 5)
+
+    async def test_lru_eviction(self):
+        for key in ('a', 'b', 'c'):
+            await self.cache.get_or_fetch(key, lambda: asyncio.sleep(0, key), 5)
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.peek('a'))
+
+    async def test_invalidate_fences_background_refresh(self):
+        await self.cache.get_or_fetch('key', lambda: asyncio.sleep(0, 'before write'), 5)
+        release = asyncio.Event()
+
+        async def slow_fetch():
+            await release.wait()
+            return 'before write'
+
+        self.clock.now = 6
+        await self.cache.get_or_fetch('key', slow_fetch, 5)
+        refresh = self.cache._refreshing['key']
+        await asyncio.sleep(0)
+        # The write lands while the refresh is in flight
+        self.cache.invalidate(lambda key: key == 'key')
+        release.set()
+        await refresh
+        self.assertIsNone(self.cache.peek('key'))
+        self.assertEqual(self.cache.stats['fenced'], 1)
+
+        self.assertEqual(await self.cache.get_or_fetch('key', lambda: asyncio.sleep(0, 'after write'), 5), 'after write')
+        self.assertEqual(self.cache.peek('key'), 'after write')
+
+    async def test_discard_fences_fetch_on_miss(self):
+        release = asyncio.Event()
+
+        async def slow_fetch():
+            await release.wait()
+            return None  # "not registered"
+
+        lookup = asyncio.create_task(self.cache.get_or_fetch(42, slow_fetch, 5))
+        await asyncio.sleep(0)
+        self.cache.discard(42)  # the user registers meanwhile
+        release.set()
+        # The caller still gets its answer, but it is not cached
+        self.assertIsNone(await lookup)
+        self.assertNotIn(42, self.cache._entries)
+        self.assertEqual(self.cache._generations, {})
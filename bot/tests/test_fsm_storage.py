@@ -0,0 +1,124 @@
+"""SQLiteStorage: write-back flushing, batched reads, eviction, expiry and close"""
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from aiogram.fsm.storage.base import StorageKey
+
+from bot.services.fsm_storage import SQLiteStorage
+
+
+def storage_key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+class SQLiteStorageTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'fsm.sqlite3')
+        self.storages = []
+
+    async def asyncTearDown(self):
+        for storage in self.storages:
+            await storage.close()
+
+    def open(self, **kwargs) -> SQLiteStorage:
+        # Without a batch-size trigger nothing is flushed unless a test asks for it
+        kwargs.setdefault('flush_interval', 60)
+        storage = SQLiteStorage(self.path, **kwargs)
+        self.storages.append(storage)
+        return storage
+
+    def stored_states(self):
+        with sqlite3.connect(self.path) as connection:
+            return dict(connection.execute('SELECT key, state FROM fsm_state'))
+
+    async def wait_for(self, condition):
+        for _ in range(200):
+            if condition():
+                return
+            await asyncio.sleep(0.005)
+        self.fail('condition not reached')
+
+    async def test_flush_on_batch_size(self):
+        storage = self.open(flush_batch_size=2)
+        await storage.set_state(storage_key(1), 'form:name')
+        await asyncio.sleep(0.01)
+        self.assertEqual(storage.stats['flushes'], 0)
+
+        await storage.set_state(storage_key(2), 'form:name')
+        await self.wait_for(lambda: storage.stats['flushes'] == 1)
+        self.assertEqual(sorted(self.stored_states().values()), ['form:name', 'form:name'])
+        self.assertEqual(storage.stats['written'], 2)
+
+    async def test_cleared_conversation_deleted(self):
+        storage = self.open()
+        await storage.set_state(storage_key(1), 'form:name')
+        await storage.flush()
+        await storage.set_state(storage_key(1), None)
+        await storage.flush()
+        self.assertEqual(self.stored_states(), {})
+        self.assertEqual(storage.stats['deleted'], 1)
+
+    async def test_concurrent_misses_read_in_one_query(self):
+        writer = self.open()
+        for user_id in range(3):
+            await writer.set_data(storage_key(user_id), {'user': user_id})
+        await writer.close()
+
+        reader = self.open()
+        data = await asyncio.gather(*(reader.get_data(storage_key(user_id)) for user_id in range(4)))
+        self.assertEqual(data, [{'user': 0}, {'user': 1}, {'user': 2}, {}])
+        self.assertEqual(reader.stats['reads'], 1)
+
+    async def test_evict_keeps_dirty_records(self):
+        storage = self.open(max_cached=2)
+        for user_id in range(4):
+            await storage.set_state(storage_key(user_id), 'form:name')
+        # Nothing is flushed yet: evicting would lose the changes
+        self.assertEqual(len(storage._records), 4)
+
+        await storage.flush()
+        self.assertEqual(len(storage._records), 2)
+        self.assertEqual(len(self.stored_states()), 4)
+
+    async def test_expire_idle_conversations(self):
+        storage = self.open(state_ttl=3600)
+        await storage.set_state(storage_key(1), 'form:name')
+        await storage.flush()
+
+        with mock.patch('bot.services.fsm_storage.time.time', return_value=storage._records[
+            storage.key_builder.build(storage_key(1))
+        ].updated_at + 7200):
+            await storage.expire()
+            self.assertIsNone(await storage.get_state(storage_key(1)))
+        self.assertEqual(storage.stats['expired'], 1)
+        self.assertEqual(self.stored_states(), {})
+
+    async def test_failed_write_marks_records_dirty_again(self):
+        storage = self.open()
+        await storage.set_state(storage_key(1), 'form:name')
+        with mock.patch.object(storage, '_write', side_effect=sqlite3.OperationalError('database is locked')):
+            with self.assertRaises(sqlite3.OperationalError):
+                await storage.flush()
+        key = storage.key_builder.build(storage_key(1))
+        self.assertIn(key, storage._dirty)
+        self.assertTrue(storage._records[key].dirty)
+
+        await storage.flush()
+        self.assertEqual(self.stored_states(), {key: 'form:name'})
+
+    async def test_close_flushes_pending_changes(self):
+        storage = self.open()
+        await storage.set_state(storage_key(1), 'form:rating')
+        await storage.set_data(storage_key(1), {'doctor_id': 7})
+        await storage.close()
+        await storage.close()  # a second close is a no-op
+
+        reopened = self.open()
+        self.assertEqual(await reopened.get_state(storage_key(1)), 'form:rating')
+        self.assertEqual(await reopened.get_data(storage_key(1)), {'doctor_id': 7})
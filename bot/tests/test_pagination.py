@@ -0,0 +1,31 @@
+"""Page and cursor callback helpers of the list screens"""
+import unittest
+
+from bot.utils.pagination import CALLBACK_DATA_LIMIT, Page, cursor_callback, parse_cursor_callback
+
+
+class PageTests(unittest.TestCase):
+    def test_from_page_number(self):
+        page = Page.from_page_number({'count': 25, 'next': 'url', 'previous': None, 'results': [{'id': 1}]}, 0)
+        self.assertEqual((page.items, page.total, page.has_next, page.has_previous), ([{'id': 1}], 25, True, False))
+
+        last = Page.from_page_number({'count': 25, 'next': None, 'results': [{'id': 21}]}, 2)
+        self.assertEqual((last.has_next, last.has_previous), (False, True))
+
+    def test_from_cursor(self):
+        page = Page.from_cursor({'next_cursor': 'abc', 'previous_cursor': None, 'results': [{'id': 1}]})
+        self.assertEqual((page.next_cursor, page.has_next, page.has_previous), ('abc', True, False))
+
+    def test_empty_page_is_false_unless_there_are_previous_pages(self):
+        self.assertFalse(Page.from_cursor({'results': []}))
+        self.assertTrue(Page.from_cursor({'results': [], 'previous_cursor': 'abc'}))
+
+
+class CursorCallbackTests(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual(parse_cursor_callback(cursor_callback('top:', 'abc'), 'top:'), 'abc')
+        self.assertIsNone(parse_cursor_callback(cursor_callback('top:', None), 'top:'))
+
+    def test_callback_data_limit(self):
+        with self.assertRaises(ValueError):
+            cursor_callback('top:', 'x' * CALLBACK_DATA_LIMIT)
@@ -0,0 +1,63 @@
+"""RateLimiter (GCRA): burst, refill and bounded memory"""
+import unittest
+
+from bot.services.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RateLimiterTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def limiter(self, **kwargs) -> RateLimiter:
+        return RateLimiter(clock=self.clock, **kwargs)
+
+    def test_burst_then_rate(self):
+        limiter = self.limiter(rate=2, burst=3)
+        self.assertEqual([limiter.allow('user') for _ in range(4)], [True, True, True, False])
+        # One token comes back every 1 / rate seconds
+        self.clock.now = 0.4
+        self.assertFalse(limiter.allow('user'))
+        self.clock.now = 0.5
+        self.assertTrue(limiter.allow('user'))
+        self.assertFalse(limiter.allow('user'))
+        self.assertEqual(limiter.stats['limited'], 3)
+
+    def test_full_refill_after_idle(self):
+        limiter = self.limiter(rate=2, burst=3)
+        for _ in range(3):
+            limiter.allow('user')
+        self.clock.now = 1.5
+        self.assertEqual([limiter.allow('user') for _ in range(4)], [True, True, True, False])
+
+    def test_keys_are_independent(self):
+        limiter = self.limiter(rate=1, burst=1)
+        self.assertTrue(limiter.allow('a'))
+        self.assertFalse(limiter.allow('a'))
+        self.assertTrue(limiter.allow('b'))
+
+    def test_idle_keys_dropped(self):
+        limiter = self.limiter(rate=1, burst=2)
+        for user in range(100):
+            limiter.allow(user)
+        self.assertEqual(len(limiter), 100)
+        # Every bucket is full again: the keys carry no state and are dropped
+        self.clock.now = 1
+        limiter.allow('new')
+        self.assertEqual(len(limiter), 1)
+        self.assertEqual(limiter.stats['evicted'], 100)
+
+    def test_max_keys(self):
+        limiter = self.limiter(rate=1, burst=1, max_keys=10)
+        for user in range(50):
+            self.assertTrue(limiter.allow(user))
+        self.assertLessEqual(len(limiter), 10)
+        # The most recent keys are still limited
+        self.assertFalse(limiter.allow(49))
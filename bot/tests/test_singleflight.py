@@ -0,0 +1,55 @@
+"""SingleFlight: coalescing, error propagation and cancellation"""
+import asyncio
+import unittest
+
+from bot.services.singleflight import SingleFlight
+
+
+class SingleFlightTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def asyncTearDown(self):
+        await self.flight.close()
+
+    async def call(self, result='value'):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def test_concurrent_calls_coalesced(self):
+        waiters = [asyncio.create_task(self.flight.do('key', self.call)) for _ in range(5)]
+        other = asyncio.create_task(self.flight.do('other', self.call))
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*waiters, other), ['value'] * 6)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.flight.stats, {'calls': 6, 'executed': 2, 'coalesced': 4})
+        self.assertEqual(len(self.flight), 0)
+
+        # A finished call is not reused
+        await self.flight.do('key', self.call)
+        self.assertEqual(self.calls, 3)
+
+    async def test_error_reaches_every_waiter(self):
+        error = RuntimeError('API down')
+        waiters = [asyncio.create_task(self.flight.do('key', lambda: self.call(error))) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        self.assertEqual(results, [error] * 3)
+        self.assertEqual(self.calls, 1)
+
+    async def test_cancelled_waiter_does_not_cancel_the_call(self):
+        first = asyncio.create_task(self.flight.do('key', self.call))
+        second = asyncio.create_task(self.flight.do('key', self.call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await second, 'value')
+        self.assertTrue(first.cancelled())
@@ -0,0 +1,85 @@
+"""UpdatePool: per-user ordering, bounded queues and instance ownership"""
+import asyncio
+import unittest
+
+from bot.services.update_pool import PoolFull, UpdatePool, UserQueueFull, owner_index
+
+
+class UpdatePoolTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await self.pool.stop(1)
+
+    def start(self, **kwargs):
+        self.pool = UpdatePool(**kwargs)
+        self.pool.start()
+        return self.pool
+
+    async def test_per_user_order(self):
+        pool = self.start(workers=4, max_pending=100, max_pending_per_user=10)
+        log, running = [], set()
+
+        def job(user, number):
+            async def run():
+                # No two workers process the same user at once
+                self.assertNotIn(user, running)
+                running.add(user)
+                await asyncio.sleep(0.001 * (3 - number))
+                running.discard(user)
+                log.append((user, number))
+            return run
+
+        for number in range(3):
+            for user in ('a', 'b', 'c'):
+                pool.submit(user, job(user, number))
+        self.assertTrue(await pool.join(1))
+        for user in ('a', 'b', 'c'):
+            self.assertEqual([number for logged, number in log if logged == user], [0, 1, 2])
+        self.assertEqual(pool.stats['processed'], 9)
+
+    async def test_overflow(self):
+        pool = self.start(workers=1, max_pending=3, max_pending_per_user=2)
+        release = asyncio.Event()
+
+        async def blocked():
+            await release.wait()
+
+        pool.submit('a', blocked)
+        pool.submit('a', blocked)
+        with self.assertRaises(UserQueueFull):  # answered with 429
+            pool.submit('a', blocked)
+        pool.submit('b', blocked)
+        with self.assertRaises(PoolFull):  # answered with 503
+            pool.submit('c', blocked)
+        self.assertEqual((pool.stats['rejected_user'], pool.stats['rejected_full']), (1, 1))
+
+        release.set()
+        self.assertTrue(await pool.join(1))
+        pool.submit('c', blocked)
+
+    async def test_failed_job_does_not_stop_the_user(self):
+        pool = self.start(workers=1)
+        done = []
+
+        async def fail():
+            raise RuntimeError('handler error')
+
+        async def succeed():
+            done.append(True)
+
+        with self.assertLogs('bot.services.update_pool', 'ERROR'):
+            pool.submit('a', fail)
+            pool.submit('a', succeed)
+            self.assertTrue(await pool.join(1))
+        self.assertEqual((done, pool.stats['failed']), ([True], 1))
+
+
+class OwnerIndexTests(unittest.TestCase):
+    def test_single_instance(self):
+        self.assertEqual({owner_index(user, 1) for user in range(100)}, {0})
+        self.assertEqual(owner_index(('chat', -100), 0), 0)
+
+    def test_stable_and_spread(self):
+        owners = [owner_index(user, 3) for user in range(300)]
+        self.assertEqual(set(owners), {0, 1, 2})
+        # Fixed values: every process and restart must pick the same owner
+        self.assertEqual([owner_index(key, 3) for key in (1, 2, 12345, ('chat', 5))], [2, 1, 0, 0])
@@ -1,9 +1,14 @@
 """Message formatters for Telegram bot"""
-from typing import Dict, Optional
+from html import escape
+from typing import Dict, List, Optional
 
 
-def format_doctor_card(doctor: Dict) -> str:
-    """Format doctor card message"""
+def format_doctor_card(
+    doctor: Dict,
+    rating_histogram: Optional[Dict[str, int]] = None,
+    reviews: Optional[List[Dict]] = None
+) -> str:
+    """Format doctor card message (with rating distribution and latest reviews if given)"""
     full_name = doctor.get('detail', 'Не указано')
     category = doctor.get('category', {}).get('title', 'Не указано') if doctor.get('category') else 'Не указано'
     clinic = doctor.get('clinic')
@@ -21,6 +26,8 @@ def format_doctor_card(doctor: Dict) -> str:
     
     if rating:
         text += f"<b>Рейтинг:</b> {rating:.1f} ({reviews_count} отзывов)\n"
+        if rating_histogram:
+            text += format_rating_histogram(rating_histogram)
     else:
         text += f"<b>Рейтинг:</b> Нет отзывов\n"
     
@@ -34,6 +41,25 @@ def format_doctor_card(doctor: Dict) -> str:
     if clinic_work_time:
         text += f"<b>Время работы:</b> {clinic_work_time}\n"
     
+    if reviews:
+        text += "\n<b>Последние отзывы:</b>\n"
+        for review in reviews:
+            text_review = review.get('detail', '')
+            if len(text_review) > 100:
+                text_review = text_review[:100] + "..."
+            text += f"{review.get('rating', 0)}/5 - {escape(text_review)}\n"
+    
+    return text
+
+
+def format_rating_histogram(histogram: Dict[str, int], width: int = 10) -> str:
+    """Format rating distribution as bars, 5 stars first"""
+    most = max(histogram.values(), default=0) or 1
+    text = ""
+    for rating in range(5, 0, -1):
+        count = histogram.get(str(rating), 0)
+        bar = "█" * round(count / most * width)
+        text += f"{rating}★ {bar} {count}\n"
     return text
 
 
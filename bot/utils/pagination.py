@@ -1,31 +1,70 @@
-"""Pagination utilities"""
-from typing import List, Any
-
-
-def paginate(items: List[Any], page: int, items_per_page: int) -> tuple[List[Any], int, bool, bool]:
-    """
-    Paginate items list
-    
-    Returns:
-        tuple: (page_items, total_pages, has_prev, has_next)
-    """
-    total_items = len(items)
-    total_pages = (total_items + items_per_page - 1) // items_per_page if total_items > 0 else 1
-    
-    start_idx = page * items_per_page
-    end_idx = start_idx + items_per_page
-    
-    page_items = items[start_idx:end_idx]
-    has_prev = page > 0
-    has_next = end_idx < total_items
-    
-    return page_items, total_pages, has_prev, has_next
+"""Pagination utilities
+
+List screens request from the API only the page they render. A `Page` keeps
+the items of that page together with the metadata needed to build navigation
+buttons: the page number for page-number pagination (categories, cities) or
+the cursors for cursor pagination (ratings, doctors of a category).
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Telegram limits callback_data to 64 bytes
+CALLBACK_DATA_LIMIT = 64
+
+
+@dataclass
+class Page:
+    """One page of a list returned by the API"""
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    page: int = 0  # Zero-based page number (page-number pagination)
+    total: Optional[int] = None  # Total items, if the API reports it
+    has_next: bool = False
+    has_previous: bool = False
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+
+    @classmethod
+    def from_page_number(cls, data: Dict[str, Any], page: int) -> "Page":
+        """Page from a `{count, next, previous, results}` response"""
+        return cls(
+            items=data.get('results', []),
+            page=page,
+            total=data.get('count'),
+            has_next=bool(data.get('next')),
+            has_previous=page > 0
+        )
+
+    @classmethod
+    def from_cursor(cls, data: Dict[str, Any]) -> "Page":
+        """Page from a `{next_cursor, previous_cursor, results}` response"""
+        return cls(
+            items=data.get('results', []),
+            has_next=bool(data.get('next_cursor')),
+            has_previous=bool(data.get('previous_cursor')),
+            next_cursor=data.get('next_cursor'),
+            previous_cursor=data.get('previous_cursor')
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.items) or self.has_previous
+
+
+def cursor_callback(prefix: str, cursor: Optional[str]) -> str:
+    """Build callback_data carrying a cursor (empty cursor means the first page)"""
+    callback_data = f"{prefix}{cursor or ''}"
+    if len(callback_data.encode()) > CALLBACK_DATA_LIMIT:
+        raise ValueError(f"callback_data is longer than {CALLBACK_DATA_LIMIT} bytes: {callback_data}")
+    return callback_data
+
+
+def parse_cursor_callback(callback_data: str, prefix: str) -> Optional[str]:
+    """Extract the cursor from callback_data built by cursor_callback"""
+    return callback_data[len(prefix):] or None
 
 
 def get_page_info(page: int, total_pages: int, total_items: int) -> str:
     """Get pagination info text"""
     if total_items == 0:
         return "Страница 1 из 1 (0 элементов)"
-    
-    return f"Страница {page + 1} из {total_pages} ({total_items} элементов)"
 
+    return f"Страница {page + 1} из {total_pages} ({total_items} элементов)"
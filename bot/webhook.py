@@ -0,0 +1,187 @@
+"""Webhook entry point for Telegram bot (alternative to long polling in bot/main.py)
+
+Telegram POSTs updates to WEBHOOK_PATH. Each update is queued in a bounded
+UpdatePool and acknowledged right away; workers process updates of one user
+in order and of different users concurrently. When the queue is full the
+request is answered with 503 (or 429 for a single flooding user) and
+Retry-After, and Telegram delivers the update again later.
+
+Several instances can run behind a load balancer (WEBHOOK_INSTANCES). The
+ordering, throttling and FSM state of a user live in one process, so every user
+is owned by one instance (owner_index of the update key). An instance that
+receives another instance's update forwards it there and answers Telegram with
+the owner's status; the balancer needs no sticky sessions.
+"""
+import asyncio
+import hmac
+import logging
+from typing import Dict, Hashable, List, Optional
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+from pydantic import ValidationError
+
+from bot.config import (
+    BOT_TOKEN,
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_WORKERS,
+    WEBHOOK_QUEUE_SIZE,
+    WEBHOOK_USER_QUEUE_SIZE,
+    WEBHOOK_RETRY_AFTER_SECONDS,
+    WEBHOOK_SHUTDOWN_TIMEOUT_SECONDS,
+    WEBHOOK_INSTANCES,
+    WEBHOOK_INSTANCE_INDEX,
+    WEBHOOK_FORWARD_TIMEOUT_SECONDS
+)
+from bot.main import create_dispatcher, set_commands
+from bot.services.api_client import APIClient
+from bot.services.update_pool import PoolFull, UpdatePool, UserQueueFull, owner_index
+
+logger = logging.getLogger(__name__)
+
+# Marks an update forwarded by another instance, so it is never forwarded again
+FORWARDED_HEADER = 'X-Bot-Forwarded-By'
+
+
+def get_update_key(update: Update) -> Hashable:
+    """Key that orders updates: the user, or the chat for updates without a user"""
+    event = update.event
+    user = getattr(event, 'from_user', None)
+    if user is not None:
+        return user.id
+    chat = getattr(event, 'chat', None)
+    if chat is not None:
+        return ('chat', chat.id)
+    return ('update', update.update_id)
+
+
+def create_app(
+    bot: Bot,
+    dp: Dispatcher,
+    pool: UpdatePool,
+    api_client: Optional[APIClient] = None,
+    secret: Optional[str] = WEBHOOK_SECRET,
+    webhook_url: Optional[str] = WEBHOOK_URL,
+    instances: List[str] = WEBHOOK_INSTANCES,
+    instance_index: int = WEBHOOK_INSTANCE_INDEX
+) -> web.Application:
+    """aiohttp application receiving updates and running the dispatcher lifecycle"""
+    if instances and not 0 <= instance_index < len(instances):
+        raise ValueError(f"WEBHOOK_INSTANCE_INDEX {instance_index} is outside WEBHOOK_INSTANCES")
+    retry_headers = {'Retry-After': str(WEBHOOK_RETRY_AFTER_SECONDS)}
+    routing: Dict[str, int] = {'forwarded': 0, 'forward_failed': 0, 'misrouted': 0}
+    peers: Dict[str, aiohttp.ClientSession] = {}
+
+    async def forward(owner: int, body: bytes) -> web.Response:
+        """Hand an update over to the instance that owns its user"""
+        headers = {'Content-Type': 'application/json', FORWARDED_HEADER: str(instance_index)}
+        if secret:
+            headers['X-Telegram-Bot-Api-Secret-Token'] = secret
+        url = f"{instances[owner]}{WEBHOOK_PATH}"
+        try:
+            async with peers['session'].post(url, data=body, headers=headers) as response:
+                routing['forwarded'] += 1
+                retry_after = response.headers.get('Retry-After')
+                return web.Response(
+                    status=response.status,
+                    headers={'Retry-After': retry_after} if retry_after else None
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Telegram delivers the update again later, possibly to another instance
+            routing['forward_failed'] += 1
+            logger.warning(f"Forwarding update to instance {owner} failed: {str(e)}")
+            return web.Response(status=503, headers=retry_headers)
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret:
+            token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+            if not hmac.compare_digest(token, secret):
+                return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={'bot': bot})
+        except (ValueError, ValidationError):
+            return web.Response(status=400)
+
+        key = get_update_key(update)
+        owner = owner_index(key, len(instances))
+        if owner != instance_index:
+            if FORWARDED_HEADER not in request.headers:
+                return await forward(owner, await request.read())
+            # Instances disagree on the list: process here rather than bounce the update
+            routing['misrouted'] += 1
+            logger.warning(f"Update of {key!r} forwarded here by instance {request.headers[FORWARDED_HEADER]}, "
+                           f"but instance {owner} owns it; check WEBHOOK_INSTANCES")
+
+        try:
+            pool.submit(key, lambda: dp.feed_update(bot, update))
+        except PoolFull:
+            return web.Response(status=503, headers=retry_headers)
+        except UserQueueFull:
+            return web.Response(status=429, headers=retry_headers)
+        return web.Response()
+
+    async def health(request: web.Request) -> web.Response:
+        data = {'pending': pool.pending, 'pool': pool.stats}
+        if len(instances) > 1:
+            data['instance'] = instance_index
+            data['routing'] = routing
+        if api_client is not None:
+            data['api'] = api_client.health()
+        return web.json_response(data)
+
+    async def on_startup(app: web.Application):
+        pool.start()
+        if len(instances) > 1:
+            peers['session'] = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=WEBHOOK_FORWARD_TIMEOUT_SECONDS)
+            )
+        await dp.emit_startup(bot=bot, **dp.workflow_data)
+        # With several instances the first one registers the webhook
+        if webhook_url and instance_index == 0:
+            await set_commands(bot)
+            await bot.set_webhook(
+                webhook_url,
+                secret_token=secret,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+                allowed_updates=dp.resolve_used_update_types()
+            )
+        logger.info("Bot started (webhook)")
+
+    async def on_shutdown(app: web.Application):
+        # Updates already acknowledged to Telegram are processed before the storage closes
+        await pool.stop(WEBHOOK_SHUTDOWN_TIMEOUT_SECONDS)
+        if 'session' in peers:
+            await peers.pop('session').close()
+        await dp.emit_shutdown(bot=bot, **dp.workflow_data)
+        if api_client is not None:
+            await api_client.close()
+        await bot.session.close()
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handle_update)
+    app.router.add_get('/health', health)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    return app
+
+
+def main():
+    """Run the bot in webhook mode"""
+    bot = Bot(token=BOT_TOKEN)
+    # Single pooled API client shared by all handlers
+    api_client = APIClient()
+    dp = create_dispatcher(api_client)
+    pool = UpdatePool(WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE, WEBHOOK_USER_QUEUE_SIZE)
+    app = create_app(bot, dp, pool, api_client)
+    web.run_app(app, host=WEBHOOK_HOST, port=WEBHOOK_PORT)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,10 +23,10 @@ class ClinicAdmin(admin.ModelAdmin):
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'telegram_id', 'category', 'patient', 'doctor', 'clinic', 'created_at')
+    list_display = ('id', 'user', 'telegram_id', 'category', 'patient', 'doctor', 'clinic', 'rating_avg', 'rating_count', 'created_at')
     list_filter = ('patient', 'doctor', 'category', 'clinic', 'geo_position')
     search_fields = ('telegram_id', 'phone_number', 'user__username', 'user__email')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('rating_sum', 'rating_count', 'rating_avg', 'created_at', 'updated_at')
     raw_id_fields = ('user',)
 
 
@@ -0,0 +1,98 @@
+"""Денормализованные агрегаты рейтинга врачей"""
+from django.db.models import Case, Count, F, FloatField, Sum, When
+from django.db.models.functions import Cast
+
+from .models import User, Review
+
+
+def _avg_expression(sum_delta=0, count_delta=0):
+    """Выражение для пересчета средней оценки по уже обновленным сумме и количеству"""
+    new_count = F('rating_count') + count_delta
+    new_sum = F('rating_sum') + sum_delta
+    return Case(
+        When(**{'rating_count__gt': -count_delta}, then=Cast(new_sum, FloatField()) / new_count),
+        default=None,
+        output_field=FloatField(),
+    )
+
+
+def apply_rating_delta(doctor_id, sum_delta, count_delta):
+    """Атомарно применить изменение суммы и количества оценок к врачу"""
+    if not doctor_id or (not sum_delta and not count_delta):
+        return
+    User.objects.filter(pk=doctor_id).update(
+        rating_sum=F('rating_sum') + sum_delta,
+        rating_count=F('rating_count') + count_delta,
+        rating_avg=_avg_expression(sum_delta, count_delta),
+    )
+
+
+def compute_doctor_aggregates(doctor_ids=None):
+    """Посчитать агрегаты с нуля по таблице отзывов: {doctor_id: (sum, count)}"""
+    reviews = Review.objects.all()
+    if doctor_ids is not None:
+        reviews = reviews.filter(doctor_id__in=doctor_ids)
+    rows = (
+        reviews.order_by()
+        .values('doctor_id')
+        .annotate(total=Sum('rating'), count=Count('id'))
+    )
+    return {row['doctor_id']: (row['total'], row['count']) for row in rows}
+
+
+def _rating_counts(doctor_id):
+    return Review.objects.filter(doctor_id=doctor_id).order_by().values_list('rating').annotate(count=Count('id'))
+
+
+def _histogram(counts):
+    return {str(rating): counts.get(rating, 0) for rating in range(1, 6)}
+
+
+def rating_histogram(doctor_id):
+    """Распределение оценок врача одним запросом: {'1': n, ..., '5': n}"""
+    return _histogram(dict(_rating_counts(doctor_id)))
+
+
+async def arating_histogram(doctor_id):
+    """rating_histogram для async views"""
+    return _histogram({rating: count async for rating, count in _rating_counts(doctor_id)})
+
+
+def find_rating_drift(doctor_ids=None):
+    """Найти врачей, у которых сохраненные агрегаты расходятся с реальными
+
+    Возвращает список кортежей (user, (old_sum, old_count), (new_sum, new_count)).
+    """
+    actual = compute_doctor_aggregates(doctor_ids)
+    users = User.objects.all()
+    if doctor_ids is not None:
+        users = users.filter(pk__in=doctor_ids)
+    users = users.filter(pk__in=actual.keys()) | users.filter(rating_count__gt=0)
+
+    drift = []
+    for user in users.only('id', 'telegram_id', 'rating_sum', 'rating_count', 'rating_avg'):
+        stored = (user.rating_sum, user.rating_count)
+        expected = actual.get(user.pk, (0, 0))
+        expected_avg = expected[0] / expected[1] if expected[1] else None
+        if stored != expected or user.rating_avg != expected_avg:
+            drift.append((user, stored, expected))
+    return drift
+
+
+def recompute_doctor_ratings(doctor_ids=None):
+    """Пересчитать агрегаты с нуля и исправить расхождения. Возвращает список расхождений
+
+    bulk_update не отправляет сигналы: материализованные рейтинги после этого
+    нужно перестроить (rebuild_leaderboards), как делает recalculate_ratings.
+    """
+    drift = find_rating_drift(doctor_ids)
+    for user, _, (total, count) in drift:
+        user.rating_sum = total
+        user.rating_count = count
+        user.rating_avg = total / count if count else None
+    User.objects.bulk_update(
+        [user for user, _, _ in drift],
+        ['rating_sum', 'rating_count', 'rating_avg'],
+        batch_size=500,
+    )
+    return drift
@@ -0,0 +1,31 @@
+"""Маршруты async-версий горячих GET endpoint'ов (подключаются под ASGI, см. med/asgi_urls.py)
+
+Пути совпадают с маршрутами роутера в urls.py и должны стоять перед ними.
+Идентификаторы - только цифры, чтобы users/doctors/ и подобные действия
+по-прежнему попадали в роутер.
+"""
+from django.urls import re_path
+
+from . import async_views
+
+urlpatterns = [
+    re_path(r'^users/(?P<pk>[0-9]+)/$', async_views.user_detail, name='user-detail-async'),
+    re_path(r'^users/(?P<pk>[0-9]+)/card/$', async_views.user_card, name='user-card-async'),
+    re_path(
+        r'^users/telegram/(?P<telegram_id>[^/.]+)/$',
+        async_views.user_by_telegram_id,
+        name='user-by-telegram-id-async'
+    ),
+    re_path(r'^users/doctors/rating/$', async_views.doctors_rating, name='user-doctors-rating-async'),
+    re_path(
+        r'^users/doctors/category/(?P<category_id>[^/.]+)/$',
+        async_views.doctors_by_category,
+        name='user-doctors-by-category-async'
+    ),
+    re_path(r'^clinics/rating/$', async_views.clinic_rating, name='clinic-rating-async'),
+    re_path(
+        r'^reviews/doctor/(?P<doctor_id>[^/.]+)/$',
+        async_views.reviews_by_doctor,
+        name='review-by-doctor-async'
+    ),
+]
@@ -0,0 +1,165 @@
+"""Async-версии горячих GET endpoint'ов для работы под ASGI
+
+Под ASGI синхронный view DRF выполняется через sync_to_async и занимает поток
+на все время обработки запроса, включая ожидание БД. Здесь данные читаются
+через async ORM (aget, async for, apaginate_queryset): в поток уходят только
+сами запросы к БД, а разбор запроса, сериализация и рендеринг выполняются в
+цикле событий.
+
+Каждое действие использует экземпляр соответствующего ViewSet: те же
+сериализаторы, fields=/expand=, пагинация, кэш ответов, согласование формата
+и обработка ошибок DRF, поэтому ответы совпадают с синхронными. Методы, кроме
+GET/HEAD, передаются синхронному view роутера. Маршруты - в api/async_urls.py,
+подключаются под ASGI (med/asgi_urls.py).
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
+from django.shortcuts import aget_object_or_404
+from rest_framework.response import Response
+
+from .aggregates import arating_histogram
+from .models import Review, User
+from .pagination import KeysetPagination
+from .ranking import RANKING_AVERAGE, RANKING_MODES
+from .serializers import UserProfileSerializer
+from .views import (
+    ClinicViewSet,
+    ReviewViewSet,
+    UserViewSet,
+    card_viewer,
+    card_viewer_queryset,
+    category_not_found_response,
+    get_int_param,
+    profile_not_found_response,
+    unknown_ranking_response,
+)
+from .urls import router
+
+# Синхронные view роутера по имени маршрута (для методов, кроме GET)
+ROUTER_VIEWS = {pattern.name: pattern.callback for pattern in router.urls}
+
+
+async def dispatch(viewset_class, action, handler, request, kwargs):
+    """APIView.dispatch для корутины handler(view, request, **kwargs)"""
+    # Endpoint'ы публичные; SessionAuthentication синхронно читал бы сессию из БД
+    view = viewset_class(action_map={'get': action, 'head': action}, authentication_classes=())
+    view.args, view.kwargs = (), kwargs
+    request = view.initialize_request(request, **kwargs)
+    view.request = request
+    view.headers = view.default_response_headers
+    try:
+        view.initial(request, **kwargs)
+        response = await handler(view, request, **kwargs)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    response = view.finalize_response(request, response, **kwargs)
+    return response.render()
+
+
+def async_action(viewset_class, action, route_name):
+    """Async view для GET-действия action ViewSet
+
+    Остальные методы обрабатывает синхронный view роутера с именем route_name.
+    """
+    fallback = sync_to_async(ROUTER_VIEWS[route_name])
+
+    def decorator(handler):
+        async def view(request, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await fallback(request, **kwargs)
+            return await dispatch(viewset_class, action, handler, request, kwargs)
+
+        # Как у APIView.as_view: CSRF проверяется аутентификацией DRF
+        view.csrf_exempt = True
+        view.__name__ = view.__qualname__ = handler.__name__
+        view.__doc__ = handler.__doc__
+        return view
+    return decorator
+
+
+async def aget_object(view):
+    """GenericAPIView.get_object через async ORM"""
+    queryset = view.filter_queryset(view.get_queryset())
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    try:
+        obj = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+    except (queryset.model.DoesNotExist, TypeError, ValueError, DjangoValidationError):
+        raise Http404
+    view.check_object_permissions(view.request, obj)
+    return obj
+
+
+async def apaginate_queryset(view, queryset):
+    """paginate_queryset ViewSet (с учетом fields=/expand=) через async ORM"""
+    return await view.paginator.apaginate_queryset(view.apply_fieldset(queryset), view.request, view=view)
+
+
+@async_action(UserViewSet, 'retrieve', 'user-detail')
+async def user_detail(view, request, pk):
+    """Пользователь (врач) по id"""
+    return Response(view.get_serializer(await aget_object(view)).data)
+
+
+@async_action(UserViewSet, 'by_telegram_id', 'user-by-telegram-id')
+async def user_by_telegram_id(view, request, telegram_id):
+    """Профиль пользователя по telegram_id"""
+    try:
+        user = await view.get_profile_queryset().aget(telegram_id=telegram_id)
+    except User.DoesNotExist:
+        return profile_not_found_response()
+    return Response(UserProfileSerializer(user).data)
+
+
+@async_action(UserViewSet, 'card', 'user-card')
+async def user_card(view, request, pk):
+    """Карточка врача: врач, первая страница отзывов, оценки и отзыв пользователя"""
+    doctor = await aget_object_or_404(User.objects.with_relations(), pk=pk, doctor=True)
+
+    paginator = KeysetPagination()
+    page = await paginator.apaginate_queryset(
+        Review.objects.with_relations().filter(doctor_id=doctor.pk), request, view=view
+    )
+    viewer = None
+    telegram_id = get_int_param(request, 'telegram_id')
+    if telegram_id is not None:
+        viewer = card_viewer(await card_viewer_queryset(telegram_id, doctor.pk).afirst())
+    return view.card_response(doctor, await arating_histogram(doctor.pk), paginator, page, viewer)
+
+
+@async_action(UserViewSet, 'doctors_rating', 'user-doctors-rating')
+async def doctors_rating(view, request):
+    """Топ врачей по рейтингу (кэшируется, как и синхронная версия)"""
+    async def build_response():
+        ranking = request.query_params.get('ranking', RANKING_AVERAGE)
+        if ranking not in RANKING_MODES:
+            return unknown_ranking_response()
+        page = await apaginate_queryset(view, view.get_rating_entries(request, ranking))
+        return view.ranked_page_response(page, ranking)
+    return await view.acached_response(request, build_response)
+
+
+@async_action(UserViewSet, 'doctors_by_category', 'user-doctors-by-category')
+async def doctors_by_category(view, request, category_id):
+    """Врачи категории по убыванию рейтинга"""
+    try:
+        category_id = int(category_id)
+    except ValueError:
+        return category_not_found_response()
+    page = await apaginate_queryset(view, view.get_category_entries(category_id))
+    return view.ranked_page_response(page, RANKING_AVERAGE)
+
+
+@async_action(ClinicViewSet, 'rating', 'clinic-rating')
+async def clinic_rating(view, request):
+    """Топ клиник по рейтингу (кэшируется, как и синхронная версия)"""
+    async def build_response():
+        return view.rating_page_response(await apaginate_queryset(view, view.get_rating_entries()))
+    return await view.acached_response(request, build_response)
+
+
+@async_action(ReviewViewSet, 'by_doctor', 'review-by-doctor')
+async def reviews_by_doctor(view, request, doctor_id):
+    """Отзывы о враче"""
+    page = await apaginate_queryset(view, Review.objects.with_relations().filter(doctor_id=doctor_id))
+    return view.get_paginated_response(view.get_serializer(page, many=True).data)
@@ -0,0 +1,180 @@
+"""Массовая загрузка отзывов и пользователей
+
+Элементы проверяются пачками: сериализатор валидирует поля без обращения к БД,
+связи разрешаются одним запросом на пачку, строки вставляются через
+bulk_create, а агрегаты и рейтинги пересчитываются один раз на пачку в той же
+транзакции, что и вставка. bulk_create не отправляет сигналы, поэтому их работа
+выполняется здесь явно.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .aggregates import apply_rating_delta
+from .cache import bump_model_version
+from .leaderboards import refresh_doctor_rankings
+from .models import Category, GeoPosition, Clinic, User, Review
+from .search import index_doctors
+from .serializers import ReviewSerializer, UserBulkSerializer
+
+# Связь пользователя -> модель, в которой ищется идентификатор
+USER_RELATIONS = (
+    ('category_id', Category),
+    ('geo_position_id', GeoPosition),
+    ('clinic_id', Clinic),
+)
+
+
+class BulkResult:
+    """Итог массовой загрузки: идентификаторы созданных строк и ошибки по элементам"""
+
+    def __init__(self):
+        self.created = []
+        self.errors = []
+
+    def add_error(self, index, errors):
+        self.errors.append({'index': index, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': len(self.created),
+            'ids': self.created,
+            'errors': sorted(self.errors, key=lambda error: error['index']),
+        }
+
+
+def iter_batches(items, batch_size=None):
+    """Разбить элементы на пачки: [(offset, batch)]"""
+    batch_size = batch_size or settings.API_BULK_BATCH_SIZE
+    for offset in range(0, len(items), batch_size):
+        yield offset, items[offset:offset + batch_size]
+
+
+def validate_batch(serializer_class, offset, batch, result):
+    """Проверить поля элементов пачки: [(index, validated_data)] для корректных"""
+    valid = []
+    for index, item in enumerate(batch, start=offset):
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            result.add_error(index, serializer.errors)
+    return valid
+
+
+def insert_batch(model, rows, result, after_insert):
+    """Вставить строки пачки и обновить зависящие от них данные (after_insert) одной транзакцией
+
+    Ошибка в after_insert откатывает и вставку: строки не остаются с устаревшими агрегатами.
+    Возвращает созданные объекты.
+    """
+    if not rows:
+        return []
+    try:
+        with transaction.atomic():
+            objects = model.objects.bulk_create([obj for _, obj in rows])
+            after_insert(objects)
+    except IntegrityError:
+        # Конфликт с параллельной записью: пачка откатывается целиком
+        for index, _ in rows:
+            result.add_error(index, {'non_field_errors': ['Конфликт при сохранении, повторите запрос']})
+        return []
+    result.created.extend(obj.pk for obj in objects)
+    return objects
+
+
+def bulk_create_reviews(items, batch_size=None):
+    """Массово создать отзывы (не более одного на пару пользователь-врач). Возвращает BulkResult"""
+    result = BulkResult()
+    for offset, batch in iter_batches(items, batch_size):
+        valid = validate_batch(ReviewSerializer, offset, batch, result)
+
+        authors = {data['user_id'] for _, data in valid}
+        doctors = {data['doctor_id'] for _, data in valid}
+        existing = set(User.objects.filter(pk__in=authors | doctors).values_list('pk', flat=True))
+        reviewed = set(
+            Review.objects.filter(user_id__in=authors, doctor_id__in=doctors)
+            .values_list('user_id', 'doctor_id')
+        )
+
+        rows = []
+        for index, data in valid:
+            errors = {
+                field: ['Пользователь не найден']
+                for field in ('user_id', 'doctor_id') if data[field] not in existing
+            }
+            pair = (data['user_id'], data['doctor_id'])
+            if pair in reviewed:
+                errors['non_field_errors'] = ['Пользователь уже оставлял отзыв этому врачу']
+            if errors:
+                result.add_error(index, errors)
+                continue
+            reviewed.add(pair)
+            rows.append((index, Review(
+                user_id=data['user_id'],
+                doctor_id=data['doctor_id'],
+                rating=data.get('rating', 3),
+                detail=data['detail'],
+            )))
+
+        insert_batch(Review, rows, result, apply_reviews)
+    return result
+
+
+def apply_reviews(reviews):
+    """Агрегаты, рейтинги и версии кэша после вставки пачки отзывов"""
+    deltas = defaultdict(lambda: [0, 0])
+    for review in reviews:
+        deltas[review.doctor_id][0] += review.rating
+        deltas[review.doctor_id][1] += 1
+    for doctor_id, (sum_delta, count_delta) in deltas.items():
+        apply_rating_delta(doctor_id, sum_delta, count_delta)
+    refresh_doctor_rankings(deltas.keys())
+    bump_model_version(Review)
+    bump_model_version(User)
+
+
+def bulk_create_users(items, batch_size=None):
+    """Массово создать пользователей (в том числе врачей). Возвращает BulkResult"""
+    result = BulkResult()
+    seen_telegram_ids = set()
+    for offset, batch in iter_batches(items, batch_size):
+        valid = validate_batch(UserBulkSerializer, offset, batch, result)
+
+        taken = set(
+            User.objects.filter(telegram_id__in=[data['telegram_id'] for _, data in valid])
+            .values_list('telegram_id', flat=True)
+        )
+        related = {
+            field: set(model.objects.filter(pk__in={data.get(field) for _, data in valid} - {None})
+                       .values_list('pk', flat=True))
+            for field, model in USER_RELATIONS
+        }
+
+        rows = []
+        for index, data in valid:
+            errors = {
+                field: ['Объект не найден']
+                for field, _ in USER_RELATIONS
+                if data.get(field) is not None and data[field] not in related[field]
+            }
+            telegram_id = data['telegram_id']
+            if telegram_id in taken or telegram_id in seen_telegram_ids:
+                errors['telegram_id'] = ['Пользователь с таким telegram_id уже существует']
+            if errors:
+                result.add_error(index, errors)
+                continue
+            seen_telegram_ids.add(telegram_id)
+            rows.append((index, User(**data)))
+
+        insert_batch(User, rows, result, apply_users)
+    return result
+
+
+def apply_users(users):
+    """Рейтинги, поисковый индекс и версии кэша после вставки пачки пользователей"""
+    doctor_ids = [user.pk for user in users if user.doctor]
+    refresh_doctor_rankings(doctor_ids)
+    index_doctors(doctor_ids)
+    bump_model_version(User)
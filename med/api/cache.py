@@ -0,0 +1,170 @@
+"""Кэш ответов для справочных endpoint'ов с инвалидацией по версии модели"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import http_date, parse_http_date_safe, quote_etag, urlencode
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY_PREFIX = 'api:version:'
+RESPONSE_KEY_PREFIX = 'api:response:'
+
+
+def _version_key(model):
+    return f'{VERSION_KEY_PREFIX}{model._meta.label_lower}'
+
+
+def _set_model_version(model):
+    cache.set(_version_key(model), (time.time_ns(), time.time()), None)
+
+
+def bump_model_version(model):
+    """Сменить версию модели: все закэшированные ответы, зависящие от нее, устаревают
+
+    Версия меняется после фиксации текущей транзакции: иначе параллельный запрос
+    успел бы закэшировать еще не зафиксированные данные под новой версией.
+    """
+    transaction.on_commit(lambda: _set_model_version(model))
+
+
+def get_model_versions(models):
+    """Текущие версии моделей: {model: (version, timestamp последнего изменения)}"""
+    keys = {_version_key(model): model for model in models}
+    stored = cache.get_many(keys)
+    versions = {}
+    for key, model in keys.items():
+        if key not in stored:
+            # Версия неизвестна (холодный кэш) - начинаем новую, чтобы не отдать чужие данные
+            cache.add(key, (time.time_ns(), time.time()), None)
+            stored[key] = cache.get(key)
+        versions[model] = stored[key]
+    return versions
+
+
+async def aget_model_versions(models):
+    """get_model_versions для async views"""
+    keys = {_version_key(model): model for model in models}
+    stored = await cache.aget_many(keys)
+    versions = {}
+    for key, model in keys.items():
+        if key not in stored:
+            await cache.aadd(key, (time.time_ns(), time.time()), None)
+            stored[key] = await cache.aget(key)
+        versions[model] = stored[key]
+    return versions
+
+
+class ResponseCacheMixin:
+    """Кэширование ответов отдельных действий ViewSet через cached_response
+
+    Ключ кэша строится из пути, отсортированных query-параметров, заголовка Accept
+    и версий моделей из get_cache_dependencies(). Версии меняются сигналами при
+    сохранении/удалении, поэтому после правок в админке устаревшие данные не
+    отдаются. Ответы содержат ETag и Last-Modified (когда секунда изменения уже
+    прошла), условные запросы
+    (If-None-Match / If-Modified-Since) получают 304 без обращения к БД. Сжатые
+    варианты ответа кэшируются под тем же ключом.
+    """
+    cache_dependencies = ()
+
+    def get_cache_dependencies(self):
+        """Модели, от которых зависит ответ текущего действия"""
+        return self.cache_dependencies
+
+    def get_cache_timeout(self):
+        return settings.API_RESPONSE_CACHE_SECONDS
+
+    def get_cache_fingerprint(self, request, versions):
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        tokens = ','.join(f'{model._meta.label_lower}={version}' for model, (version, _) in versions.items())
+        raw = f'{request.get_host()}{request.path}?{params}|{request.META.get("HTTP_ACCEPT", "")}|{tokens}'
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def is_last_modified_final(self, last_modified):
+        """Закончилась ли секунда последнего изменения
+
+        Last-Modified и If-Modified-Since точны до секунды: изменение в ту же
+        секунду, что и уже отданный ответ, не сдвинуло бы дату, и клиент получил
+        бы ложный 304. Поэтому дата сообщается и сравнивается только после того,
+        как ее секунда прошла.
+        """
+        return int(last_modified) < int(time.time())
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            # ETag точнее даты и при обоих заголовках имеет приоритет (RFC 9110, 13.2.2).
+            # Слабое сравнение: сжатый ответ (CompressionMiddleware) отдает W/-версию ETag
+            candidates = {value.strip().removeprefix('W/') for value in if_none_match.split(',')}
+            return etag in candidates or '*' in candidates
+        if not self.is_last_modified_final(last_modified):
+            return False
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return if_modified_since is not None and int(last_modified) <= if_modified_since
+
+    def set_cache_headers(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if self.is_last_modified_final(last_modified):
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'no-cache'
+        response['Vary'] = 'Accept'
+        return response
+
+    def get_cache_validators(self, request, versions):
+        """(ключ кэша, ETag, Last-Modified) ответа по версиям моделей"""
+        fingerprint = self.get_cache_fingerprint(request, versions)
+        last_modified = max((timestamp for _, timestamp in versions.values()), default=time.time())
+        return f'{RESPONSE_KEY_PREFIX}{fingerprint}', quote_etag(fingerprint), last_modified
+
+    def build_cached_response(self, data, key, etag, last_modified):
+        response = self.set_cache_headers(Response(data), etag, last_modified)
+        # Сжатое тело кэшируется рядом с данными (см. compression.py)
+        response.compressed_cache_key = key
+        response.compressed_cache_timeout = self.get_cache_timeout()
+        return response
+
+    def cached_response(self, request, build_response):
+        versions = get_model_versions(self.get_cache_dependencies())
+        key, etag, last_modified = self.get_cache_validators(request, versions)
+        if self.is_not_modified(request, etag, last_modified):
+            return self.set_cache_headers(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+        data = cache.get(key)
+        if data is None:
+            response = build_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, self.get_cache_timeout())
+        return self.build_cached_response(data, key, etag, last_modified)
+
+    async def acached_response(self, request, build_response):
+        """cached_response для async views: build_response - корутинная функция"""
+        versions = await aget_model_versions(self.get_cache_dependencies())
+        key, etag, last_modified = self.get_cache_validators(request, versions)
+        if self.is_not_modified(request, etag, last_modified):
+            return self.set_cache_headers(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+        data = await cache.aget(key)
+        if data is None:
+            response = await build_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            await cache.aset(key, data, self.get_cache_timeout())
+        return self.build_cached_response(data, key, etag, last_modified)
+
+
+class CachedResponseMixin(ResponseCacheMixin):
+    """Кэширование list/retrieve (и других действий через cached_response) для ReadOnly ViewSet"""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,121 @@
+"""Сжатие ответов API: gzip, а также brotli и zstd, если библиотеки установлены
+
+Сжимаются только ответы API (JSON и MessagePack) размером от
+API_COMPRESSION_MIN_BYTES: маленькие ответы от сжатия почти не выигрывают, а
+HTML (админка с CSRF-токенами) не сжимается из-за атаки BREACH. Кодировка
+выбирается по заголовку Accept-Encoding с учетом порядка API_COMPRESSION_ENCODINGS.
+
+Закэшированные ответы (ResponseCacheMixin) помечают ответ ключом кэша, и сжатое
+тело сохраняется рядом с ним: горячие рейтинги врачей и клиник и справочники не
+сжимаются заново на каждый запрос.
+"""
+import gzip
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        from backports import zstd
+    except ImportError:
+        zstd = None
+
+COMPRESSIBLE_MEDIA_TYPES = frozenset({'application/json', 'application/msgpack'})
+
+# Уровни сжатия для ответов, сжимаемых на лету: почти максимальная степень
+# сжатия при времени меньше миллисекунды на страницу
+COMPRESSORS = {
+    'gzip': lambda data: gzip.compress(data, compresslevel=6, mtime=0),
+}
+if brotli is not None:
+    COMPRESSORS['br'] = lambda data: brotli.compress(data, quality=5)
+if zstd is not None:
+    COMPRESSORS['zstd'] = lambda data: zstd.compress(data, level=3)
+
+
+def parse_accept_encoding(header):
+    """'gzip;q=0.5, br' -> {'gzip': 0.5, 'br': 1.0}"""
+    weights = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def choose_encoding(header):
+    """Кодировка для ответа: наибольший q клиента, при равенстве - порядок настроек"""
+    weights = parse_accept_encoding(header)
+    best, best_weight = None, 0.0
+    for encoding in settings.API_COMPRESSION_ENCODINGS:
+        if encoding not in COMPRESSORS:
+            continue
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(data, encoding):
+    return COMPRESSORS[encoding](data)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжатие ответов API больше порога по Accept-Encoding
+
+    Ответ может нести атрибуты compressed_cache_key и compressed_cache_timeout:
+    тогда сжатое тело берется из кэша и сохраняется в нем (ключ должен меняться
+    вместе с содержимым ответа).
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+        media_type = response.get('Content-Type', '').partition(';')[0].strip()
+        if media_type not in COMPRESSIBLE_MEDIA_TYPES:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        content = response.content
+        if len(content) < settings.API_COMPRESSION_MIN_BYTES:
+            return response
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        cache_key = getattr(response, 'compressed_cache_key', None)
+        body = cache.get(f'{cache_key}:{encoding}') if cache_key else None
+        if body is None:
+            body = compress(content, encoding)
+            if cache_key:
+                cache.set(f'{cache_key}:{encoding}', body, response.compressed_cache_timeout)
+        if len(body) >= len(content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = encoding
+        # Сжатое тело отличается от несжатого побайтно - ETag становится слабым
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        return response
@@ -0,0 +1,172 @@
+"""Разреженные наборы полей: параметры fields= и expand=
+
+    ?fields=id,detail,clinic.title&expand=category
+
+`fields` - список нужных полей через запятую, вложенные через точку; `expand` -
+вложенные объекты, которые нужно отдать целиком. Если передан хотя бы один из
+параметров, вложенные объекты отдаются идентификаторами (clinic: 5), кроме
+перечисленных в expand или тех, чьи поля выбраны через точку. Без параметров
+ответ не меняется.
+
+Запрос к БД строится под выбранные поля: .only() по нужным столбцам,
+select_related/prefetch_related только для раскрытых связей.
+"""
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_field_tree(value):
+    """'id,clinic.title,clinic.address' -> {'id': {}, 'clinic': {'title': {}, 'address': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+class Fieldset:
+    """Выбранные поля и раскрытые связи запроса"""
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand or {}
+
+    @classmethod
+    def from_request(cls, request):
+        """Fieldset из query-параметров (None, если ни fields, ни expand не переданы)"""
+        params = request.query_params
+        if FIELDS_PARAM not in params and EXPAND_PARAM not in params:
+            return None
+        fields = params.get(FIELDS_PARAM)
+        return cls(
+            parse_field_tree(fields) if fields else None,
+            parse_field_tree(params.get(EXPAND_PARAM, '')),
+        )
+
+    def at(self, path):
+        """(fields, expand) вложенного объекта по пути из имен полей
+
+        fields None - все поля объекта.
+        """
+        fields, expand = self.fields, self.expand
+        for name in path:
+            # Объект выбран без уточнения полей ('clinic') - все его поля
+            fields = (fields.get(name) or None) if fields is not None else None
+            expand = expand.get(name, {})
+        return fields, expand
+
+
+class SparseFieldsetMixin:
+    """Сериализатор, отдающий только поля из context['fieldset']
+
+    Вложенные сериализаторы без раскрытия заменяются идентификатором связи.
+    Поля SerializerMethodField перечисляют нужные им столбцы в Meta.method_field_sources.
+    """
+
+    def get_fieldset_path(self):
+        path = []
+        node = self
+        while node is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return path[::-1]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if fieldset is None:
+            return fields
+
+        requested, expand = fieldset.at(self.get_fieldset_path())
+        for name in list(fields):
+            field = fields[name]
+            if requested is not None and name not in requested:
+                del fields[name]
+            elif isinstance(field, serializers.BaseSerializer) and name not in expand and not (
+                requested and requested[name]
+            ):
+                fields[name] = serializers.IntegerField(source=f'{field.source or name}_id', read_only=True)
+        return fields
+
+
+def fieldset_lookups(serializer, prefix=''):
+    """Столбцы для .only(), связи для select_related и Prefetch для полей сериализатора"""
+    only, select, prefetch = [], [], []
+    sources = getattr(serializer.Meta, 'method_field_sources', {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.BaseSerializer):
+            relation = f'{prefix}{field.source}'
+            only.append(relation)
+            get_prefetch_queryset = getattr(field, 'get_prefetch_queryset', None)
+            if get_prefetch_queryset is not None:
+                # Связь с аннотациями (рейтинг клиники) подгружается отдельным запросом
+                prefetch.append(Prefetch(relation, queryset=fieldset_queryset(get_prefetch_queryset(), field)))
+                continue
+            select.append(relation)
+            nested_only, nested_select, nested_prefetch = fieldset_lookups(field, f'{relation}__')
+            only += nested_only
+            select += nested_select
+            prefetch += nested_prefetch
+        elif isinstance(field, serializers.SerializerMethodField):
+            only += [f'{prefix}{source}' for source in sources.get(name, ())]
+        elif field.source != '*':
+            only.append(f'{prefix}{field.source.replace(".", "__")}')
+    return only, select, prefetch
+
+
+def fieldset_queryset(queryset, serializer):
+    """Queryset, загружающий только то, что нужно сериализатору с разреженными полями
+
+    Связи исходного queryset сбрасываются и строятся заново по раскрытым полям;
+    ключи сортировки загружаются всегда (по ним строится курсор пагинации).
+    """
+    only, select, prefetch = fieldset_lookups(serializer)
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    only += [key.lstrip('-') for key in ordering if '__' not in key and key.lstrip('-') != 'pk']
+    return (
+        queryset.select_related(None).prefetch_related(None)
+        .select_related(*select).prefetch_related(*prefetch)
+        .only(*only)
+    )
+
+
+class SparseFieldsetViewMixin:
+    """Параметры fields= и expand= для ViewSet
+
+    Fieldset передается сериализаторам через контекст, а queryset перед
+    пагинацией (и в get_object) сужается до нужных столбцов, если он строится
+    по модели сериализатора. Действия, сериализующие объекты другой модели
+    (строки материализованного рейтинга), получают только сокращенный ответ.
+    """
+
+    def get_fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = Fieldset.from_request(self.request) if self.request.method == 'GET' else None
+        return self._fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fieldset'] = self.get_fieldset()
+        return context
+
+    def apply_fieldset(self, queryset):
+        if self.get_fieldset() is None:
+            return queryset
+        serializer = self.get_serializer()
+        if queryset.model is not serializer.Meta.model:
+            return queryset
+        return fieldset_queryset(queryset, serializer)
+
+    def filter_queryset(self, queryset):
+        return self.apply_fieldset(super().filter_queryset(queryset))
+
+    def paginate_queryset(self, queryset):
+        return super().paginate_queryset(self.apply_fieldset(queryset))
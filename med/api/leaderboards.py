@@ -0,0 +1,196 @@
+"""Материализованные рейтинги врачей и клиник
+
+Байесовская оценка всех строк считается с одним и тем же априорным средним,
+сохраненным в prior_mean. Инкрементальное обновление всегда использует
+сохраненное значение и затрагивает только строки измененных врачей. Если общая
+средняя оценка ушла от него дальше RATING_PRIOR_MEAN_TOLERANCE, рейтинг
+перестраивает `manage.py rebuild_leaderboards --if-drifted` (по расписанию), а не
+запрос, изменивший отзыв.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import bump_model_version
+from .models import Clinic, ClinicRanking, DoctorRanking, User
+from .ranking import get_global_mean, score_doctor
+
+DOCTOR_SCORE_FIELDS = ('rating', 'reviews_count', 'bayesian_score', 'wilson_score', 'prior_mean', 'updated_at')
+CLINIC_SCORE_FIELDS = ('rating', 'reviews_count', 'updated_at')
+
+RANKING_FIELDS = ('id', 'doctor', 'category_id', 'geo_position_id', 'clinic_id', 'rating_sum', 'rating_count')
+
+# Разрез рейтинга -> поле врача, по которому определяется scope_id
+SCOPE_FIELDS = (
+    (DoctorRanking.SCOPE_CATEGORY, 'category_id'),
+    (DoctorRanking.SCOPE_GEO_POSITION, 'geo_position_id'),
+    (DoctorRanking.SCOPE_CLINIC, 'clinic_id'),
+)
+
+
+def build_doctor_entries(doctor, prior_mean):
+    """Строки рейтинга для одного врача во всех разрезах, к которым он относится"""
+    if not doctor['doctor']:
+        return []
+    rating, bayesian, wilson = score_doctor(doctor['rating_sum'], doctor['rating_count'], prior_mean)
+    scopes = [(DoctorRanking.SCOPE_GLOBAL, 0)]
+    scopes += [(scope, doctor[field]) for scope, field in SCOPE_FIELDS if doctor[field]]
+    return [
+        DoctorRanking(
+            scope=scope,
+            scope_id=scope_id,
+            doctor_id=doctor['id'],
+            rating=rating,
+            reviews_count=doctor['rating_count'],
+            bayesian_score=bayesian,
+            wilson_score=wilson,
+            prior_mean=prior_mean,
+        )
+        for scope, scope_id in scopes
+    ]
+
+
+def save_doctor_entries(entries):
+    """Вставить строки рейтинга врачей, перезаписывая уже существующие
+
+    Параллельный пересчет того же врача мог вставить строку после нашего удаления.
+    """
+    return DoctorRanking.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=('scope', 'scope_id', 'doctor'),
+        update_fields=DOCTOR_SCORE_FIELDS,
+    )
+
+
+def save_clinic_entries(entries, batch_size=None):
+    """Вставить строки рейтинга клиник, перезаписывая уже существующие"""
+    return ClinicRanking.objects.bulk_create(
+        entries,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=('clinic',),
+        update_fields=CLINIC_SCORE_FIELDS,
+    )
+
+
+def refresh_clinic_rankings(clinic_ids):
+    """Пересчитать рейтинг указанных клиник по агрегатам их врачей"""
+    clinic_ids = {clinic_id for clinic_id in clinic_ids if clinic_id}
+    if not clinic_ids:
+        return
+    clinics = Clinic.objects.filter(pk__in=clinic_ids).with_rating().values('id', 'rating', 'reviews_count')
+    with transaction.atomic():
+        ClinicRanking.objects.filter(clinic_id__in=clinic_ids).delete()
+        save_clinic_entries([
+            ClinicRanking(clinic_id=row['id'], rating=row['rating'] or 0, reviews_count=row['reviews_count'])
+            for row in clinics
+        ])
+    # Сбрасывает кэш ответов о клиниках (ClinicViewSet)
+    bump_model_version(ClinicRanking)
+
+
+def get_stored_prior_mean():
+    """Априорное среднее, с которым посчитаны строки рейтинга (None, если строк нет)"""
+    return DoctorRanking.objects.values_list('prior_mean', flat=True).first()
+
+
+def prior_mean_drifted():
+    """Ушла ли общая средняя оценка от сохраненной в рейтинге дальше допустимого"""
+    prior_mean = get_stored_prior_mean()
+    if prior_mean is None:
+        return False
+    return abs(get_global_mean(refresh=True) - prior_mean) > settings.RATING_PRIOR_MEAN_TOLERANCE
+
+
+def refresh_doctor_rankings(doctor_ids):
+    """Инкрементально обновить рейтинги для указанных врачей и их клиник
+
+    Строки врачей переписываются целиком, поэтому смена категории, города
+    или клиники врача тоже учитывается. Врачи, которых уже нет в БД, просто
+    убираются из рейтинга. Оценки считаются с сохраненным априорным средним,
+    даже если общая средняя уже изменилась (см. prior_mean_drifted).
+    """
+    doctor_ids = {doctor_id for doctor_id in doctor_ids if doctor_id}
+    if not doctor_ids:
+        return
+    prior_mean = get_stored_prior_mean()
+    if prior_mean is None:
+        # Рейтинг пуст - согласовывать оценки не с чем
+        prior_mean = get_global_mean()
+    doctors = list(User.objects.filter(pk__in=doctor_ids).values(*RANKING_FIELDS))
+    previous_clinics = set(
+        DoctorRanking.objects.filter(doctor_id__in=doctor_ids, scope=DoctorRanking.SCOPE_CLINIC)
+        .values_list('scope_id', flat=True)
+    )
+
+    with transaction.atomic():
+        DoctorRanking.objects.filter(doctor_id__in=doctor_ids).delete()
+        save_doctor_entries([
+            entry for doctor in doctors for entry in build_doctor_entries(doctor, prior_mean)
+        ])
+        refresh_clinic_rankings(previous_clinics | {doctor['clinic_id'] for doctor in doctors})
+    # Сбрасывает кэш рейтинга врачей (UserViewSet.doctors_rating)
+    bump_model_version(DoctorRanking)
+
+
+def refresh_doctor_rankings_on_commit(doctor_ids):
+    """refresh_doctor_rankings после фиксации текущей транзакции
+
+    Для сигналов: при каскадном удалении врача отзывы удаляются раньше него,
+    и пересчет внутри транзакции снова вставил бы строки удаляемого врача.
+    """
+    transaction.on_commit(partial(refresh_doctor_rankings, list(doctor_ids)))
+
+
+def refresh_clinic_rankings_on_commit(clinic_ids):
+    """refresh_clinic_rankings после фиксации текущей транзакции"""
+    transaction.on_commit(partial(refresh_clinic_rankings, list(clinic_ids)))
+
+
+def rebuild_leaderboards(batch_size=1000):
+    """Полностью перестроить материализованные рейтинги. Возвращает (строк врачей, строк клиник)
+
+    Общая средняя оценка считается заново один раз и сохраняется во всех строках.
+    """
+    prior_mean = get_global_mean(refresh=True)
+    doctor_rows = 0
+    with transaction.atomic():
+        DoctorRanking.objects.all().delete()
+        batch = []
+        for doctor in User.objects.filter(doctor=True).order_by('pk').values(*RANKING_FIELDS).iterator(batch_size):
+            batch.extend(build_doctor_entries(doctor, prior_mean))
+            if len(batch) >= batch_size:
+                doctor_rows += len(save_doctor_entries(batch))
+                batch = []
+        doctor_rows += len(save_doctor_entries(batch))
+
+        ClinicRanking.objects.all().delete()
+        clinic_rows = len(save_clinic_entries(
+            [
+                ClinicRanking(clinic_id=row['id'], rating=row['rating'] or 0, reviews_count=row['reviews_count'])
+                for row in Clinic.objects.with_rating().values('id', 'rating', 'reviews_count').iterator(batch_size)
+            ],
+            batch_size=batch_size,
+        ))
+    bump_model_version(DoctorRanking)
+    bump_model_version(ClinicRanking)
+    return doctor_rows, clinic_rows
+
+
+def doctor_leaderboard(mode_order, category=None, geo_position=None, clinic=None):
+    """Строки рейтинга врачей для выборки: наиболее узкий разрез читается по индексу,
+    остальные фильтры применяются к врачу"""
+    filters = {'category': category, 'geo_position': geo_position, 'clinic': clinic}
+    scope, scope_id = DoctorRanking.SCOPE_GLOBAL, 0
+    for candidate in (DoctorRanking.SCOPE_CLINIC, DoctorRanking.SCOPE_CATEGORY, DoctorRanking.SCOPE_GEO_POSITION):
+        if filters[candidate]:
+            scope, scope_id = candidate, filters.pop(candidate)
+            break
+
+    entries = DoctorRanking.objects.filter(scope=scope, scope_id=scope_id)
+    for field, value in filters.items():
+        if value:
+            entries = entries.filter(**{f'doctor__{field}_id': value})
+    return entries.order_by(*mode_order)
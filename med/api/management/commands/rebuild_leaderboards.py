@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api.leaderboards import prior_mean_drifted, rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает материализованные рейтинги врачей и клиник'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета при вставке строк рейтинга',
+        )
+        parser.add_argument(
+            '--if-drifted',
+            action='store_true',
+            help='Перестроить, только если общая средняя оценка ушла от сохраненной '
+                 'дальше RATING_PRIOR_MEAN_TOLERANCE (для запуска по расписанию)',
+        )
+
+    def handle(self, *args, **options):
+        if options['if_drifted'] and not prior_mean_drifted():
+            self.stdout.write('Общая средняя оценка не изменилась, перестроение не требуется')
+            return
+        self.stdout.write('Перестроение рейтингов...')
+        doctor_rows, clinic_rows = rebuild_leaderboards(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('\n[SUCCESS] Рейтинги перестроены'))
+        self.stdout.write(f'  - Строк рейтинга врачей: {doctor_rows}')
+        self.stdout.write(f'  - Строк рейтинга клиник: {clinic_rows}')
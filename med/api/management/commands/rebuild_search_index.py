@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.search import is_supported, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает полнотекстовый индекс поиска врачей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета при индексации врачей',
+        )
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            self.stdout.write(self.style.WARNING('Полнотекстовый индекс поддерживается только на SQLite'))
+            return
+        self.stdout.write('Перестроение поискового индекса...')
+        indexed = rebuild_search_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('\n[SUCCESS] Поисковый индекс перестроен'))
+        self.stdout.write(f'  - Врачей в индексе: {indexed}')
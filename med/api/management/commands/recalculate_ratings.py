@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from api.aggregates import find_rating_drift, recompute_doctor_ratings
+from api.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает агрегаты рейтинга врачей с нуля, сообщает о расхождениях '
+        'и перестраивает материализованные рейтинги'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, не исправляя их',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        self.stdout.write('Проверка агрегатов рейтинга врачей...')
+
+        drift = find_rating_drift() if dry_run else recompute_doctor_ratings()
+
+        for user, (old_sum, old_count), (new_sum, new_count) in drift:
+            self.stdout.write(
+                f'  [DRIFT] Врач {user.telegram_id} (ID: {user.pk}): '
+                f'сумма {old_sum} -> {new_sum}, отзывов {old_count} -> {new_count}'
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('\n[SUCCESS] Расхождений не найдено'))
+        elif dry_run:
+            self.stdout.write(self.style.WARNING(f'\nНайдено расхождений: {len(drift)} (не исправлены, --dry-run)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'\n[SUCCESS] Исправлено расхождений: {len(drift)}'))
+
+        if not dry_run:
+            # bulk_update не отправляет сигналы: рейтинги по исправленным агрегатам строятся заново
+            doctor_rows, clinic_rows = rebuild_leaderboards()
+            self.stdout.write(f'Рейтинги перестроены: строк врачей {doctor_rows}, строк клиник {clinic_rows}')
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import Count, Sum
+
+# Повторы возможны только до миграции 0009 (ограничение unique_review_per_doctor),
+# поэтому команда работает с моделями в состоянии схемы на 0008: текущие модели
+# и их сигналы рассчитаны на более позднюю схему
+SCHEMA_STATE = ('api', '0008_doctor_search')
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет повторные отзывы пользователя об одном враче (остается последний) '
+        'и пересчитывает агрегаты рейтинга затронутых врачей. Нужна перед миграцией '
+        '0009_review_unique_per_doctor'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать повторы, не удаляя их',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        apps = MigrationLoader(connection).project_state(SCHEMA_STATE).apps
+        User = apps.get_model('api', 'User')
+        Review = apps.get_model('api', 'Review')
+
+        self.stdout.write('Поиск повторных отзывов...')
+        duplicates = (
+            Review.objects.order_by('user_id', 'doctor_id')
+            .values('user_id', 'doctor_id')
+            .annotate(count=Count('id'))
+            .filter(count__gt=1)
+        )
+        removed, doctor_ids = [], set()
+        for pair in duplicates:
+            reviews = list(
+                Review.objects.filter(user_id=pair['user_id'], doctor_id=pair['doctor_id'])
+                .order_by('-created_at', '-pk')
+                .values_list('pk', 'rating')
+            )
+            (keep, _), extra = reviews[0], reviews[1:]
+            self.stdout.write(
+                f'  [DUPLICATE] Пользователь {pair["user_id"]}, врач {pair["doctor_id"]}: '
+                f'остается отзыв {keep}, удаляются '
+                + ', '.join(f'{pk} (оценка {rating})' for pk, rating in extra)
+            )
+            removed.extend(pk for pk, _ in extra)
+            doctor_ids.add(pair['doctor_id'])
+
+        if not removed:
+            self.stdout.write(self.style.SUCCESS('\n[SUCCESS] Повторных отзывов не найдено'))
+            return
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'\nНайдено повторных отзывов: {len(removed)} (не удалены, --dry-run)'))
+            return
+
+        with transaction.atomic():
+            Review.objects.filter(pk__in=removed).delete()
+            rows = (
+                Review.objects.filter(doctor_id__in=doctor_ids).order_by()
+                .values('doctor_id')
+                .annotate(total=Sum('rating'), count=Count('id'))
+            )
+            for row in rows:
+                User.objects.filter(pk=row['doctor_id']).update(
+                    rating_sum=row['total'],
+                    rating_count=row['count'],
+                    rating_avg=row['total'] / row['count'],
+                )
+        self.stdout.write(self.style.SUCCESS(f'\n[SUCCESS] Удалено повторных отзывов: {len(removed)}'))
+        self.stdout.write('Выполните migrate: миграция 0010 перестроит рейтинги по исправленным агрегатам')
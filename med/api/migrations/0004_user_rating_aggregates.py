@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:48
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    Review = apps.get_model('api', 'Review')
+    rows = (
+        Review.objects.order_by()
+        .values('doctor_id')
+        .annotate(total=Sum('rating'), count=Count('id'))
+    )
+    for row in rows:
+        User.objects.filter(pk=row['doctor_id']).update(
+            rating_sum=row['total'],
+            rating_count=row['count'],
+            rating_avg=row['total'] / row['count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_review_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='rating_avg',
+            field=models.FloatField(blank=True, null=True, verbose_name='Средняя оценка'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество отзывов'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
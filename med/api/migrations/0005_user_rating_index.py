@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_user_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['doctor', '-rating_avg', '-rating_count'], name='api_user_doctor_38a80c_idx'),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:52
+
+import math
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Параметры и формулы ранжирования на момент миграции (api.ranking и настройки
+# RATING_*): миграция не должна зависеть от кода приложения, который может измениться
+PRIOR_WEIGHT = 10
+WILSON_Z = 1.96
+
+
+def bayesian_average(rating_sum, rating_count, prior_mean):
+    return (prior_mean * PRIOR_WEIGHT + rating_sum) / (PRIOR_WEIGHT + rating_count)
+
+
+def wilson_lower_bound(rating_sum, rating_count):
+    if not rating_count:
+        return 0.0
+    n = rating_count
+    p = (rating_sum / n - 1) / 4
+    z2 = WILSON_Z * WILSON_Z
+    lower = (p + z2 / (2 * n) - WILSON_Z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n))) / (1 + z2 / n)
+    return 1 + 4 * lower
+
+
+def build_leaderboards(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    DoctorRanking = apps.get_model('api', 'DoctorRanking')
+    ClinicRanking = apps.get_model('api', 'ClinicRanking')
+
+    doctors = list(User.objects.filter(doctor=True).values(
+        'id', 'category_id', 'geo_position_id', 'clinic_id', 'rating_sum', 'rating_count'
+    ))
+    total = sum(d['rating_sum'] for d in doctors)
+    count = sum(d['rating_count'] for d in doctors)
+    prior_mean = total / count if count else 3.0
+
+    entries = []
+    clinics = {}
+    for d in doctors:
+        n = d['rating_count']
+        scores = dict(
+            rating=d['rating_sum'] / n if n else 0.0,
+            reviews_count=n,
+            bayesian_score=bayesian_average(d['rating_sum'], n, prior_mean) if n else 0.0,
+            wilson_score=wilson_lower_bound(d['rating_sum'], n),
+        )
+        scopes = [('global', 0), ('category', d['category_id']),
+                  ('geo_position', d['geo_position_id']), ('clinic', d['clinic_id'])]
+        for scope, scope_id in scopes:
+            if scope == 'global' or scope_id:
+                entries.append(DoctorRanking(scope=scope, scope_id=scope_id, doctor_id=d['id'], **scores))
+        if d['clinic_id']:
+            clinic_total, clinic_count = clinics.get(d['clinic_id'], (0, 0))
+            clinics[d['clinic_id']] = (clinic_total + d['rating_sum'], clinic_count + n)
+
+    DoctorRanking.objects.bulk_create(entries, batch_size=1000)
+    ClinicRanking.objects.bulk_create([
+        ClinicRanking(clinic_id=clinic_id, rating=round(t / c, 2) if c else 0, reviews_count=c)
+        for clinic_id, (t, c) in clinics.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_user_rating_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClinicRanking',
+            fields=[
+                ('clinic', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='api.clinic', verbose_name='Клиника')),
+                ('rating', models.FloatField(default=0, verbose_name='Средняя оценка')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Позиция в рейтинге клиник',
+                'verbose_name_plural': 'Рейтинг клиник',
+                'indexes': [models.Index(fields=['-rating', '-reviews_count', 'clinic'], name='api_clinicr_rating_5e63be_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DoctorRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('global', 'Общий'), ('category', 'Категория'), ('geo_position', 'Геопозиция'), ('clinic', 'Клиника')], max_length=20, verbose_name='Разрез')),
+                ('scope_id', models.PositiveIntegerField(default=0, verbose_name='ID объекта разреза')),
+                ('rating', models.FloatField(default=0, verbose_name='Средняя оценка')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('bayesian_score', models.FloatField(default=0, verbose_name='Байесовская оценка')),
+                ('wilson_score', models.FloatField(default=0, verbose_name='Оценка Уилсона')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='api.user', verbose_name='Врач')),
+            ],
+            options={
+                'verbose_name': 'Позиция в рейтинге врачей',
+                'verbose_name_plural': 'Рейтинг врачей',
+                'indexes': [models.Index(fields=['scope', 'scope_id', '-rating', '-reviews_count', 'doctor'], name='api_doctorr_scope_4d57ae_idx'), models.Index(fields=['scope', 'scope_id', '-bayesian_score', '-reviews_count', 'doctor'], name='api_doctorr_scope_e14cdb_idx'), models.Index(fields=['scope', 'scope_id', '-wilson_score', '-reviews_count', 'doctor'], name='api_doctorr_scope_fd57aa_idx')],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'scope_id', 'doctor'), name='unique_doctor_ranking')],
+            },
+        ),
+        migrations.RunPython(build_leaderboards, migrations.RunPython.noop),
+    ]
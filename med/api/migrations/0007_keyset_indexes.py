@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_leaderboards'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='review',
+            name='api_review_user_id_6c3434_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='api_review_doctor__f02f0a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='supportrequest',
+            name='api_support_user_id_0adf27_idx',
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', '-created_at'], name='api_review_user_id_3c2688_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['doctor', '-created_at'], name='api_review_doctor__b1230b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at'], name='api_review_created_d6f89e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportrequest',
+            index=models.Index(fields=['user', '-created_at'], name='api_support_user_id_aa026c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportrequest',
+            index=models.Index(fields=['-created_at'], name='api_support_created_ed744b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['doctor', '-created_at'], name='api_user_doctor_afff2f_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+# DDL и нормализация текста на момент миграции (api.search): миграция не должна
+# зависеть от кода приложения, который может измениться
+SEARCH_TABLE = 'api_doctor_search'
+CREATE_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+    "USING fts5(name, category, clinic, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+DROP_TABLE_SQL = f'DROP TABLE IF EXISTS {SEARCH_TABLE}'
+INSERT_SQL = f'INSERT INTO {SEARCH_TABLE}(rowid, name, category, clinic) VALUES (%s, %s, %s, %s)'
+
+
+def normalize(text):
+    return (text or '').casefold().replace('ё', 'е')
+
+
+def create_search_index(apps, schema_editor):
+    # Полнотекстовый индекс есть только на SQLite
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    User = apps.get_model('api', 'User')
+    schema_editor.execute(CREATE_TABLE_SQL)
+    rows = [
+        (row['id'], normalize(row['detail']), normalize(row['category__title']), normalize(row['clinic__title']))
+        for row in User.objects.filter(doctor=True).values('id', 'detail', 'category__title', 'clinic__title')
+    ]
+    if not rows:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(INSERT_SQL, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_TABLE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
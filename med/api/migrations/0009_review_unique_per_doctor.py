@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:59
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_reviews(apps, schema_editor):
+    """Остановить миграцию, если у пользователя несколько отзывов об одном враче
+
+    Удалять их молча нельзя: отменить удаление потом не получится. Повторы
+    выводятся в ошибке, удалить их можно командой `manage.py remove_duplicate_reviews`.
+    """
+    Review = apps.get_model('api', 'Review')
+    duplicates = list(
+        Review.objects.order_by('user_id', 'doctor_id')
+        .values('user_id', 'doctor_id')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+    )
+    if not duplicates:
+        return
+    lines = [
+        f'  пользователь {pair["user_id"]}, врач {pair["doctor_id"]}: отзывы '
+        + ', '.join(str(pk) for pk in Review.objects.filter(
+            user_id=pair['user_id'], doctor_id=pair['doctor_id']
+        ).order_by('pk').values_list('pk', flat=True))
+        for pair in duplicates
+    ]
+    raise RuntimeError(
+        f'Найдены повторные отзывы пользователей об одном враче ({len(duplicates)} пар):\n'
+        + '\n'.join(lines)
+        + '\nПросмотрите их (`manage.py remove_duplicate_reviews --dry-run`), удалите '
+        '(`manage.py remove_duplicate_reviews`) и повторите migrate.'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_doctor_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('user', 'doctor'), name='unique_review_per_doctor'),
+        ),
+    ]
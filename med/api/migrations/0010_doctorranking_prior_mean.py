@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:11
+
+import math
+
+from django.db import migrations, models
+
+# Параметры и формулы ранжирования на момент миграции (api.ranking и настройки
+# RATING_*): миграция не должна зависеть от кода приложения, который может измениться
+PRIOR_WEIGHT = 10
+WILSON_Z = 1.96
+SCORE_PRECISION = 6
+
+
+def bayesian_average(rating_sum, rating_count, prior_mean):
+    return (prior_mean * PRIOR_WEIGHT + rating_sum) / (PRIOR_WEIGHT + rating_count)
+
+
+def wilson_lower_bound(rating_sum, rating_count):
+    n = rating_count
+    p = (rating_sum / n - 1) / 4
+    z2 = WILSON_Z * WILSON_Z
+    lower = (p + z2 / (2 * n) - WILSON_Z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n))) / (1 + z2 / n)
+    return 1 + 4 * lower
+
+
+def rebuild_leaderboards(apps, schema_editor):
+    """Перестроить рейтинги с актуальной общей средней и сохранить ее в prior_mean
+
+    Иначе существующие строки получили бы prior_mean=0, и инкрементальные
+    обновления считали бы байесовскую оценку с другим априорным средним.
+    Заодно учитываются агрегаты, исправленные `remove_duplicate_reviews` перед 0009.
+    """
+    User = apps.get_model('api', 'User')
+    DoctorRanking = apps.get_model('api', 'DoctorRanking')
+    ClinicRanking = apps.get_model('api', 'ClinicRanking')
+
+    doctors = list(User.objects.filter(doctor=True).values(
+        'id', 'category_id', 'geo_position_id', 'clinic_id', 'rating_sum', 'rating_count'
+    ))
+    total = sum(d['rating_sum'] for d in doctors)
+    count = sum(d['rating_count'] for d in doctors)
+    prior_mean = total / count if count else 3.0
+
+    entries = []
+    clinics = {}
+    for d in doctors:
+        n = d['rating_count']
+        scores = (
+            (d['rating_sum'] / n, bayesian_average(d['rating_sum'], n, prior_mean), wilson_lower_bound(d['rating_sum'], n))
+            if n else (0.0, 0.0, 0.0)
+        )
+        rating, bayesian, wilson = (round(score, SCORE_PRECISION) for score in scores)
+        scopes = [('global', 0), ('category', d['category_id']),
+                  ('geo_position', d['geo_position_id']), ('clinic', d['clinic_id'])]
+        for scope, scope_id in scopes:
+            if scope == 'global' or scope_id:
+                entries.append(DoctorRanking(
+                    scope=scope, scope_id=scope_id, doctor_id=d['id'], rating=rating, reviews_count=n,
+                    bayesian_score=bayesian, wilson_score=wilson, prior_mean=prior_mean,
+                ))
+        if d['clinic_id']:
+            clinic_total, clinic_count = clinics.get(d['clinic_id'], (0, 0))
+            clinics[d['clinic_id']] = (clinic_total + d['rating_sum'], clinic_count + n)
+
+    DoctorRanking.objects.all().delete()
+    DoctorRanking.objects.bulk_create(entries, batch_size=1000)
+    ClinicRanking.objects.all().delete()
+    ClinicRanking.objects.bulk_create([
+        ClinicRanking(clinic_id=clinic_id, rating=round(t / c, 2) if c else 0, reviews_count=c)
+        for clinic_id, (t, c) in clinics.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_review_unique_per_doctor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctorranking',
+            name='prior_mean',
+            field=models.FloatField(default=0, verbose_name='Априорное среднее байесовской оценки'),
+        ),
+        migrations.RunPython(rebuild_leaderboards, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User as AuthUser
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Avg, Count
+from django.db.models import Case, F, FloatField, Q, Sum, When
+from django.db.models.functions import Cast, Coalesce, Round
 
 
 class Category(models.Model):
@@ -30,6 +31,24 @@ class GeoPosition(models.Model):
         return self.title
 
 
+class ClinicQuerySet(models.QuerySet):
+    def with_rating(self):
+        """Аннотировать клиники рейтингом и количеством отзывов одним запросом"""
+        doctors = Q(users__doctor=True)
+        return self.annotate(
+            rating_total=Coalesce(Sum('users__rating_sum', filter=doctors), 0),
+            reviews_count=Coalesce(Sum('users__rating_count', filter=doctors), 0),
+        ).annotate(
+            rating=Case(
+                When(reviews_count__gt=0, then=Round(
+                    Cast('rating_total', FloatField()) / F('reviews_count'), 2
+                )),
+                default=None,
+                output_field=FloatField(),
+            )
+        )
+
+
 class Clinic(models.Model):
     """Клиники"""
     title = models.CharField(max_length=255, verbose_name="Название")
@@ -38,32 +57,57 @@ class Clinic(models.Model):
     email = models.EmailField(verbose_name="Email")
     work_time = models.TextField(verbose_name="Время работы")
 
+    objects = ClinicQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Клиника"
         verbose_name_plural = "Клиники"
         ordering = ['title']
 
+    def _get_totals(self):
+        """Сумма оценок и количество отзывов по денормализованным агрегатам врачей"""
+        return self.users.filter(doctor=True).aggregate(
+            total=Sum('rating_sum'),
+            count=Sum('rating_count'),
+        )
+
     def get_rating(self):
         """Получить средний рейтинг клиники (на основе отзывов к врачам этой клиники)"""
-        doctors = self.users.filter(doctor=True)
-        if not doctors.exists():
+        if hasattr(self, 'rating'):
+            return self.rating
+        totals = self._get_totals()
+        if not totals['count']:
             return None
-        
-        all_reviews = Review.objects.filter(doctor__in=doctors)
-        avg_rating = all_reviews.aggregate(Avg('rating'))['rating__avg']
-        return round(avg_rating, 2) if avg_rating else None
+        return round(totals['total'] / totals['count'], 2)
 
     def get_reviews_count(self):
         """Получить количество отзывов о клинике (сумма отзывов к врачам клиники)"""
-        doctors = self.users.filter(doctor=True)
-        if not doctors.exists():
-            return 0
-        return Review.objects.filter(doctor__in=doctors).count()
+        if hasattr(self, 'reviews_count'):
+            return self.reviews_count
+        return self._get_totals()['count'] or 0
 
     def __str__(self):
         return self.title
 
 
+def user_relations(prefix=''):
+    """Связи пользователя для select_related/prefetch_related с учетом пути до него
+
+    Клиника подгружается отдельным запросом сразу с аннотированным рейтингом,
+    чтобы вложенный ClinicSerializer не выполнял запросы для каждой строки.
+    """
+    select = [f'{prefix}category', f'{prefix}geo_position']
+    prefetch = [models.Prefetch(f'{prefix}clinic', queryset=Clinic.objects.with_rating())]
+    return select, prefetch
+
+
+class UserQuerySet(models.QuerySet):
+    def with_relations(self):
+        """Заранее подгрузить категорию, геопозицию и клинику с рейтингом"""
+        select, prefetch = user_relations()
+        return self.select_related(*select).prefetch_related(*prefetch)
+
+
 class User(models.Model):
     """Пользователи системы"""
     user = models.OneToOneField(
@@ -103,34 +147,48 @@ class User(models.Model):
     )
     patient = models.BooleanField(default=False, verbose_name="Пациент")
     doctor = models.BooleanField(default=False, verbose_name="Врач")
+    # Денормализованные агрегаты отзывов (поддерживаются сигналами api.signals)
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="Сумма оценок")
+    rating_count = models.PositiveIntegerField(default=0, verbose_name="Количество отзывов")
+    rating_avg = models.FloatField(null=True, blank=True, verbose_name="Средняя оценка")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
 
+    objects = UserQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['telegram_id']),
+            models.Index(fields=['doctor', '-rating_avg', '-rating_count']),
+            models.Index(fields=['doctor', '-created_at']),
         ]
 
     def get_rating(self):
         """Получить средний рейтинг врача"""
         if not self.doctor:
             return None
-        avg_rating = self.reviews_received.aggregate(Avg('rating'))['rating__avg']
-        return round(avg_rating, 2) if avg_rating else None
+        return round(self.rating_avg, 2) if self.rating_avg else None
 
     def get_reviews_count(self):
         """Получить количество отзывов о враче"""
         if not self.doctor:
             return 0
-        return self.reviews_received.count()
+        return self.rating_count
 
     def __str__(self):
         return f"{self.user.username if self.user else 'N/A'} (Telegram: {self.telegram_id})"
 
 
+class SupportRequestQuerySet(models.QuerySet):
+    def with_relations(self):
+        """Заранее подгрузить автора запроса со всеми связями"""
+        select, prefetch = user_relations('user__')
+        return self.select_related('user', *select).prefetch_related(*prefetch)
+
+
 class SupportRequest(models.Model):
     """Запросы в поддержку"""
     user = models.ForeignKey(
@@ -142,18 +200,31 @@ class SupportRequest(models.Model):
     detail = models.TextField(verbose_name="Детали запроса")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
 
+    objects = SupportRequestQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Запрос в поддержку"
         verbose_name_plural = "Запросы в поддержку"
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user']),
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['-created_at']),
         ]
 
     def __str__(self):
         return f"Запрос от {self.user.telegram_id}"
 
 
+class ReviewQuerySet(models.QuerySet):
+    def with_relations(self):
+        """Заранее подгрузить автора и врача со всеми связями"""
+        user_select, user_prefetch = user_relations('user__')
+        doctor_select, doctor_prefetch = user_relations('doctor__')
+        return self.select_related('user', 'doctor', *user_select, *doctor_select).prefetch_related(
+            *user_prefetch, *doctor_prefetch
+        )
+
+
 class Review(models.Model):
     """Отзывы"""
     user = models.ForeignKey(
@@ -177,14 +248,90 @@ class Review(models.Model):
     detail = models.TextField(verbose_name="Текст отзыва")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
 
+    objects = ReviewQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Отзыв"
         verbose_name_plural = "Отзывы"
         ordering = ['-created_at']
+        constraints = [
+            # Один отзыв пользователя на врача; индекс ограничения обслуживает проверку существования
+            models.UniqueConstraint(fields=['user', 'doctor'], name='unique_review_per_doctor'),
+        ]
         indexes = [
-            models.Index(fields=['user']),
-            models.Index(fields=['doctor']),
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['doctor', '-created_at']),
+            models.Index(fields=['-created_at']),
         ]
 
     def __str__(self):
         return f"Отзыв от {self.user.telegram_id} для врача {self.doctor.telegram_id}"
+
+
+class DoctorRanking(models.Model):
+    """Материализованный рейтинг врачей (общий и в разрезе категории, города, клиники)"""
+    SCOPE_GLOBAL = 'global'
+    SCOPE_CATEGORY = 'category'
+    SCOPE_GEO_POSITION = 'geo_position'
+    SCOPE_CLINIC = 'clinic'
+    SCOPE_CHOICES = [
+        (SCOPE_GLOBAL, 'Общий'),
+        (SCOPE_CATEGORY, 'Категория'),
+        (SCOPE_GEO_POSITION, 'Геопозиция'),
+        (SCOPE_CLINIC, 'Клиника'),
+    ]
+
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES, verbose_name="Разрез")
+    scope_id = models.PositiveIntegerField(default=0, verbose_name="ID объекта разреза")
+    doctor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='rankings',
+        verbose_name="Врач"
+    )
+    rating = models.FloatField(default=0, verbose_name="Средняя оценка")
+    reviews_count = models.PositiveIntegerField(default=0, verbose_name="Количество отзывов")
+    bayesian_score = models.FloatField(default=0, verbose_name="Байесовская оценка")
+    wilson_score = models.FloatField(default=0, verbose_name="Оценка Уилсона")
+    # Одинаково у всех строк: при заметном изменении общей средней рейтинг перестраивается целиком
+    prior_mean = models.FloatField(default=0, verbose_name="Априорное среднее байесовской оценки")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        verbose_name = "Позиция в рейтинге врачей"
+        verbose_name_plural = "Рейтинг врачей"
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'scope_id', 'doctor'], name='unique_doctor_ranking'),
+        ]
+        indexes = [
+            models.Index(fields=['scope', 'scope_id', '-rating', '-reviews_count', 'doctor']),
+            models.Index(fields=['scope', 'scope_id', '-bayesian_score', '-reviews_count', 'doctor']),
+            models.Index(fields=['scope', 'scope_id', '-wilson_score', '-reviews_count', 'doctor']),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.scope_id} - врач {self.doctor_id} ({self.rating:.2f})"
+
+
+class ClinicRanking(models.Model):
+    """Материализованный рейтинг клиник"""
+    clinic = models.OneToOneField(
+        Clinic,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name="Клиника"
+    )
+    rating = models.FloatField(default=0, verbose_name="Средняя оценка")
+    reviews_count = models.PositiveIntegerField(default=0, verbose_name="Количество отзывов")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        verbose_name = "Позиция в рейтинге клиник"
+        verbose_name_plural = "Рейтинг клиник"
+        indexes = [
+            models.Index(fields=['-rating', '-reviews_count', 'clinic']),
+        ]
+
+    def __str__(self):
+        return f"Клиника {self.clinic_id} ({self.rating:.2f})"
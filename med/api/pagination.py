@@ -0,0 +1,180 @@
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """Постраничная пагинация с настраиваемым размером страницы"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """Keyset (курсорная) пагинация по ключам сортировки queryset
+
+    Ключи берутся из order_by queryset (или Meta.ordering модели), в конец
+    добавляется первичный ключ для однозначности. Следующая страница выбирается
+    условием "строго после последней строки" по индексу, без COUNT(*) и OFFSET,
+    поэтому стоимость не зависит от глубины. Курсор - короткая непрозрачная
+    строка, пригодная для callback_data в Telegram.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.get_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset для async views: строки загружаются через async ORM"""
+        return self.get_page([row async for row in self.get_page_queryset(queryset, request)])
+
+    def get_page_queryset(self, queryset, request):
+        """Queryset строк страницы (на одну больше, чтобы узнать, есть ли следующая)"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_keys(queryset)
+        queryset = queryset.order_by(*self.keys)
+
+        direction, values = self.decode_cursor(request, queryset.model)
+        self.reverse = direction == 'p'
+        self.after_cursor = values is not None
+        if values is not None:
+            queryset = queryset.filter(self.build_filter(values, self.reverse))
+        if self.reverse:
+            queryset = queryset.reverse()
+        return queryset[:self.page_size + 1]
+
+    def get_page(self, rows):
+        """Строки страницы и курсоры соседних страниц по результату get_page_queryset"""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.after_cursor
+
+        self.next_cursor = self.encode_cursor('n', rows[-1]) if rows and self.has_next else None
+        self.previous_cursor = self.encode_cursor('p', rows[0]) if rows and self.has_previous else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_keys(self, queryset):
+        keys = list(queryset.query.order_by or queryset.model._meta.ordering)
+        names = {key.lstrip('-') for key in keys}
+        if not names & {'pk', 'id', queryset.model._meta.pk.attname}:
+            descending = bool(keys) and keys[-1].startswith('-')
+            keys.append('-pk' if descending else 'pk')
+        return keys
+
+    def get_field(self, model, key):
+        name = key.lstrip('-')
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+    def build_filter(self, values, reverse):
+        """Условие "строка идет после курсора" для лексикографического порядка ключей"""
+        condition = Q()
+        equal = Q()
+        for key, value in zip(self.keys, values):
+            name = key.lstrip('-')
+            descending = key.startswith('-') != reverse
+            condition |= equal & Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_value(self, field, value):
+        if isinstance(field, models.DateTimeField):
+            return str((value - EPOCH) // timedelta(microseconds=1))
+        return repr(value) if isinstance(value, float) else str(value)
+
+    def decode_value(self, field, raw):
+        if isinstance(field, models.DateTimeField):
+            return EPOCH + timedelta(microseconds=int(raw))
+        return field.to_python(raw)
+
+    def encode_cursor(self, direction, row):
+        model = type(row)
+        raw = ','.join(
+            self.encode_value(self.get_field(model, key), getattr(row, key.lstrip('-')))
+            for key in self.keys
+        )
+        return base64.urlsafe_b64encode(f'{direction}{raw}'.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return 'n', None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            decoded = base64.urlsafe_b64decode(padded.encode()).decode()
+            direction, raw_values = decoded[0], decoded[1:].split(',')
+            if direction not in ('n', 'p') or len(raw_values) != len(self.keys):
+                raise ValueError
+            values = [
+                self.decode_value(self.get_field(model, key), raw)
+                for key, raw in zip(self.keys, raw_values)
+            ]
+        except (binascii.Error, UnicodeDecodeError, IndexError, ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return direction, values
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.next_cursor),
+            'previous': self.get_link(self.previous_cursor),
+            'next_cursor': self.next_cursor,
+            'previous_cursor': self.previous_cursor,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'previous_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """Использовать KeysetPagination для перечисленных action ViewSet"""
+    keyset_actions = ()
+
+    @property
+    def paginator(self):
+        if self.action not in self.keyset_actions:
+            return super().paginator
+        if not hasattr(self, '_keyset_paginator'):
+            self._keyset_paginator = KeysetPagination()
+        return self._keyset_paginator
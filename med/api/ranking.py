@@ -0,0 +1,78 @@
+"""Схемы ранжирования врачей"""
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .models import User
+
+RANKING_AVERAGE = 'average'
+RANKING_BAYESIAN = 'bayesian'
+RANKING_WILSON = 'wilson'
+RANKING_MODES = (RANKING_AVERAGE, RANKING_BAYESIAN, RANKING_WILSON)
+
+# Поле материализованного рейтинга, по которому сортирует каждая схема
+RANKING_SCORE_FIELDS = {
+    RANKING_AVERAGE: 'rating',
+    RANKING_BAYESIAN: 'bayesian_score',
+    RANKING_WILSON: 'wilson_score',
+}
+
+GLOBAL_MEAN_CACHE_KEY = 'ranking:global_mean'
+
+# Знаков после запятой в материализованных оценках: для порядка достаточно,
+# а курсоры пагинации остаются короткими (влезают в callback_data Telegram)
+SCORE_PRECISION = 6
+
+
+def compute_global_mean():
+    """Средняя оценка по всем отзывам к врачам"""
+    totals = User.objects.filter(doctor=True).aggregate(
+        total=Sum('rating_sum'),
+        count=Sum('rating_count'),
+    )
+    if not totals['count']:
+        return 3.0
+    return totals['total'] / totals['count']
+
+
+def get_global_mean(refresh=False):
+    """Средняя оценка по всем отзывам (кэшируется, используется как априорное значение)"""
+    if refresh:
+        cache.delete(GLOBAL_MEAN_CACHE_KEY)
+    return cache.get_or_set(GLOBAL_MEAN_CACHE_KEY, compute_global_mean, settings.RATING_GLOBAL_MEAN_CACHE_SECONDS)
+
+
+def bayesian_average(rating_sum, rating_count, prior_mean, prior_weight):
+    """Байесовское среднее: оценка стягивается к общему среднему при малом числе отзывов"""
+    return (prior_mean * prior_weight + rating_sum) / (prior_weight + rating_count)
+
+
+def wilson_lower_bound(rating_sum, rating_count, z):
+    """Нижняя граница доверительного интервала Уилсона, приведенная к шкале 1-5"""
+    if not rating_count:
+        return 0.0
+    n = rating_count
+    # Доля "положительности": средняя оценка 1..5 переводится в диапазон 0..1
+    p = (rating_sum / n - 1) / 4
+    z2 = z * z
+    lower = (p + z2 / (2 * n) - z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n))) / (1 + z2 / n)
+    return 1 + 4 * lower
+
+
+def score_doctor(rating_sum, rating_count, prior_mean):
+    """Все оценки врача для материализованного рейтинга: (average, bayesian, wilson)"""
+    if not rating_count:
+        return 0.0, 0.0, 0.0
+    scores = (
+        rating_sum / rating_count,
+        bayesian_average(rating_sum, rating_count, prior_mean, settings.RATING_BAYESIAN_PRIOR_WEIGHT),
+        wilson_lower_bound(rating_sum, rating_count, settings.RATING_WILSON_Z),
+    )
+    return tuple(round(score, SCORE_PRECISION) for score in scores)
+
+
+def ranking_order(mode):
+    """Порядок сортировки материализованного рейтинга для схемы ранжирования"""
+    return (f'-{RANKING_SCORE_FIELDS[mode]}', '-reviews_count', 'doctor_id')
@@ -0,0 +1,133 @@
+"""Полнотекстовый поиск врачей
+
+На SQLite используется виртуальная таблица FTS5 с ФИО врача (detail), названием
+категории и названием клиники; rowid строки совпадает с id врача. Индекс
+поддерживается сигналами (и массовой загрузкой). Текст нормализуется до
+индексации и поиска: регистр приводится через casefold, "ё" заменяется на "е",
+поэтому "пётр", "ПЕТР" и "петр" находят одно и то же. Каждое слово запроса
+ищется как префикс, результаты ранжируются по bm25 с приоритетом ФИО.
+
+На других СУБД таблицы нет, поиск выполняется через icontains.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import User
+
+# Таблица создается миграцией 0008_doctor_search
+SEARCH_TABLE = 'api_doctor_search'
+# Веса bm25 для колонок: ФИО, категория, клиника
+SEARCH_WEIGHTS = (10.0, 2.0, 1.0)
+SEARCH_FIELDS = ('id', 'doctor', 'detail', 'category__title', 'clinic__title')
+
+
+def is_supported(using=None):
+    """Есть ли у текущей БД полнотекстовый индекс"""
+    return (using or connection).vendor == 'sqlite'
+
+
+def normalize(text):
+    """Нормализовать текст для индекса и запроса"""
+    return (text or '').casefold().replace('ё', 'е')
+
+
+def build_match_query(query):
+    """Запрос FTS5: все слова как префиксы (AND), None если слов нет"""
+    words = re.findall(r'\w+', normalize(query))
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _index_rows(cursor, doctors):
+    rows = [
+        (row['id'], normalize(row['detail']), normalize(row['category__title']), normalize(row['clinic__title']))
+        for row in doctors if row['doctor']
+    ]
+    if rows:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, name, category, clinic) VALUES (%s, %s, %s, %s)', rows
+        )
+
+
+def remove_doctors(doctor_ids):
+    """Убрать врачей из поискового индекса"""
+    doctor_ids = [doctor_id for doctor_id in doctor_ids if doctor_id]
+    if not doctor_ids or not is_supported():
+        return
+    placeholders = ', '.join(['%s'] * len(doctor_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', doctor_ids)
+
+
+def index_doctors(doctor_ids):
+    """Переиндексировать указанных пользователей (не-врачи удаляются из индекса)"""
+    doctor_ids = [doctor_id for doctor_id in doctor_ids if doctor_id]
+    if not doctor_ids or not is_supported():
+        return
+    doctors = list(User.objects.filter(pk__in=doctor_ids).values(*SEARCH_FIELDS))
+    with transaction.atomic():
+        remove_doctors(doctor_ids)
+        with connection.cursor() as cursor:
+            _index_rows(cursor, doctors)
+
+
+def rebuild_search_index(batch_size=1000):
+    """Полностью перестроить поисковый индекс. Возвращает количество врачей в индексе"""
+    if not is_supported():
+        return 0
+    indexed = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        batch = []
+        for row in User.objects.filter(doctor=True).order_by('pk').values(*SEARCH_FIELDS).iterator(batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                _index_rows(cursor, batch)
+                indexed += len(batch)
+                batch = []
+        _index_rows(cursor, batch)
+        indexed += len(batch)
+    return indexed
+
+
+def search_doctor_ids(query, limit):
+    """id врачей, найденных по запросу, от наиболее релевантного"""
+    match = build_match_query(query)
+    if match is None:
+        return []
+    if not is_supported():
+        return list(doctor_search_queryset(query).order_by('-rating_avg', 'pk').values_list('pk', flat=True)[:limit])
+
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+            f'ORDER BY bm25({SEARCH_TABLE}, {weights}), rowid LIMIT %s',
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def doctor_search_filter(query):
+    """Условие для queryset пользователей: врач находится по запросу"""
+    match = build_match_query(query)
+    if match is None:
+        return Q(pk__in=[])
+    if is_supported():
+        return Q(pk__in=RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [match]))
+
+    condition = Q()
+    for word in re.findall(r'\w+', query):
+        condition &= (
+            Q(detail__icontains=word) | Q(category__title__icontains=word) | Q(clinic__title__icontains=word)
+        )
+    return condition
+
+
+def doctor_search_queryset(query):
+    """Врачи, найденные по запросу (без ранжирования)"""
+    return User.objects.filter(doctor=True).filter(doctor_search_filter(query))
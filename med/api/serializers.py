@@ -1,8 +1,15 @@
 from rest_framework import serializers
+from .fieldsets import SparseFieldsetMixin
 from .models import Category, GeoPosition, Clinic, User, SupportRequest, Review
 
+# Столбцы, которые читают get_rating/get_reviews_count пользователя (для .only())
+USER_RATING_SOURCES = {
+    'rating': ('doctor', 'rating_avg'),
+    'reviews_count': ('doctor', 'rating_count'),
+}
 
-class CategorySerializer(serializers.ModelSerializer):
+
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Сериализатор для Category"""
     
     class Meta:
@@ -10,7 +17,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'title']
 
 
-class GeoPositionSerializer(serializers.ModelSerializer):
+class GeoPositionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Сериализатор для GeoPosition"""
     
     class Meta:
@@ -18,7 +25,7 @@ class GeoPositionSerializer(serializers.ModelSerializer):
         fields = ['id', 'title']
 
 
-class ClinicSerializer(serializers.ModelSerializer):
+class ClinicSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Сериализатор для Clinic"""
     rating = serializers.SerializerMethodField()
     reviews_count = serializers.SerializerMethodField()
@@ -33,8 +40,14 @@ class ClinicSerializer(serializers.ModelSerializer):
     def get_reviews_count(self, obj):
         return obj.get_reviews_count()
 
+    def get_prefetch_queryset(self):
+        """Клиники для вложенного объекта (рейтинг считается, только если он запрошен)"""
+        if {'rating', 'reviews_count'} & set(self.fields):
+            return Clinic.objects.with_rating()
+        return Clinic.objects.all()
+
 
-class UserListSerializer(serializers.ModelSerializer):
+class UserListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Упрощенный сериализатор для списка пользователей"""
     category = CategorySerializer(read_only=True)
     clinic = ClinicSerializer(read_only=True)
@@ -43,10 +56,31 @@ class UserListSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'telegram_id', 'category', 'clinic', 'geo_position', 'phone_number', 
-                  'patient', 'doctor', 'created_at']
+                  'detail', 'patient', 'doctor', 'created_at']
+
+
+class DoctorRatingSerializer(UserListSerializer):
+    """Сериализатор строки рейтинга врачей"""
+    rating = serializers.SerializerMethodField()
+    reviews_count = serializers.SerializerMethodField()
+    score = serializers.SerializerMethodField()
 
+    class Meta(UserListSerializer.Meta):
+        fields = UserListSerializer.Meta.fields + ['rating', 'reviews_count', 'score']
+        method_field_sources = USER_RATING_SOURCES
 
-class UserDetailSerializer(serializers.ModelSerializer):
+    def get_rating(self, obj):
+        return obj.get_rating()
+
+    def get_reviews_count(self, obj):
+        return obj.get_reviews_count()
+
+    def get_score(self, obj):
+        score = getattr(obj, 'score', None)
+        return round(score, 4) if score is not None else None
+
+
+class UserDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Детальный сериализатор для User"""
     category = CategorySerializer(read_only=True)
     clinic = ClinicSerializer(read_only=True)
@@ -58,6 +92,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'telegram_id', 'category', 'clinic', 'geo_position', 'phone_number',
                   'detail', 'patient', 'doctor', 'rating', 'reviews_count', 'created_at', 'updated_at']
+        method_field_sources = USER_RATING_SOURCES
     
     def get_rating(self, obj):
         return obj.get_rating()
@@ -66,6 +101,28 @@ class UserDetailSerializer(serializers.ModelSerializer):
         return obj.get_reviews_count()
 
 
+class UserProfileSerializer(serializers.ModelSerializer):
+    """Облегченный профиль для поиска по telegram_id (бот вызывает его на каждое действие)
+
+    Клиника отдается идентификатором, чтобы не считать ее рейтинг, а рейтинг
+    и число отзывов есть только у врачей.
+    """
+    category = CategorySerializer(read_only=True)
+    geo_position = GeoPositionSerializer(read_only=True)
+
+    class Meta:
+        model = User
+        fields = ['id', 'telegram_id', 'category', 'clinic', 'geo_position', 'phone_number',
+                  'detail', 'patient', 'doctor', 'created_at', 'updated_at']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.doctor:
+            data['rating'] = instance.get_rating()
+            data['reviews_count'] = instance.get_reviews_count()
+        return data
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания User"""
     
@@ -81,7 +138,25 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return value
 
 
-class SupportRequestSerializer(serializers.ModelSerializer):
+class UserBulkSerializer(serializers.ModelSerializer):
+    """Сериализатор элемента массовой загрузки пользователей
+
+    Связи передаются идентификаторами и проверяются пачкой в api.bulk,
+    поэтому валидация одного элемента не обращается к БД.
+    """
+    category_id = serializers.IntegerField(required=False, allow_null=True)
+    geo_position_id = serializers.IntegerField(required=False, allow_null=True)
+    clinic_id = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = User
+        fields = ['telegram_id', 'category_id', 'phone_number', 'detail', 'geo_position_id',
+                  'clinic_id', 'patient', 'doctor']
+        # Уникальность telegram_id проверяется одним запросом на пачку
+        extra_kwargs = {'telegram_id': {'validators': []}}
+
+
+class SupportRequestSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Сериализатор для SupportRequest"""
     user = UserListSerializer(read_only=True)
     user_id = serializers.IntegerField(write_only=True)
@@ -92,7 +167,7 @@ class SupportRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Сериализатор для Review"""
     user = UserListSerializer(read_only=True)
     doctor = UserListSerializer(read_only=True)
@@ -0,0 +1,152 @@
+"""Сигналы для поддержания денормализованных данных"""
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Category, GeoPosition, Clinic, DoctorRanking, Review, User
+from .aggregates import apply_rating_delta
+from .cache import bump_model_version
+from .leaderboards import refresh_clinic_rankings_on_commit, refresh_doctor_rankings_on_commit
+from .search import index_doctors, remove_doctors
+
+# Поля врача, от которых зависят его строки в материализованном рейтинге
+RANKING_USER_FIELDS = ('doctor', 'category_id', 'geo_position_id', 'clinic_id')
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    """Запомнить врача и оценку до изменения отзыва"""
+    instance._previous_rating = None
+    if instance._state.adding or instance.pk is None:
+        return
+    instance._previous_rating = (
+        Review.objects.filter(pk=instance.pk).values_list('doctor_id', 'rating').first()
+    )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    """Обновить агрегаты и рейтинги врача после создания или изменения отзыва"""
+    previous = getattr(instance, '_previous_rating', None)
+    if created or previous is None:
+        apply_rating_delta(instance.doctor_id, instance.rating, 1)
+        refresh_doctor_rankings_on_commit([instance.doctor_id])
+        return
+
+    old_doctor_id, old_rating = previous
+    if old_doctor_id == instance.doctor_id:
+        apply_rating_delta(instance.doctor_id, instance.rating - old_rating, 0)
+    else:
+        apply_rating_delta(old_doctor_id, -old_rating, -1)
+        apply_rating_delta(instance.doctor_id, instance.rating, 1)
+    refresh_doctor_rankings_on_commit([old_doctor_id, instance.doctor_id])
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """Обновить агрегаты и рейтинги врача после удаления отзыва"""
+    apply_rating_delta(instance.doctor_id, -instance.rating, -1)
+    # Врач может удаляться каскадом вместе с отзывом - рейтинг пересчитается после его удаления
+    refresh_doctor_rankings_on_commit([instance.doctor_id])
+
+
+@receiver(pre_save, sender=User)
+def remember_ranking_fields(sender, instance, **kwargs):
+    """Запомнить поля пользователя, от которых зависит рейтинг, до изменения"""
+    instance._previous_ranking_fields = None
+    if instance._state.adding or instance.pk is None:
+        return
+    instance._previous_ranking_fields = (
+        User.objects.filter(pk=instance.pk).values_list(*RANKING_USER_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def update_rankings_on_user_save(sender, instance, created, **kwargs):
+    """Переложить врача в нужные разрезы рейтинга после смены категории, города или клиники
+
+    Правки остальных полей и профили пациентов рейтинг не затрагивают.
+    """
+    previous = getattr(instance, '_previous_ranking_fields', None)
+    current = tuple(getattr(instance, field) for field in RANKING_USER_FIELDS)
+    if previous == current:
+        return
+    # Врач или пользователь, который перестал быть врачом
+    if instance.doctor or (previous is not None and previous[0]):
+        refresh_doctor_rankings_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def update_rankings_on_user_delete(sender, instance, **kwargs):
+    """Пересчитать рейтинг клиники после удаления врача"""
+    if instance.doctor:
+        refresh_clinic_rankings_on_commit([instance.clinic_id])
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=GeoPosition)
+@receiver(pre_delete, sender=Clinic)
+def remove_scope_rankings(sender, instance, **kwargs):
+    """Убрать разрез рейтинга удаляемой категории, города или клиники
+
+    Связь у врачей обнулится через SET_NULL без post_save, поэтому их строки
+    в этом разрезе иначе остались бы в рейтинге.
+    """
+    scope = {
+        Category: DoctorRanking.SCOPE_CATEGORY,
+        GeoPosition: DoctorRanking.SCOPE_GEO_POSITION,
+        Clinic: DoctorRanking.SCOPE_CLINIC,
+    }[sender]
+    DoctorRanking.objects.filter(scope=scope, scope_id=instance.pk).delete()
+    bump_model_version(DoctorRanking)
+
+
+@receiver(post_save, sender=User)
+def update_search_index_on_user_save(sender, instance, created, **kwargs):
+    """Переиндексировать врача для полнотекстового поиска"""
+    if created and not instance.doctor:
+        return
+    index_doctors([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def update_search_index_on_user_delete(sender, instance, **kwargs):
+    """Убрать удаленного пользователя из поискового индекса"""
+    remove_doctors([instance.pk])
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Clinic)
+def remember_indexed_doctors(sender, instance, **kwargs):
+    """Запомнить врачей до удаления: связь у них обнулится раньше post_delete"""
+    field = 'category' if sender is Category else 'clinic'
+    instance._indexed_doctor_ids = list(
+        User.objects.filter(**{field: instance}, doctor=True).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Clinic)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Clinic)
+def update_search_index_on_title_change(sender, instance, **kwargs):
+    """Переиндексировать врачей категории или клиники после изменения названия"""
+    doctor_ids = getattr(instance, '_indexed_doctor_ids', None)
+    if doctor_ids is None:
+        field = 'category' if sender is Category else 'clinic'
+        doctor_ids = User.objects.filter(**{field: instance}, doctor=True).values_list('pk', flat=True)
+    index_doctors(list(doctor_ids))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=GeoPosition)
+@receiver(post_delete, sender=GeoPosition)
+@receiver(post_save, sender=Clinic)
+@receiver(post_delete, sender=Clinic)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_cached_responses(sender, **kwargs):
+    """Сменить версию модели, чтобы закэшированные ответы API устарели"""
+    bump_model_version(sender)
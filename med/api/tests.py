@@ -1,3 +1,1117 @@
-from django.test import TestCase
+import gzip
+import json
+from importlib.util import find_spec
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User as AuthUser
+from django.core.management import call_command
+from django.db import connection
+from django.core.cache import cache
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from . import async_views, compression
+from .models import Category, GeoPosition, Clinic, User, SupportRequest, Review, ClinicRanking, DoctorRanking
+from .leaderboards import (
+    doctor_leaderboard,
+    prior_mean_drifted,
+    rebuild_leaderboards,
+    refresh_doctor_rankings,
+    save_doctor_entries,
+)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class QueryBudgetTests(TestCase):
+    """Количество запросов к БД на каждый endpoint не зависит от размера страницы"""
+
+    SMALL_PAGE = 3
+    LARGE_PAGE = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = [Category.objects.create(title=f'Категория {i}') for i in range(3)]
+        cities = [GeoPosition.objects.create(title=f'Город {i}') for i in range(3)]
+        clinics = [
+            Clinic.objects.create(
+                title=f'Клиника {i}',
+                address='Адрес',
+                phone='+7 000',
+                email=f'clinic{i}@example.com',
+                work_time='Пн-Пт',
+            )
+            for i in range(30)
+        ]
+        cls.category = categories[0]
+        cls.doctors = [
+            User.objects.create(
+                telegram_id=1000 + i,
+                detail=f'Врач {i}',
+                category=categories[i % 3],
+                geo_position=cities[i % 3],
+                clinic=clinics[i],
+                doctor=True,
+            )
+            for i in range(30)
+        ]
+        cls.patients = [
+            User.objects.create(
+                telegram_id=5000 + i,
+                detail=f'Пациент {i}',
+                geo_position=cities[i % 3],
+                clinic=clinics[i],
+                patient=True,
+            )
+            for i in range(30)
+        ]
+        cls.patient = cls.patients[0]
+        cls.doctor = cls.doctors[0]
+        # Рейтинги обновляются после фиксации транзакции
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i, doctor in enumerate(cls.doctors):
+                Review.objects.create(user=cls.patient, doctor=doctor, rating=i % 5 + 1, detail='Отзыв пациента')
+                if cls.patients[i] != cls.patient:
+                    Review.objects.create(user=cls.patients[i], doctor=cls.doctor, rating=5, detail='Отзыв о враче')
+                SupportRequest.objects.create(user=cls.patients[i], detail='Вопрос')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(context.captured_queries)
+
+    def assertQueryBudget(self, url, budget, params=None, paginated=True):
+        """Проверить бюджет запросов для маленькой и большой страницы"""
+        params = params or {}
+        if not paginated:
+            queries = self.count_queries(url, params)
+            self.assertLessEqual(queries, budget, url)
+            return
+
+        small = self.count_queries(url, {**params, 'page_size': self.SMALL_PAGE})
+        large = self.count_queries(url, {**params, 'page_size': self.LARGE_PAGE})
+        self.assertLessEqual(small, budget, url)
+        self.assertEqual(small, large, f'{url}: число запросов зависит от размера страницы')
+
+    def test_reference_endpoints(self):
+        self.assertQueryBudget('/api/categories/', 2)
+        self.assertQueryBudget('/api/geopositions/', 2)
+        self.assertQueryBudget('/api/clinics/', 2)
+        self.assertQueryBudget(f'/api/clinics/{self.doctor.clinic_id}/', 1, paginated=False)
+        self.assertQueryBudget('/api/clinics/rating/', 1)
+        self.assertQueryBudget(f'/api/clinics/{self.doctor.clinic_id}/reviews/', 3)
+        self.assertQueryBudget(f'/api/clinics/{self.doctor.clinic_id}/reviews/', 3, {'ordering': '-rating'})
+
+    def test_user_endpoints(self):
+        self.assertQueryBudget('/api/users/', 3)
+        self.assertQueryBudget(f'/api/users/{self.doctor.pk}/', 2, paginated=False)
+        self.assertQueryBudget(f'/api/users/telegram/{self.doctor.telegram_id}/', 1, paginated=False)
+        self.assertQueryBudget(
+            f'/api/users/{self.doctor.pk}/card/', 7, {'telegram_id': self.patients[1].telegram_id}
+        )
+        self.assertQueryBudget('/api/users/doctors/', 2)
+        self.assertQueryBudget(f'/api/users/doctors/category/{self.category.pk}/', 2)
+        self.assertQueryBudget('/api/users/doctors/', 2, {'search': 'врач'})
+        self.assertQueryBudget('/api/users/doctors/search/', 3, {'q': 'врач', 'limit': 30}, paginated=False)
+
+    def test_rating_endpoints(self):
+        self.assertQueryBudget('/api/users/doctors/rating/', 2)
+        self.assertQueryBudget('/api/users/doctors/rating/', 2, {'ranking': 'wilson'})
+        # Общая средняя оценка для байесовского режима кэшируется после первого запроса
+        self.count_queries('/api/users/doctors/rating/', {'ranking': 'bayesian'})
+        self.assertQueryBudget('/api/users/doctors/rating/', 2, {'ranking': 'bayesian'})
+
+    def test_review_endpoints(self):
+        self.assertQueryBudget('/api/reviews/', 3)
+        self.assertQueryBudget(f'/api/reviews/doctor/{self.doctor.pk}/', 3)
+        self.assertQueryBudget(f'/api/reviews/user/{self.patient.pk}/', 3)
+
+    def test_support_request_endpoints(self):
+        self.assertQueryBudget('/api/support-requests/', 2)
+
+    def test_sparse_fieldsets(self):
+        # Вложенные объекты идентификаторами: без join'ов и подгрузки клиник с рейтингом
+        lean = {'fields': 'id,detail,clinic'}
+        self.assertQueryBudget('/api/users/', 2, lean)
+        self.assertQueryBudget('/api/users/doctors/', 1, lean)
+        self.assertQueryBudget('/api/reviews/', 1, {'fields': 'id,rating,doctor'})
+        self.assertQueryBudget(f'/api/reviews/user/{self.patient.pk}/', 1, {'fields': 'rating,detail,doctor.detail'})
+        self.assertQueryBudget(f'/api/clinics/{self.doctor.clinic_id}/reviews/', 1, {'fields': 'id,rating'})
+        self.assertQueryBudget(f'/api/users/doctors/category/{self.category.pk}/', 1, {'fields': 'id,detail'})
+        # Поля списков бота: клиники подгружаются без рейтинга
+        bot_fields = {'fields': 'id,detail,rating,reviews_count,category.title,clinic.title'}
+        self.assertQueryBudget(f'/api/users/doctors/category/{self.category.pk}/', 2, bot_fields)
+        self.assertQueryBudget('/api/users/doctors/search/', 3, {**bot_fields, 'q': 'врач', 'limit': 30}, paginated=False)
+        self.assertQueryBudget('/api/users/doctors/', 2, {**lean, 'expand': 'clinic'})
+        self.assertQueryBudget('/api/support-requests/', 1, {'fields': 'id,user'})
+
+
+class RatingAggregateTests(TestCase):
+    """Агрегаты рейтинга врача следуют за отзывами, recalculate_ratings исправляет расхождения"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctors = [User.objects.create(telegram_id=1 + i, doctor=True) for i in range(2)]
+        cls.patients = [User.objects.create(telegram_id=100 + i, patient=True) for i in range(2)]
+
+    def assertAggregates(self, doctor, rating_sum, rating_count):
+        doctor.refresh_from_db()
+        self.assertEqual((doctor.rating_sum, doctor.rating_count), (rating_sum, rating_count))
+        self.assertEqual(doctor.rating_avg, rating_sum / rating_count if rating_count else None)
+
+    def test_create_update_delete(self):
+        first, second = self.doctors
+        review = Review.objects.create(user=self.patients[0], doctor=first, rating=4, detail='Отзыв')
+        Review.objects.create(user=self.patients[1], doctor=first, rating=1, detail='Отзыв')
+        self.assertAggregates(first, 5, 2)
+
+        # Изменение оценки: дельта считается от оценки, сохраненной до изменения
+        review.rating = 2
+        review.save()
+        self.assertAggregates(first, 3, 2)
+
+        review.doctor = second
+        review.save()
+        self.assertAggregates(first, 1, 1)
+        self.assertAggregates(second, 2, 1)
+
+        review.delete()
+        self.assertAggregates(second, 0, 0)
+        Review.objects.filter(doctor=first).delete()
+        self.assertAggregates(first, 0, 0)
+
+    def test_recalculate_ratings(self):
+        first, second = self.doctors
+        Review.objects.create(user=self.patients[0], doctor=first, rating=5, detail='Отзыв')
+        Review.objects.create(user=self.patients[1], doctor=first, rating=3, detail='Отзыв')
+        User.objects.filter(pk=first.pk).update(rating_sum=7, rating_count=3, rating_avg=7 / 3)
+        User.objects.filter(pk=second.pk).update(rating_sum=4, rating_count=1, rating_avg=4.0)
+
+        out = StringIO()
+        call_command('recalculate_ratings', '--dry-run', stdout=out)
+        self.assertIn('Найдено расхождений: 2', out.getvalue())
+        self.assertAggregates(second, 4, 1)
+
+        out = StringIO()
+        call_command('recalculate_ratings', stdout=out)
+        self.assertIn('Исправлено расхождений: 2', out.getvalue())
+        self.assertAggregates(first, 8, 2)
+        self.assertAggregates(second, 0, 0)
+        self.assertEqual(
+            DoctorRanking.objects.get(doctor=first, scope=DoctorRanking.SCOPE_GLOBAL).reviews_count, 2
+        )
+
+        out = StringIO()
+        call_command('recalculate_ratings', stdout=out)
+        self.assertIn('Расхождений не найдено', out.getvalue())
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SparseFieldsetTests(TestCase):
+    """Параметры fields= и expand=: только выбранные поля, вложенные объекты идентификаторами"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Терапевт')
+        cls.clinic = Clinic.objects.create(title='Клиника', address='Адрес', phone='+7 000', work_time='Пн-Пт')
+        cls.doctor = User.objects.create(
+            telegram_id=1, doctor=True, detail='Врач', category=category, clinic=cls.clinic
+        )
+        cls.patient = User.objects.create(telegram_id=2, patient=True, detail='Пациент')
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.review = Review.objects.create(user=cls.patient, doctor=cls.doctor, rating=4, detail='Отзыв')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_default_unchanged(self):
+        doctor = self.get(f'/api/users/{self.doctor.pk}/')
+        self.assertEqual(doctor['clinic']['title'], 'Клиника')
+        self.assertEqual(doctor['rating'], 4)
+
+    def test_fields(self):
+        doctor = self.get(f'/api/users/{self.doctor.pk}/', fields='id,detail,rating,clinic')
+        self.assertEqual(doctor, {'id': self.doctor.pk, 'detail': 'Врач', 'rating': 4, 'clinic': self.clinic.pk})
+
+        [row] = self.get('/api/users/doctors/', fields='id,detail')['results']
+        self.assertEqual(row, {'id': self.doctor.pk, 'detail': 'Врач'})
+
+    def test_expand(self):
+        doctor = self.get(f'/api/users/{self.doctor.pk}/', expand='clinic')
+        self.assertEqual(doctor['clinic']['title'], 'Клиника')
+        self.assertEqual(doctor['clinic']['rating'], 4)
+        self.assertEqual(doctor['category'], self.doctor.category_id)
+
+        [review] = self.get('/api/reviews/', fields='rating,doctor.detail,doctor.clinic.title')['results']
+        self.assertEqual(review, {'rating': 4, 'doctor': {'detail': 'Врач', 'clinic': {'title': 'Клиника'}}})
+
+        [review] = self.get('/api/reviews/', fields='id,user', expand='user')['results']
+        self.assertEqual(review['user']['detail'], 'Пациент')
+        self.assertEqual(review['user']['clinic'], None)
+
+    def test_ranked_doctors(self):
+        [row] = self.get(f'/api/users/doctors/category/{self.doctor.category_id}/', fields='id,detail,rating')['results']
+        self.assertEqual(row, {'id': self.doctor.pk, 'detail': 'Врач', 'rating': 4})
+
+        [row] = self.get(
+            f'/api/users/doctors/category/{self.doctor.category_id}/', fields='id,category.title,clinic.title'
+        )['results']
+        self.assertEqual(row, {'id': self.doctor.pk, 'category': {'title': 'Терапевт'}, 'clinic': {'title': 'Клиника'}})
+
+        [row] = self.get('/api/clinics/rating/', fields='id,title')['results']
+        self.assertEqual(row, {'id': self.clinic.pk, 'title': 'Клиника'})
+
+    def test_cursor_with_sparse_fields(self):
+        Review.objects.create(user=self.doctor, doctor=self.doctor, rating=5, detail='Второй')
+        page = self.get('/api/reviews/', fields='id', page_size=1)
+        self.assertEqual(len(page['results']), 1)
+        self.assertEqual(self.get('/api/reviews/', fields='id', cursor=page['next_cursor'])['results'],
+                         [{'id': self.review.pk}])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class KeysetPaginationTests(TestCase):
+    """Курсорная пагинация проходит все строки без пропусков и повторов в обе стороны"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.patient = User.objects.create(telegram_id=1, patient=True)
+        cls.doctors = [User.objects.create(telegram_id=100 + i, doctor=True) for i in range(23)]
+        for i, doctor in enumerate(cls.doctors):
+            Review.objects.create(user=cls.patient, doctor=doctor, rating=i % 5 + 1, detail='Отзыв')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def walk(self, url, params):
+        ids, cursor = [], None
+        while True:
+            response = self.client.get(url, {**params, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200, response.content)
+            ids.extend(row['id'] for row in response.data['results'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                return ids, response.data['previous_cursor']
+
+    def test_forward_and_backward(self):
+        expected = list(Review.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        ids, previous = self.walk('/api/reviews/', {'page_size': 5})
+        self.assertEqual(ids, expected)
+
+        back = []
+        while previous:
+            response = self.client.get('/api/reviews/', {'page_size': 5, 'cursor': previous})
+            back = [row['id'] for row in response.data['results']] + back
+            previous = response.data['previous_cursor']
+        self.assertEqual(back, expected[:len(back)])
+        self.assertEqual(len(back), 20)
+
+    def test_ordering_with_ties(self):
+        expected = list(Review.objects.order_by('rating', 'id').values_list('id', flat=True))
+        ids, _ = self.walk('/api/reviews/', {'page_size': 4, 'ordering': 'rating'})
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/reviews/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ResponseCacheTests(TestCase):
+    """Кэш справочных endpoint'ов и его инвалидация при изменениях"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(title='Кардиолог')
+
+    def test_cached_and_revalidated(self):
+        first = self.client.get('/api/categories/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/categories/')
+        self.assertEqual(first.data, second.data)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_last_modified_second_granularity(self):
+        # Данные изменились в 1000.5 (холодный кэш версий): пока секунда не прошла,
+        # дата не сообщается и If-Modified-Since не дает 304
+        with mock.patch('api.cache.time.time', return_value=1000.5):
+            first = self.client.get('/api/categories/')
+            self.assertNotIn('Last-Modified', first)
+            response = self.client.get('/api/categories/', HTTP_IF_MODIFIED_SINCE=http_date(1000))
+            self.assertEqual(response.status_code, 200)
+
+        with mock.patch('api.cache.time.time', return_value=1001.2):
+            second = self.client.get('/api/categories/')
+            self.assertEqual(second['Last-Modified'], http_date(1000))
+            response = self.client.get('/api/categories/', HTTP_IF_MODIFIED_SINCE=second['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+            # При обоих заголовках решает ETag
+            response = self.client.get(
+                '/api/categories/', HTTP_IF_MODIFIED_SINCE=second['Last-Modified'], HTTP_IF_NONE_MATCH='"stale"'
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def test_invalidated_on_save_and_delete(self):
+        etag = self.client.get('/api/categories/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.title = 'Невролог'
+            self.category.save()
+            # До фиксации транзакции версия не меняется: незафиксированные данные не кэшируются
+            self.assertEqual(self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['title'], 'Невролог')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.delete()
+        self.assertEqual(self.client.get('/api/categories/').data['count'], 0)
+
+    def test_clinic_dependencies(self):
+        clinic = Clinic.objects.create(title='Клиника', address='Адрес', phone='+7 000', work_time='Пн-Пт')
+        doctor = User.objects.create(telegram_id=1, doctor=True, clinic=clinic)
+        patient = User.objects.create(telegram_id=2, patient=True)
+        etags = {url: self.client.get(url)['ETag'] for url in ('/api/clinics/', '/api/clinics/rating/')}
+
+        def not_modified(url):
+            return self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code == 304
+
+        # Правка пациента не меняет данные клиник
+        with self.captureOnCommitCallbacks(execute=True):
+            patient.detail = 'Пациент'
+            patient.save()
+        self.assertTrue(not_modified('/api/clinics/'))
+        self.assertTrue(not_modified('/api/clinics/rating/'))
+
+        # Отзыв меняет рейтинг клиники
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=patient, doctor=doctor, rating=5, detail='Отзыв')
+        self.assertFalse(not_modified('/api/clinics/'))
+        [row] = self.client.get('/api/clinics/rating/').data['results']
+        self.assertEqual((row['rating'], row['reviews_count']), (5, 1))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+@skipUnless(find_spec('orjson') and find_spec('msgpack'), 'orjson и msgpack не установлены')
+class RendererTests(TestCase):
+    """Формат ответа по заголовку Accept: JSON (orjson) и MessagePack"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.create(title='Кардиолог')
+        cls.patient = User.objects.create(telegram_id=1, patient=True)
+        cls.doctor = User.objects.create(telegram_id=2, doctor=True, detail='Врач')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_negotiation(self):
+        import msgpack
+
+        as_json = self.client.get('/api/categories/')
+        self.assertEqual(as_json['Content-Type'], 'application/json')
+        data = json.loads(as_json.content)
+        self.assertEqual(data['results'][0]['title'], 'Кардиолог')
+
+        # Закэшированный ответ отдается в запрошенном формате
+        as_msgpack = self.client.get('/api/categories/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(as_msgpack['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(as_msgpack.content), data)
+
+        url = f'/api/users/{self.doctor.pk}/'
+        as_msgpack = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(msgpack.unpackb(as_msgpack.content), json.loads(self.client.get(url).content))
+
+    def test_parsers(self):
+        import msgpack
+
+        body = {'user_id': self.patient.pk, 'doctor_id': self.doctor.pk, 'rating': 5, 'detail': 'Отзыв'}
+        response = self.client.post('/api/reviews/', msgpack.packb(body), content_type='application/msgpack')
+        self.assertEqual(response.status_code, 201, response.content)
+
+        response = self.client.post('/api/reviews/', '{"rating":', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], API_COMPRESSION_MIN_BYTES=512)
+class CompressionTests(TestCase):
+    """Сжатие ответов больше порога и кэширование сжатого тела"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(30):
+            Category.objects.create(title=f'Категория {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_threshold_and_negotiation(self):
+        plain = self.client.get('/api/categories/')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        compressed = self.client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(int(compressed['Content-Length']), len(compressed.content))
+        self.assertEqual(compressed['ETag'], f'W/{plain["ETag"]}')
+
+        # Слабый ETag сжатого ответа подходит для условного запроса
+        not_modified = self.client.get(
+            '/api/categories/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=compressed['ETag']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+        small = self.client.get('/api/categories/', {'page_size': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', small)
+        refused = self.client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertNotIn('Content-Encoding', refused)
+
+    def test_choose_encoding(self):
+        with mock.patch.dict(compression.COMPRESSORS, {'br': bytes, 'zstd': bytes}):
+            self.assertEqual(compression.choose_encoding('gzip, br, zstd'), 'zstd')
+            self.assertEqual(compression.choose_encoding('gzip, br;q=0.5'), 'gzip')
+            self.assertEqual(compression.choose_encoding('*'), 'zstd')
+            self.assertIsNone(compression.choose_encoding('deflate'))
+            self.assertIsNone(compression.choose_encoding(''))
+
+    def test_compressed_body_cached(self):
+        with mock.patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            first = self.client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.content, second.content)
+
+        # Изменение данных меняет ключ кэша - тело сжимается заново
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(title='Новая категория')
+        with mock.patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            third = self.client.get('/api/categories/', {'page_size': 100}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compress.call_count, 1)
+        self.assertIn('Новая категория', json.loads(gzip.decompress(third.content))['results'][-1]['title'])
+
+    def test_doctors_rating_cached(self):
+        patient = User.objects.create(telegram_id=1, patient=True)
+        doctors = [User.objects.create(telegram_id=100 + i, doctor=True, detail=f'Врач {i}') for i in range(10)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for i, doctor in enumerate(doctors[1:]):
+                Review.objects.create(user=patient, doctor=doctor, rating=i % 5 + 1, detail='Отзыв')
+
+        url = '/api/users/doctors/rating/'
+        with mock.patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            first = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            with self.assertNumQueries(0):
+                second = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.content, second.content)
+
+        # Новый отзыв обновляет рейтинг и сбрасывает кэш
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=patient, doctor=doctors[0], rating=5, detail='Отзыв')
+        with mock.patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            third = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compress.call_count, 1)
+        self.assertIn(doctors[0].pk, [row['id'] for row in json.loads(gzip.decompress(third.content))['results']])
+
+    @skipUnless(compression.brotli and compression.zstd, 'brotli и zstd не установлены')
+    def test_brotli_and_zstd(self):
+        plain = self.client.get('/api/categories/').content
+        response = self.client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.content), plain)
+        response = self.client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip, br, zstd')
+        self.assertEqual(response['Content-Encoding'], 'zstd')
+        self.assertEqual(compression.zstd.decompress(response.content), plain)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], API_BULK_BATCH_SIZE=10)
+class BulkUploadTests(TestCase):
+    """Массовая загрузка: ошибки по элементам, запросы и агрегаты на пачку"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title='Терапевт')
+        cls.patients = [User.objects.create(telegram_id=1 + i, patient=True) for i in range(30)]
+        cls.patient = cls.patients[0]
+        cls.doctors = [User.objects.create(telegram_id=100 + i, doctor=True) for i in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(AuthUser.objects.create(username='admin', is_staff=True))
+
+    def test_reviews(self):
+        Review.objects.create(user=self.patients[20], doctor=self.doctors[2], rating=4, detail='Отзыв')
+        items = [
+            {'user_id': patient.pk, 'doctor_id': self.doctors[i % 3].pk, 'rating': i % 5 + 1, 'detail': 'Отзыв'}
+            for i, patient in enumerate(self.patients)
+        ]
+        items[3]['rating'] = 7
+        items[5]['doctor_id'] = 999999
+        del items[8]['detail']
+        items.append(dict(items[0]))
+
+        response = self.client.post('/api/reviews/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['created'], 26)
+        self.assertEqual([error['index'] for error in response.data['errors']], [3, 5, 8, 20, 30])
+        self.assertIn('doctor_id', response.data['errors'][1]['errors'])
+
+        for doctor in self.doctors:
+            doctor.refresh_from_db()
+            reviews = Review.objects.filter(doctor=doctor)
+            self.assertEqual(doctor.rating_count, reviews.count())
+            self.assertEqual(doctor.rating_sum, sum(review.rating for review in reviews))
+        self.assertTrue(doctor.rankings.exists())
+
+    def test_review_queries_do_not_grow_with_batch(self):
+        def items(patients):
+            return [
+                {'user_id': patient.pk, 'doctor_id': self.doctors[0].pk, 'rating': 5, 'detail': 'Отзыв'}
+                for patient in patients
+            ]
+
+        # Рейтинг с актуальной общей средней: пачки обновляют его инкрементально
+        rebuild_leaderboards()
+        with CaptureQueriesContext(connection) as small:
+            self.client.post('/api/reviews/bulk/', items(self.patients[:2]), format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post('/api/reviews/bulk/', items(self.patients[10:20]), format='json')
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_users(self):
+        items = [
+            {'telegram_id': 200 + i, 'doctor': True, 'category_id': self.category.pk, 'detail': f'Врач {i}'}
+            for i in range(15)
+        ]
+        items.append({'telegram_id': 200, 'patient': True})
+        items.append({'telegram_id': self.patient.telegram_id, 'patient': True})
+        items.append({'telegram_id': 300, 'clinic_id': 999999})
+
+        response = self.client.post('/api/users/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['created'], 15)
+        self.assertEqual([error['index'] for error in response.data['errors']], [15, 16, 17])
+        self.assertEqual(
+            User.objects.get(telegram_id=205).rankings.filter(scope='category', scope_id=self.category.pk).count(), 1
+        )
+
+    def test_admin_only(self):
+        items = [{'user_id': self.patient.pk, 'doctor_id': self.doctors[0].pk, 'rating': 5, 'detail': 'Отзыв'}]
+        self.client.force_authenticate(AuthUser.objects.create(username='user'))
+        self.assertEqual(self.client.post('/api/reviews/bulk/', items, format='json').status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post('/api/users/bulk/', [{'telegram_id': 999}], format='json').status_code, 403)
+        self.assertFalse(Review.objects.exists())
+
+    def test_aggregates_in_insert_transaction(self):
+        items = [{'user_id': self.patient.pk, 'doctor_id': self.doctors[0].pk, 'rating': 5, 'detail': 'Отзыв'}]
+        with mock.patch('api.bulk.refresh_doctor_rankings', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.client.post('/api/reviews/bulk/', items, format='json')
+        # Вставка откатилась вместе с агрегатами
+        self.assertFalse(Review.objects.exists())
+        self.doctors[0].refresh_from_db()
+        self.assertEqual(self.doctors[0].rating_count, 0)
+
+    def test_invalid_payload(self):
+        response = self.client.post('/api/reviews/bulk/', {'rating': 5}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/users/bulk/', [{'telegram_id': 'x'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class DoctorSearchTests(TestCase):
+    """Полнотекстовый поиск врачей и синхронизация индекса"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cardiology = Category.objects.create(title='Кардиолог')
+        cls.clinic = Clinic.objects.create(
+            title='Здоровье', address='Адрес', phone='+7 000', email='clinic@example.com', work_time='Пн-Пт'
+        )
+        cls.ivanov = User.objects.create(
+            telegram_id=1, detail='Иванов Пётр Сергеевич', category=cls.cardiology, doctor=True
+        )
+        cls.petrova = User.objects.create(telegram_id=2, detail='Петрова Анна', clinic=cls.clinic, doctor=True)
+        cls.patient = User.objects.create(telegram_id=3, detail='Петров Пациент', patient=True)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def search(self, query):
+        response = self.client.get('/api/users/doctors/search/', {'q': query})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [doctor['id'] for doctor in response.data]
+
+    def test_prefix_and_case_folding(self):
+        self.assertEqual(self.search('ИВА'), [self.ivanov.pk])
+        self.assertEqual(self.search('петр'), [self.petrova.pk, self.ivanov.pk])
+        self.assertEqual(self.search('иванов пёт'), [self.ivanov.pk])
+        self.assertEqual(self.search('кардио'), [self.ivanov.pk])
+        self.assertEqual(self.search('здоров'), [self.petrova.pk])
+        self.assertEqual(self.search('"*'), [])
+
+    def test_index_follows_changes(self):
+        self.cardiology.title = 'Терапевт'
+        self.cardiology.save()
+        self.assertEqual(self.search('терап'), [self.ivanov.pk])
+
+        self.clinic.delete()
+        self.assertEqual(self.search('здоров'), [])
+
+        self.ivanov.doctor = False
+        self.ivanov.save()
+        self.assertEqual(self.search('иванов'), [])
+
+    def test_doctors_list_search(self):
+        response = self.client.get('/api/users/doctors/', {'search': 'анна'})
+        self.assertEqual([doctor['id'] for doctor in response.data['results']], [self.petrova.pk])
+
+    def test_missing_query(self):
+        response = self.client.get('/api/users/doctors/search/')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ReviewUniquenessTests(TestCase):
+    """Один отзыв пользователя на врача: проверка существования и 409 при повторе"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.patient = User.objects.create(telegram_id=1, patient=True)
+        cls.doctor = User.objects.create(telegram_id=2, doctor=True)
+        cls.other_doctor = User.objects.create(telegram_id=3, doctor=True)
+        cls.review = Review.objects.create(user=cls.patient, doctor=cls.doctor, rating=5, detail='Отзыв')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_exists(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/reviews/exists/', {'user': self.patient.pk, 'doctor': self.doctor.pk})
+        self.assertEqual(response.data, {'exists': True, 'review_id': self.review.pk})
+
+        response = self.client.get('/api/reviews/exists/', {'user': self.patient.pk, 'doctor': self.other_doctor.pk})
+        self.assertEqual(response.data, {'exists': False, 'review_id': None})
+
+        self.assertEqual(self.client.get('/api/reviews/exists/', {'user': self.patient.pk}).status_code, 400)
+
+    def test_create_conflict(self):
+        data = {'user_id': self.patient.pk, 'doctor_id': self.doctor.pk, 'rating': 1, 'detail': 'Повтор'}
+        response = self.client.post('/api/reviews/', data, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['review_id'], self.review.pk)
+
+        data['doctor_id'] = self.other_doctor.pk
+        self.assertEqual(self.client.post('/api/reviews/', data, format='json').status_code, 201)
+
+        response = self.client.patch(
+            f'/api/reviews/{self.review.pk}/', {'doctor_id': self.other_doctor.pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 409)
+
+        self.doctor.refresh_from_db()
+        self.assertEqual((self.doctor.rating_sum, self.doctor.rating_count), (5, 1))
+
+
+class DuplicateReviewsMigrationTests(TransactionTestCase):
+    """Миграция 0009 останавливается на повторных отзывах, удаляет их отдельная команда"""
+
+    before = [('api', '0008_doctor_search')]
+    after = [('api', '0010_doctorranking_prior_mean')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        User, Review = apps.get_model('api', 'User'), apps.get_model('api', 'Review')
+        patient = User.objects.create(telegram_id=1, patient=True)
+        self.doctor = User.objects.create(telegram_id=2, doctor=True, rating_sum=7, rating_count=3)
+        self.reviews = [
+            Review.objects.create(user=patient, doctor=self.doctor, rating=rating, detail='Отзыв')
+            for rating in (1, 2, 4)
+        ]
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(self.after)
+
+    def test_migration_blocks_until_removed(self):
+        with self.assertRaisesMessage(RuntimeError, 'отзывы ' + ', '.join(str(r.pk) for r in self.reviews)):
+            MigrationExecutor(connection).migrate(self.after)
+
+        out = StringIO()
+        call_command('remove_duplicate_reviews', '--dry-run', stdout=out)
+        self.assertIn('Найдено повторных отзывов: 2', out.getvalue())
+
+        out = StringIO()
+        call_command('remove_duplicate_reviews', stdout=out)
+        self.assertIn(f'остается отзыв {self.reviews[-1].pk}', out.getvalue())
+
+        MigrationExecutor(connection).migrate(self.after)
+        self.assertEqual(list(Review.objects.values_list('pk', flat=True)), [self.reviews[-1].pk])
+        doctor = User.objects.get(pk=self.doctor.pk)
+        self.assertEqual((doctor.rating_sum, doctor.rating_count), (4, 1))
+        ranking = DoctorRanking.objects.get(doctor=doctor, scope=DoctorRanking.SCOPE_GLOBAL)
+        self.assertEqual((ranking.rating, ranking.prior_mean), (4.0, 4.0))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class UserProfileTests(TestCase):
+    """Профиль по telegram_id: рейтинг только у врачей, клиника идентификатором"""
+
+    @classmethod
+    def setUpTestData(cls):
+        clinic = Clinic.objects.create(title='Клиника', address='Адрес', phone='+7 000', work_time='Пн-Пт')
+        cls.patient = User.objects.create(telegram_id=1, patient=True, detail='Пациент')
+        cls.doctor = User.objects.create(telegram_id=2, doctor=True, clinic=clinic)
+        Review.objects.create(user=cls.patient, doctor=cls.doctor, rating=4, detail='Отзыв')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_patient(self):
+        response = self.client.get(f'/api/users/telegram/{self.patient.telegram_id}/')
+        self.assertEqual(response.data['id'], self.patient.pk)
+        self.assertEqual(response.data['detail'], 'Пациент')
+        self.assertNotIn('rating', response.data)
+        self.assertNotIn('reviews_count', response.data)
+
+    def test_doctor(self):
+        response = self.client.get(f'/api/users/telegram/{self.doctor.telegram_id}/')
+        self.assertEqual(response.data['clinic'], self.doctor.clinic_id)
+        self.assertEqual((response.data['rating'], response.data['reviews_count']), (4, 1))
+
+    def test_not_found(self):
+        self.assertEqual(self.client.get('/api/users/telegram/3/').status_code, 404)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class DoctorCardTests(TestCase):
+    """Карточка врача: врач, первая страница отзывов, распределение оценок и отзыв пользователя"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create(telegram_id=1, doctor=True, detail='Врач')
+        cls.patients = [User.objects.create(telegram_id=100 + i, patient=True) for i in range(5)]
+        cls.reviews = [
+            Review.objects.create(user=patient, doctor=cls.doctor, rating=rating, detail='Отзыв')
+            for patient, rating in zip(cls.patients[:4], [5, 5, 4, 1])
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get_card(self, **params):
+        response = self.client.get(f'/api/users/{self.doctor.pk}/card/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_card(self):
+        data = self.get_card(page_size=3)
+        self.assertEqual(data['doctor']['id'], self.doctor.pk)
+        self.assertEqual(data['doctor']['rating'], 3.75)
+        self.assertEqual(data['rating_histogram'], {'1': 1, '2': 0, '3': 0, '4': 1, '5': 2})
+        self.assertIsNone(data['viewer'])
+
+        # Продолжение списка - обычный endpoint отзывов о враче с тем же курсором
+        self.assertEqual(len(data['reviews']['results']), 3)
+        response = self.client.get(
+            f'/api/reviews/doctor/{self.doctor.pk}/', {'cursor': data['reviews']['next_cursor'], 'page_size': 3}
+        )
+        ids = [review['id'] for review in data['reviews']['results'] + response.data['results']]
+        self.assertEqual(ids, [review.pk for review in reversed(self.reviews)])
+
+    def test_viewer(self):
+        viewer = self.get_card(telegram_id=self.patients[0].telegram_id)['viewer']
+        self.assertEqual(viewer, {'user_id': self.patients[0].pk, 'review_id': self.reviews[0].pk, 'has_reviewed': True})
+
+        viewer = self.get_card(telegram_id=self.patients[4].telegram_id)['viewer']
+        self.assertEqual(viewer, {'user_id': self.patients[4].pk, 'review_id': None, 'has_reviewed': False})
+
+        viewer = self.get_card(telegram_id=999)['viewer']
+        self.assertEqual(viewer, {'user_id': None, 'review_id': None, 'has_reviewed': False})
+
+    def test_not_a_doctor(self):
+        self.assertEqual(self.client.get(f'/api/users/{self.patients[0].pk}/card/').status_code, 404)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ClinicReviewsTests(TestCase):
+    """Отзывы клиники одним запросом: все врачи клиники, сортировка и пагинация"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.clinic = Clinic.objects.create(title='Клиника', address='Адрес', phone='+7', email='a@example.com')
+        other = Clinic.objects.create(title='Другая', address='Адрес', phone='+7', email='b@example.com')
+        cls.empty = Clinic.objects.create(title='Пустая', address='Адрес', phone='+7', email='c@example.com')
+        doctors = [User.objects.create(telegram_id=100 + i, doctor=True, clinic=cls.clinic) for i in range(4)]
+        outsider = User.objects.create(telegram_id=200, doctor=True, clinic=other)
+        for i in range(5):
+            patient = User.objects.create(telegram_id=300 + i, patient=True)
+            for j, doctor in enumerate(doctors):
+                Review.objects.create(user=patient, doctor=doctor, rating=(i + j) % 5 + 1, detail='Отзыв')
+            Review.objects.create(user=patient, doctor=outsider, rating=5, detail='Чужой отзыв')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = f'/api/clinics/{self.clinic.pk}/reviews/'
+
+    def walk(self, params):
+        ids, cursor = [], None
+        while True:
+            response = self.client.get(self.url, {**params, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200, response.content)
+            ids.extend(row['id'] for row in response.data['results'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                return ids
+
+    def test_sorted_by_date(self):
+        expected = list(
+            Review.objects.filter(doctor__clinic=self.clinic)
+            .order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(len(expected), 20)
+        self.assertEqual(self.walk({'page_size': 6}), expected)
+
+    def test_sorted_by_rating(self):
+        expected = list(
+            Review.objects.filter(doctor__clinic=self.clinic)
+            .order_by('-rating', '-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.walk({'page_size': 6, 'ordering': '-rating'}), expected)
+
+    def test_invalid_ordering_and_missing_clinic(self):
+        self.assertEqual(self.client.get(self.url, {'ordering': 'detail'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/clinics/999999/reviews/').status_code, 404)
+        response = self.client.get(f'/api/clinics/{self.empty.pk}/reviews/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class AsyncViewsTests(TestCase):
+    """Async-версии endpoint'ов под ASGI отвечают так же, как синхронные ViewSet"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title='Кардиолог')
+        cls.clinic = Clinic.objects.create(
+            title='Клиника', address='Адрес', phone='+7 000', email='clinic@example.com', work_time='Пн-Пт'
+        )
+        cls.doctors = [
+            User.objects.create(
+                telegram_id=1 + i, doctor=True, detail=f'Врач {i}', category=cls.category, clinic=cls.clinic
+            )
+            for i in range(4)
+        ]
+        cls.patients = [User.objects.create(telegram_id=100 + i, patient=True) for i in range(4)]
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i, patient in enumerate(cls.patients):
+                for doctor in cls.doctors[:i + 1]:
+                    Review.objects.create(
+                        user=patient, doctor=doctor, rating=1 + (i + doctor.pk) % 5, detail='Отзыв'
+                    )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get_both(self, url, params=None, **headers):
+        """Ответы синхронного и async view на один запрос и число запросов к БД каждого"""
+        responses = []
+        for urlconf in ('med.urls', 'med.asgi_urls'):
+            cache.clear()
+            with override_settings(ROOT_URLCONF=urlconf), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params, **headers)
+            responses.append((response, len(queries)))
+        return responses
+
+    def test_same_responses(self):
+        doctor = self.doctors[0]
+        requests = [
+            (f'/api/users/{doctor.pk}/', {}),
+            (f'/api/users/{doctor.pk}/', {'fields': 'id,detail,clinic.title'}),
+            (f'/api/users/{doctor.pk}/card/', {'telegram_id': self.patients[0].telegram_id, 'page_size': 2}),
+            (f'/api/users/telegram/{doctor.telegram_id}/', {}),
+            ('/api/users/doctors/rating/', {'ranking': 'bayesian', 'page_size': 2}),
+            ('/api/users/doctors/rating/', {'fields': 'id,rating'}),
+            (f'/api/users/doctors/category/{self.category.pk}/', {}),
+            ('/api/clinics/rating/', {}),
+            (f'/api/reviews/doctor/{doctor.pk}/', {'page_size': 2}),
+            (f'/api/users/{self.patients[0].pk}/card/', {}),
+            ('/api/users/telegram/999/', {}),
+            ('/api/users/doctors/rating/', {'ranking': 'unknown'}),
+            ('/api/users/doctors/category/x/', {}),
+            ('/api/reviews/doctor/1/', {'cursor': 'invalid'}),
+        ]
+        for url, params in requests:
+            with self.subTest(url=url, params=params):
+                (sync, sync_queries), (async_, async_queries) = self.get_both(url, params)
+                self.assertEqual(async_.status_code, sync.status_code)
+                self.assertEqual(async_['Content-Type'], sync['Content-Type'])
+                self.assertEqual(async_.content, sync.content)
+                self.assertEqual(async_queries, sync_queries)
+
+    def test_next_page_and_formats(self):
+        first, _ = self.get_both(f'/api/reviews/doctor/{self.doctors[0].pk}/', {'page_size': 2})[1]
+        cursor = json.loads(first.content)['next_cursor']
+        (sync, _), (async_, _) = self.get_both(
+            f'/api/reviews/doctor/{self.doctors[0].pk}/', {'page_size': 2, 'cursor': cursor}
+        )
+        self.assertEqual(async_.content, sync.content)
+
+        if find_spec('msgpack'):
+            (sync, _), (async_, _) = self.get_both('/api/clinics/rating/', HTTP_ACCEPT='application/msgpack')
+            self.assertEqual(async_['Content-Type'], 'application/msgpack')
+            self.assertEqual(async_.content, sync.content)
+
+    @override_settings(ROOT_URLCONF='med.asgi_urls')
+    def test_other_methods_and_routes(self):
+        patient = self.patients[0]
+        response = self.client.patch(f'/api/users/{patient.pk}/', {'detail': 'Новое имя'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(User.objects.get(pk=patient.pk).detail, 'Новое имя')
+
+        # Действия роутера с похожими путями не перехватываются async-маршрутами
+        self.assertIs(resolve(f'/api/users/{patient.pk}/').func, async_views.user_detail)
+        self.assertIsNot(resolve('/api/users/doctors/').func, async_views.user_detail)
+        self.assertEqual(self.client.get('/api/users/doctors/').status_code, 200)
+        self.assertEqual(self.client.post('/api/users/doctors/rating/').status_code, 405)
+
+
+class LeaderboardTests(TestCase):
+    """Материализованные рейтинги: инкрементальное обновление и полное перестроение"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [Category.objects.create(title=f'Категория {i}') for i in range(2)]
+        cls.clinic = Clinic.objects.create(title='Клиника', address='Адрес', phone='+7 000', work_time='Пн-Пт')
+        cls.doctors = [
+            User.objects.create(telegram_id=1 + i, doctor=True, category=cls.categories[0], clinic=cls.clinic)
+            for i in range(2)
+        ]
+        cls.patients = [User.objects.create(telegram_id=100 + i, patient=True) for i in range(3)]
+        with cls.captureOnCommitCallbacks(execute=True):
+            for patient in cls.patients:
+                Review.objects.create(user=patient, doctor=cls.doctors[0], rating=5, detail='Отзыв')
+            Review.objects.create(user=cls.patients[0], doctor=cls.doctors[1], rating=2, detail='Отзыв')
+
+    def setUp(self):
+        cache.clear()
+
+    def rankings(self, doctor):
+        return {
+            (row.scope, row.scope_id): (row.rating, row.reviews_count)
+            for row in DoctorRanking.objects.filter(doctor=doctor)
+        }
+
+    def test_incremental_refresh(self):
+        doctor = User.objects.get(pk=self.doctors[1].pk)
+        self.assertEqual(self.rankings(doctor), {
+            ('global', 0): (2.0, 1),
+            ('category', self.categories[0].pk): (2.0, 1),
+            ('clinic', self.clinic.pk): (2.0, 1),
+        })
+        with self.captureOnCommitCallbacks(execute=True):
+            doctor.category = self.categories[1]
+            doctor.save()
+            Review.objects.create(user=self.patients[1], doctor=doctor, rating=4, detail='Отзыв')
+        self.assertEqual(self.rankings(doctor), {
+            ('global', 0): (3.0, 2),
+            ('category', self.categories[1].pk): (3.0, 2),
+            ('clinic', self.clinic.pk): (3.0, 2),
+        })
+        self.assertEqual(ClinicRanking.objects.get(clinic=self.clinic).reviews_count, 5)
+
+    def test_unrelated_user_changes_skip_refresh(self):
+        patient, doctor = self.patients[0], User.objects.get(pk=self.doctors[0].pk)
+        with mock.patch('api.leaderboards.refresh_doctor_rankings') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                patient.detail = 'Новое имя'
+                patient.save()
+                doctor.phone_number = '+7 700'
+                doctor.save()
+            refresh.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                doctor.doctor = False
+                doctor.save()
+            refresh.assert_called_once_with([doctor.pk])
+
+    def test_delete_doctor_with_reviews(self):
+        doctor = self.doctors[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            doctor.delete()
+        self.assertFalse(User.objects.filter(pk=doctor.pk).exists())
+        self.assertFalse(DoctorRanking.objects.filter(doctor_id=doctor.pk).exists())
+        self.assertEqual(ClinicRanking.objects.get(clinic=self.clinic).reviews_count, 1)
+
+    def test_rebuild(self):
+        expected = {doctor.pk: self.rankings(doctor) for doctor in self.doctors}
+        DoctorRanking.objects.all().delete()
+        ClinicRanking.objects.all().delete()
+
+        self.assertEqual(rebuild_leaderboards(), (6, 1))
+        self.assertEqual({doctor.pk: self.rankings(doctor) for doctor in self.doctors}, expected)
+        self.assertEqual(set(DoctorRanking.objects.values_list('prior_mean', flat=True)), {4.25})
+
+    def test_prior_drift_waits_for_rebuild(self):
+        # Строки посчитаны с устаревшей общей средней: пересчет врача ее сохраняет
+        DoctorRanking.objects.update(prior_mean=1.0)
+        refresh_doctor_rankings([self.doctors[0].pk])
+        self.assertEqual(set(DoctorRanking.objects.values_list('prior_mean', flat=True)), {1.0})
+        self.assertTrue(prior_mean_drifted())
+
+        out = StringIO()
+        call_command('rebuild_leaderboards', '--if-drifted', stdout=out)
+        self.assertIn('Рейтинги перестроены', out.getvalue())
+        self.assertEqual(set(DoctorRanking.objects.values_list('prior_mean', flat=True)), {4.25})
+        self.assertFalse(prior_mean_drifted())
+
+        out = StringIO()
+        call_command('rebuild_leaderboards', '--if-drifted', stdout=out)
+        self.assertIn('перестроение не требуется', out.getvalue())
+
+    def test_existing_rows_are_overwritten(self):
+        # Строку мог вставить параллельный пересчет того же врача
+        row = DoctorRanking.objects.get(doctor=self.doctors[1], scope=DoctorRanking.SCOPE_GLOBAL)
+        save_doctor_entries([DoctorRanking(
+            scope=row.scope, scope_id=row.scope_id, doctor_id=row.doctor_id, rating=1.0, reviews_count=7,
+        )])
+        row.refresh_from_db()
+        self.assertEqual((row.rating, row.reviews_count), (1.0, 7))
+
+    def test_deleted_scope_removed(self):
+        self.assertTrue(doctor_leaderboard(('-rating',), category=self.categories[0].pk).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.categories[0].delete()
+            self.clinic.delete()
+        self.assertFalse(DoctorRanking.objects.filter(scope__in=('category', 'clinic')).exists())
+        self.assertEqual(DoctorRanking.objects.filter(scope=DoctorRanking.SCOPE_GLOBAL).count(), 2)
@@ -1,104 +1,324 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Avg, Count
+from rest_framework.permissions import IsAdminUser
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
 from django.shortcuts import get_object_or_404
 
-from .models import Category, GeoPosition, Clinic, User, SupportRequest, Review
+from .models import (
+    Category, GeoPosition, Clinic, User, SupportRequest, Review,
+    ClinicRanking, DoctorRanking, user_relations
+)
+from .aggregates import rating_histogram
+from .bulk import bulk_create_reviews, bulk_create_users
+from .cache import CachedResponseMixin, ResponseCacheMixin
+from .fieldsets import SparseFieldsetViewMixin, fieldset_lookups
+from .leaderboards import doctor_leaderboard
+from .pagination import KeysetPagination, KeysetPaginationMixin
+from .ranking import RANKING_AVERAGE, RANKING_MODES, RANKING_SCORE_FIELDS, ranking_order
+from .search import doctor_search_filter, search_doctor_ids
 from .serializers import (
     CategorySerializer,
     GeoPositionSerializer,
     ClinicSerializer,
     UserListSerializer,
     UserDetailSerializer,
+    UserProfileSerializer,
     UserCreateSerializer,
+    DoctorRatingSerializer,
     SupportRequestSerializer,
     ReviewSerializer
 )
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# Допустимые значения ordering для отзывов клиники и соответствующие ключи сортировки
+CLINIC_REVIEWS_ORDERINGS = {
+    '-created_at': ('-created_at',),
+    'created_at': ('created_at',),
+    '-rating': ('-rating', '-created_at'),
+    'rating': ('rating', '-created_at'),
+}
+
+
+class ReviewConflict(APIException):
+    """Пользователь уже оставлял отзыв этому врачу"""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Вы уже оставляли отзыв этому врачу'
+    default_code = 'conflict'
+
+    def __init__(self, review_id=None):
+        super().__init__()
+        # id существующего отзыва возвращается как есть, чтобы клиент мог его открыть
+        self.detail = {'detail': self.detail, 'review_id': review_id}
+
+
+def get_int_param(request, name):
+    """Получить целочисленный query-параметр (None, если не передан)"""
+    value = request.query_params.get(name, None)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: 'Ожидается целое число'})
+
+
+def bulk_response(request, create):
+    """Выполнить массовую загрузку массива из тела запроса и вернуть итог по элементам"""
+    items = request.data
+    if not isinstance(items, list):
+        return Response({'detail': 'Ожидается массив объектов'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > settings.API_BULK_MAX_ITEMS:
+        return Response(
+            {'detail': f'Не более {settings.API_BULK_MAX_ITEMS} элементов за запрос'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    result = create(items)
+    if result.created or not result.errors:
+        response_status = status.HTTP_201_CREATED
+    else:
+        response_status = status.HTTP_400_BAD_REQUEST
+    return Response(result.as_dict(), status=response_status)
+
+
+def with_ranked_doctors(entries, serializer=None):
+    """Подгрузить врачей строк рейтинга вместе со связями для сериализации
+
+    С разреженным набором полей (fields=/expand=) подгружаются только раскрытые связи.
+    """
+    if serializer is None or serializer.context.get('fieldset') is None:
+        select, prefetch = user_relations('doctor__')
+    else:
+        _, select, prefetch = fieldset_lookups(serializer, 'doctor__')
+    return entries.select_related('doctor', *select).prefetch_related(*prefetch)
+
+
+def unknown_ranking_response():
+    return Response(
+        {'detail': f"Неизвестный режим ранжирования. Допустимые значения: {', '.join(RANKING_MODES)}"},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+def profile_not_found_response():
+    return Response({'detail': 'Пользователь не найден'}, status=status.HTTP_404_NOT_FOUND)
+
+
+def category_not_found_response():
+    return Response({'detail': 'Категория не найдена'}, status=status.HTTP_404_NOT_FOUND)
+
+
+def card_viewer_queryset(telegram_id, doctor_id):
+    """Пользователь с данным telegram_id и id его отзыва о враче (values id, review_id)"""
+    return (
+        User.objects.filter(telegram_id=telegram_id)
+        .annotate(review_id=Subquery(
+            Review.objects.filter(user_id=OuterRef('pk'), doctor_id=doctor_id).values('pk')[:1]
+        ))
+        .values('id', 'review_id')
+    )
+
+
+def card_viewer(user):
+    """Блок viewer карточки врача по строке card_viewer_queryset (None - не зарегистрирован)"""
+    return {
+        'user_id': user['id'] if user else None,
+        'review_id': user['review_id'] if user else None,
+        'has_reviewed': bool(user and user['review_id']),
+    }
+
+
+def attach_doctor_score(entry, ranking):
+    """Врач из строки материализованного рейтинга с оценкой выбранной схемы"""
+    doctor = entry.doctor
+    doctor.score = getattr(entry, RANKING_SCORE_FIELDS[ranking])
+    return doctor
+
+
+def attach_clinic_rating(entry):
+    """Клиника из строки материализованного рейтинга с рейтингом для ClinicSerializer"""
+    clinic = entry.clinic
+    clinic.rating = round(entry.rating, 2)
+    clinic.reviews_count = entry.reviews_count
+    return clinic
+
+
+class CategoryViewSet(CachedResponseMixin, SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для Category (только GET)"""
     queryset = Category.objects.all()
+    cache_dependencies = (Category,)
     serializer_class = CategorySerializer
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['title']
     ordering_fields = ['title']
 
 
-class GeoPositionViewSet(viewsets.ReadOnlyModelViewSet):
+class GeoPositionViewSet(CachedResponseMixin, SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для GeoPosition (только GET)"""
     queryset = GeoPosition.objects.all()
+    cache_dependencies = (GeoPosition,)
     serializer_class = GeoPositionSerializer
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['title']
     ordering_fields = ['title']
 
 
-class ClinicViewSet(viewsets.ReadOnlyModelViewSet):
+class ClinicViewSet(
+    CachedResponseMixin, KeysetPaginationMixin, SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet
+):
     """ViewSet для Clinic (только GET)"""
-    queryset = Clinic.objects.all()
+    queryset = Clinic.objects.with_rating().order_by('title')
+    # Рейтинг клиники меняется вместе с ее строкой в ClinicRanking (см. leaderboards.py),
+    # поэтому правки пользователей и отзывов, не затрагивающие рейтинг, кэш клиник не сбрасывают
+    cache_dependencies = (Clinic, ClinicRanking)
+    # Отзывы клиники показывают авторов и врачей со справочниками
+    reviews_cache_dependencies = (Clinic, ClinicRanking, Review, User, Category, GeoPosition)
     serializer_class = ClinicSerializer
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['title', 'address', 'phone', 'email']
     ordering_fields = ['title', 'id']
+    keyset_actions = ('rating', 'reviews')
+
+    def get_serializer_class(self):
+        if self.action == 'reviews':
+            return ReviewSerializer
+        return super().get_serializer_class()
+
+    def get_cache_dependencies(self):
+        if self.action == 'reviews':
+            return self.reviews_cache_dependencies
+        return super().get_cache_dependencies()
 
     @action(detail=False, methods=['get'])
     def rating(self, request):
-        """Топ клиник по рейтингу"""
-        clinics = Clinic.objects.all()
-        # Добавляем рейтинг и количество отзывов
-        clinic_data = []
-        for clinic in clinics:
-            rating = clinic.get_rating()
-            reviews_count = clinic.get_reviews_count()
-            if rating is not None:  # Показываем только клиники с отзывами
-                clinic_data.append({
-                    'clinic': clinic,
-                    'rating': rating,
-                    'reviews_count': reviews_count
-                })
-        
-        # Сортируем по рейтингу (desc), затем по количеству отзывов (desc)
-        clinic_data.sort(key=lambda x: (x['rating'], x['reviews_count']), reverse=True)
-        
-        # Сериализуем
-        serializer = self.get_serializer([item['clinic'] for item in clinic_data], many=True)
-        return Response(serializer.data)
+        """Топ клиник по рейтингу (читается из материализованного рейтинга)"""
+        return self.cached_response(request, lambda: self.build_rating_response(request))
+
+    def build_rating_response(self, request):
+        return self.rating_page_response(self.paginate_queryset(self.get_rating_entries()))
+
+    def get_rating_entries(self):
+        return (
+            ClinicRanking.objects.filter(reviews_count__gt=0)
+            .select_related('clinic')
+            .order_by('-rating', '-reviews_count', 'clinic_id')
+        )
+
+    def rating_page_response(self, page):
+        clinics = [attach_clinic_rating(entry) for entry in page]
+        serializer = self.get_serializer(clinics, many=True)
+        return self.get_paginated_response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def reviews(self, request, pk=None):
+        """Отзывы о врачах клиники (ordering: -created_at, created_at, -rating, rating)"""
+        return self.cached_response(request, lambda: self.build_reviews_response(request, pk))
 
-class UserViewSet(viewsets.ModelViewSet):
+    def build_reviews_response(self, request, pk):
+        if not pk.isdigit():
+            raise NotFound('Клиника не найдена')
+        ordering = request.query_params.get('ordering', '-created_at')
+        if ordering not in CLINIC_REVIEWS_ORDERINGS:
+            raise ValidationError({'ordering': f'Допустимые значения: {", ".join(CLINIC_REVIEWS_ORDERINGS)}'})
+
+        # Один запрос с join по индексированным внешним ключам вместо обхода врачей клиники
+        reviews = (
+            Review.objects.with_relations()
+            .filter(doctor__clinic_id=pk)
+            .order_by(*CLINIC_REVIEWS_ORDERINGS[ordering])
+        )
+        page = self.paginate_queryset(reviews)
+        # Пустая страница: отличить клинику без отзывов от несуществующей
+        if not page and not Clinic.objects.filter(pk=pk).exists():
+            raise NotFound('Клиника не найдена')
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class UserViewSet(ResponseCacheMixin, KeysetPaginationMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet для User (GET, POST)"""
-    queryset = User.objects.all()
+    queryset = User.objects.with_relations()
+    # Кэшируется только рейтинг врачей: строки рейтинга и врачи со справочниками
+    cache_dependencies = (DoctorRanking, User, Category, GeoPosition, Clinic, ClinicRanking)
     filter_backends = [SearchFilter, OrderingFilter]
+    # Список ищет по всем пользователям, включая пациентов, и по telegram_id и телефону;
+    # в полнотекстовом индексе (search.py) только ФИО, категории и клиники врачей
     search_fields = ['telegram_id', 'phone_number', 'detail']
     ordering_fields = ['created_at', 'telegram_id']
+    keyset_actions = ('doctors', 'doctors_rating', 'doctors_by_category')
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'doctors'):
             return UserListSerializer
+        elif self.action in ('doctors_search', 'doctors_rating', 'doctors_by_category'):
+            return DoctorRatingSerializer
         elif self.action == 'create':
             return UserCreateSerializer
         return UserDetailSerializer
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        """Массовое создание пользователей и врачей (массив объектов в теле запроса, только администратор)"""
+        return bulk_response(request, bulk_create_users)
+
     @action(detail=False, methods=['get'], url_path='telegram/(?P<telegram_id>[^/.]+)')
     def by_telegram_id(self, request, telegram_id=None):
         """Получение пользователя по telegram_id"""
         try:
-            user = User.objects.get(telegram_id=telegram_id)
-            serializer = UserDetailSerializer(user)
+            user = self.get_profile_queryset().get(telegram_id=telegram_id)
+            serializer = UserProfileSerializer(user)
             return Response(serializer.data)
         except User.DoesNotExist:
-            return Response(
-                {'detail': 'Пользователь не найден'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+            return profile_not_found_response()
+
+    def get_profile_queryset(self):
+        # Один запрос: клиника с рейтингом для профиля не нужна
+        return User.objects.select_related('category', 'geo_position')
+
+    @action(detail=True, methods=['get'])
+    def card(self, request, pk=None):
+        """Карточка врача для бота одним запросом
+
+        Врач, первая страница отзывов о нем (следующие - через reviews/doctor/{id}/
+        с next_cursor), распределение оценок и, если передан telegram_id, отзыв
+        этого пользователя о враче. Параметры: telegram_id, page_size.
+        """
+        doctor = get_object_or_404(User.objects.with_relations(), pk=pk, doctor=True)
+
+        reviews = Review.objects.with_relations().filter(doctor_id=doctor.pk)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(reviews, request, view=self)
+
+        viewer = None
+        telegram_id = get_int_param(request, 'telegram_id')
+        if telegram_id is not None:
+            viewer = card_viewer(card_viewer_queryset(telegram_id, doctor.pk).first())
+
+        return self.card_response(doctor, rating_histogram(doctor.pk), paginator, page, viewer)
+
+    def card_response(self, doctor, histogram, paginator, page, viewer):
+        return Response({
+            'doctor': UserDetailSerializer(doctor).data,
+            'rating_histogram': histogram,
+            'reviews': {
+                'next_cursor': paginator.next_cursor,
+                'results': ReviewSerializer(page, many=True, context=self.get_serializer_context()).data,
+            },
+            'viewer': viewer,
+        })
 
     @action(detail=False, methods=['get'])
     def doctors(self, request):
         """Список врачей (doctor=True)"""
-        doctors = User.objects.filter(doctor=True)
+        doctors = User.objects.with_relations().filter(doctor=True)
         
         # Фильтрация по категории
         category_id = request.query_params.get('category', None)
@@ -115,56 +335,92 @@ class UserViewSet(viewsets.ModelViewSet):
         if clinic_id:
             doctors = doctors.filter(clinic_id=clinic_id)
         
-        # Поиск
+        # Поиск (по полнотекстовому индексу)
         search = request.query_params.get('search', None)
         if search:
-            doctors = doctors.filter(detail__icontains=search)
+            doctors = doctors.filter(doctor_search_filter(search))
         
-        serializer = UserListSerializer(doctors, many=True)
+        page = self.paginate_queryset(doctors)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='doctors/search')
+    def doctors_search(self, request):
+        """Поиск врачей по ФИО, категории и клинике (от наиболее релевантных)
+
+        Параметры: q - строка поиска (слова ищутся как префиксы), limit (до 100).
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'detail': 'Укажите строку поиска в параметре q'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(get_int_param(request, 'limit') or SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT))
+
+        doctor_ids = search_doctor_ids(query, limit)
+        doctors = self.apply_fieldset(User.objects.with_relations().filter(doctor=True)).in_bulk(doctor_ids)
+        serializer = self.get_serializer(
+            [doctors[doctor_id] for doctor_id in doctor_ids if doctor_id in doctors], many=True
+        )
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='doctors/rating')
     def doctors_rating(self, request):
-        """Топ врачей по рейтингу"""
-        doctors = User.objects.filter(doctor=True)
-        
-        # Добавляем рейтинг и количество отзывов
-        doctor_data = []
-        for doctor in doctors:
-            rating = doctor.get_rating()
-            reviews_count = doctor.get_reviews_count()
-            if rating is not None:  # Показываем только врачей с отзывами
-                doctor_data.append({
-                    'doctor': doctor,
-                    'rating': rating,
-                    'reviews_count': reviews_count
-                })
-        
-        # Сортируем по рейтингу (desc), затем по количеству отзывов (desc)
-        doctor_data.sort(key=lambda x: (x['rating'], x['reviews_count']), reverse=True)
-        
-        # Сериализуем
-        serializer = UserListSerializer([item['doctor'] for item in doctor_data], many=True)
-        return Response(serializer.data)
+        """Топ врачей по рейтингу (читается из материализованного рейтинга)
+
+        Параметры: ranking (average, bayesian, wilson), category, geo_position, clinic,
+        page, page_size (топ-K - первая страница нужного размера). Ответ кэшируется
+        вместе со сжатыми вариантами.
+        """
+        return self.cached_response(request, lambda: self.build_rating_response(request))
+
+    def build_rating_response(self, request):
+        ranking = request.query_params.get('ranking', RANKING_AVERAGE)
+        if ranking not in RANKING_MODES:
+            return unknown_ranking_response()
+        page = self.paginate_queryset(self.get_rating_entries(request, ranking))
+        return self.ranked_page_response(page, ranking)
+
+    def get_rating_entries(self, request, ranking):
+        entries = doctor_leaderboard(
+            ranking_order(ranking),
+            category=get_int_param(request, 'category'),
+            geo_position=get_int_param(request, 'geo_position'),
+            clinic=get_int_param(request, 'clinic'),
+        ).filter(reviews_count__gt=0)
+        return with_ranked_doctors(entries, self.get_serializer())
+
+    def ranked_page_response(self, page, ranking):
+        doctors = [attach_doctor_score(entry, ranking) for entry in page]
+        serializer = self.get_serializer(doctors, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='doctors/category/(?P<category_id>[^/.]+)')
     def doctors_by_category(self, request, category_id=None):
-        """Врачи по категории"""
-        doctors = User.objects.filter(doctor=True, category_id=category_id)
-        serializer = UserListSerializer(doctors, many=True)
-        return Response(serializer.data)
+        """Врачи по категории (по убыванию рейтинга, курсорная пагинация)"""
+        try:
+            category_id = int(category_id)
+        except ValueError:
+            return category_not_found_response()
+
+        page = self.paginate_queryset(self.get_category_entries(category_id))
+        return self.ranked_page_response(page, RANKING_AVERAGE)
+
+    def get_category_entries(self, category_id):
+        return with_ranked_doctors(
+            doctor_leaderboard(ranking_order(RANKING_AVERAGE), category=category_id), self.get_serializer()
+        )
 
 
-class SupportRequestViewSet(viewsets.ModelViewSet):
+class SupportRequestViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet для SupportRequest (GET, POST)"""
-    queryset = SupportRequest.objects.all()
+    queryset = SupportRequest.objects.with_relations()
     serializer_class = SupportRequestSerializer
+    pagination_class = KeysetPagination
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['detail']
     ordering_fields = ['created_at']
 
     def get_queryset(self):
-        queryset = SupportRequest.objects.all()
+        queryset = SupportRequest.objects.with_relations()
         # Фильтрация по пользователю
         user_id = self.request.query_params.get('user', None)
         if user_id:
@@ -178,16 +434,17 @@ class SupportRequestViewSet(viewsets.ModelViewSet):
         serializer.save(user=user)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet для Review (GET, POST)"""
-    queryset = Review.objects.all()
+    queryset = Review.objects.with_relations()
     serializer_class = ReviewSerializer
+    pagination_class = KeysetPagination
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['detail']
     ordering_fields = ['created_at', 'rating']
 
     def get_queryset(self):
-        queryset = Review.objects.all()
+        queryset = Review.objects.with_relations()
         # Фильтрация по врачу
         doctor_id = self.request.query_params.get('doctor', None)
         if doctor_id:
@@ -204,18 +461,65 @@ class ReviewViewSet(viewsets.ModelViewSet):
         doctor_id = serializer.validated_data.get('doctor_id')
         user = get_object_or_404(User, id=user_id)
         doctor = get_object_or_404(User, id=doctor_id)
-        serializer.save(user=user, doctor=doctor)
+        self.save_unique(serializer, user=user, doctor=doctor)
+
+    def perform_update(self, serializer):
+        self.save_unique(serializer)
+
+    def save_unique(self, serializer, **kwargs):
+        """Сохранить отзыв, вернув 409 при повторном отзыве пользователя о враче"""
+        instance = serializer.instance
+        user_id = serializer.validated_data.get('user_id', instance and instance.user_id)
+        doctor_id = serializer.validated_data.get('doctor_id', instance and instance.doctor_id)
+        existing = Review.objects.filter(user_id=user_id, doctor_id=doctor_id)
+        if instance is not None:
+            existing = existing.exclude(pk=instance.pk)
+        existing_id = existing.values_list('pk', flat=True).first()
+        if existing_id is None:
+            try:
+                with transaction.atomic():
+                    serializer.save(**kwargs)
+                return
+            except IntegrityError:
+                # Параллельный запрос успел создать такой же отзыв
+                existing_id = existing.values_list('pk', flat=True).first()
+                if existing_id is None:
+                    raise
+        raise ReviewConflict(existing_id)
+
+    @action(detail=False, methods=['get'])
+    def exists(self, request):
+        """Проверка, оставлял ли пользователь отзыв врачу (параметры user и doctor)"""
+        user_id = get_int_param(request, 'user')
+        doctor_id = get_int_param(request, 'doctor')
+        if user_id is None or doctor_id is None:
+            return Response(
+                {'detail': 'Укажите параметры user и doctor'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        review_id = (
+            Review.objects.filter(user_id=user_id, doctor_id=doctor_id)
+            .values_list('pk', flat=True).first()
+        )
+        return Response({'exists': review_id is not None, 'review_id': review_id})
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        """Массовое создание отзывов (массив объектов в теле запроса, только администратор)"""
+        return bulk_response(request, bulk_create_reviews)
 
     @action(detail=False, methods=['get'], url_path='doctor/(?P<doctor_id>[^/.]+)')
     def by_doctor(self, request, doctor_id=None):
         """Отзывы к конкретному врачу"""
-        reviews = Review.objects.filter(doctor_id=doctor_id)
-        serializer = self.get_serializer(reviews, many=True)
-        return Response(serializer.data)
+        reviews = Review.objects.with_relations().filter(doctor_id=doctor_id)
+        page = self.paginate_queryset(reviews)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='user/(?P<user_id>[^/.]+)')
     def by_user(self, request, user_id=None):
         """Отзывы конкретного пользователя"""
-        reviews = Review.objects.filter(user_id=user_id)
-        serializer = self.get_serializer(reviews, many=True)
-        return Response(serializer.data)
+        reviews = Review.objects.with_relations().filter(user_id=user_id)
+        page = self.paginate_queryset(reviews)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'med.settings')
+# Горячие GET endpoint'ы API обслуживаются async views (см. med/asgi_urls.py)
+os.environ.setdefault('API_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
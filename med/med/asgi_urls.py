@@ -0,0 +1,14 @@
+"""
+URL configuration for med project under ASGI.
+
+Горячие GET endpoint'ы API обслуживаются async-версиями (api/async_views.py),
+остальные маршруты - как в med/urls.py. Включается настройкой API_ASYNC_VIEWS.
+"""
+from django.urls import path, include
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/', include('api.async_urls')),
+    *sync_urlpatterns,
+]
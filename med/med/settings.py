@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,7 +56,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'med.urls'
+# Async-версии горячих GET endpoint'ов (api/async_views.py). Включаются точкой
+# входа ASGI (med/asgi.py); под WSGI каждый async view выполнялся бы в отдельном
+# цикле событий, поэтому там остаются синхронные ViewSet. API_ASYNC_VIEWS=0
+# отключает их и под ASGI.
+API_ASYNC_VIEWS = os.environ.get('API_ASYNC_VIEWS') == '1'
+
+ROOT_URLCONF = 'med.asgi_urls' if API_ASYNC_VIEWS else 'med.urls'
 
 TEMPLATES = [
     {
@@ -122,16 +131,62 @@ STATIC_URL = 'static/'
 
 # Django REST Framework settings
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.StandardResultsSetPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # JSON через orjson и MessagePack по заголовку Accept, если библиотеки установлены (api/renderers.py)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.ORJSONRenderer' if find_spec('orjson') else 'rest_framework.renderers.JSONRenderer',
+        *(['api.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.ORJSONParser' if find_spec('orjson') else 'rest_framework.parsers.JSONParser',
+        *(['api.renderers.MessagePackParser'] if find_spec('msgpack') else []),
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
 # CORS settings (для разработки разрешаем все, в продакшене настроить правильно)
 CORS_ALLOW_ALL_ORIGINS = True
+
+# Ranking settings (рейтинг врачей с учетом достоверности)
+# Вес априорного среднего в байесовском ранжировании (в "виртуальных" отзывах)
+RATING_BAYESIAN_PRIOR_WEIGHT = 10
+# Квантиль нормального распределения для нижней границы Уилсона (95%)
+RATING_WILSON_Z = 1.96
+# Время кэширования общей средней оценки
+RATING_GLOBAL_MEAN_CACHE_SECONDS = 300
+# Насколько общая средняя может уйти от сохраненной в рейтинге, прежде чем
+# `rebuild_leaderboards --if-drifted` перестроит рейтинг целиком
+RATING_PRIOR_MEAN_TOLERANCE = 0.01
+
+# Cache settings
+# Версии моделей для инвалидации кэша ответов хранятся в кэше, поэтому при
+# нескольких процессах/воркерах нужен общий backend (Redis, Memcached или
+# django.core.cache.backends.db.DatabaseCache), иначе воркеры не увидят
+# изменения друг друга.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bastau-api',
+    }
+}
+# Время жизни закэшированных ответов справочных endpoint'ов
+API_RESPONSE_CACHE_SECONDS = 600
+
+# Compression settings (сжатие ответов API, см. api/compression.py)
+# Ответы меньше порога (в байтах) отдаются без сжатия
+API_COMPRESSION_MIN_BYTES = 1024
+# Кодировки в порядке предпочтения; br и zstd используются, если установлены
+# brotli и zstd (Python 3.14+ или backports.zstd)
+API_COMPRESSION_ENCODINGS = ['zstd', 'br', 'gzip']
+
+# Bulk upload settings (массовая загрузка отзывов и пользователей)
+# Максимальное количество элементов в одном запросе
+API_BULK_MAX_ITEMS = 10000
+# Размер пачки: валидация связей, вставка и пересчет агрегатов выполняются на пачку
+API_BULK_BATCH_SIZE = 500
@@ -0,0 +1,12 @@
+"""Script to run Telegram bot in webhook mode from project root"""
+import sys
+import os
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Now import and run the bot
+from bot.webhook import main
+
+if __name__ == "__main__":
+    main()